@@ -1,37 +1,68 @@
 import subprocess
 import os
+import time
+import json
+import threading
+from collections import deque
 import streamlit as st
-from crewai import LLM, Agent, Task, Crew
-from PIL import Image
-from io import BytesIO
 from dotenv import load_dotenv
+from llm_cache import result_cache, image_fingerprint, make_cache_key
+from history import history
+from static_preview import publish_preview, previews
+from scaffold_pool import get_scaffold_pool, scaffold_pools, DEFAULT_SCAFFOLD
+from dev_server import supervisor
+from code_blocks import parse_code_blocks, select_app_code
+from stage_timer import StageTimer
+from llm_client import get_router
+from deps import dependencies_up_to_date, ensure_dependencies
+from image_preprocess import preprocess_flowchart, near_duplicates
+from streaming import consume_stream, vision_messages, ProgressiveWriter
+from jsx_validator import validator, validate_with_repair
+from fanout import generate_fanout, router_completion, fanout_report, write_project_files, remove_project_files
+from incremental import STATE_FILE, load_state, save_state, read_previous_file, file_hashes
+from tracing import tracer, record_tokens, start_metrics_server
+from job_view import get_job_queue, track_job, current_job_id, render_job, render_job_history, render_streaming_metrics, render_hot_update, render_validation, render_trace_panel, render_fanout, render_history, render_incremental
 
 # Load environment variables
 load_dotenv()
 
-# Define a ShellCommandTool to execute shell commands
-class ShellCommandTool:
-    def __init__(self, working_dir="."):
-        self.working_dir = working_dir
+# npm output lines shown live in the job view
+COMMAND_OUTPUT_LINES = 20
 
-    def run_command(self, command):
-        """Run a shell command in the specified working directory."""
-        try:
-            os.makedirs(self.working_dir, exist_ok=True)
-            result = subprocess.run(command, shell=True, cwd=self.working_dir, capture_output=True, text=True)
-            return result.stdout if result.returncode == 0 else result.stderr
-        except Exception as e:
-            return f"Error executing command: {e}"
+# Packages the generated code imports beyond the create-react-app template
+REQUIRED_PACKAGES = ["web-vitals"]
 
 # Function to check if the React app is already set up
 def check_node_modules(project_path):
-    """Check if node_modules exists, indicating the React app setup is complete."""
-    return os.path.exists(os.path.join(project_path, "node_modules"))
+    """Check that the dependencies recorded at the last install (plus web-vitals) are still what package.json asks for."""
+    return dependencies_up_to_date(project_path, required=REQUIRED_PACKAGES)
 
-# Function to analyze a flowchart image and generate React code
-def generate_code_from_flowchart(flowchart_image):
-    """Generate website code based on the uploaded flowchart."""
-    prompt = """
+# Function to set up the React project (scaffold + dependency check)
+def setup_react_project(project_path, scaffold=None, on_line=None):
+    """
+    Scaffold the React project if needed and make sure its dependencies are installed. Returns a log of what was done.
+    `scaffold` picks the template ("cra" or "vite", default REACT_SCAFFOLD); npm output is streamed to on_line(stream, line).
+    """
+    if check_node_modules(project_path):
+        return "React project already set up."
+    log = []
+    try:
+        scaffold_start = time.perf_counter()
+        scaffold_mode = get_scaffold_pool(scaffold).acquire(project_path)
+        log.append(f"React project ready ({scaffold_mode}) in {time.perf_counter() - scaffold_start:.2f}s.")
+    except Exception as e:
+        return f"Error initializing React project: {e}"
+
+    # A pooled clone inherits the template's stamp, so this usually runs no npm command at all
+    try:
+        commands = ensure_dependencies(project_path, required=REQUIRED_PACKAGES, on_line=on_line)
+        log.extend(f"Ran `{command}`." for command in commands)
+    except subprocess.CalledProcessError as e:
+        log.append(f"Error installing dependencies: {e}\n{e.output or ''}".rstrip())
+    return "\n".join(log)
+
+# Prompt sent with the flowchart image
+CODE_PROMPT = """
     You are an expert React developer. Analyze the provided flowchart and generate a complete React application using **pure inline CSS**. The application should:
 1. **Exclude External CSS**: Do not use any CSS classes or external CSS files.
 2. **Use Inline Styles Only**: All styles must be defined as JavaScript objects and applied using the `style` attribute in the JSX.
@@ -85,102 +116,451 @@ export default App;
     ```
     Return the generated code enclosed in triple backticks (```javascript).
     """
+
+# Function to analyze a flowchart image and generate React code
+def generate_code_from_flowchart(flowchart_image, usage=None, agent=None, image_hash=None):
+    """
+    Generate website code based on the uploaded flowchart.
+
+    If a `usage` dict is given it is filled with the token usage of the call
+    (all zeros and cached=True when the result came from the cache).
+    `image_hash` overrides the image fingerprint used as cache key (e.g. for a near-duplicate upload).
+    """
+    from crewai import Task, Crew
+
+    agent = agent or get_app_code_generator()
+    # Skip the vision call entirely if this exact image/prompt/model was already answered
+    cache_key = make_cache_key(CODE_PROMPT, VISION_MODEL, None, image_hash or image_fingerprint(flowchart_image))
+    cached_code = result_cache.get(cache_key)
+    if cached_code is not None:
+        if usage is not None:
+            usage.update(prompt_tokens=0, completion_tokens=0, total_tokens=0, cached=True)
+        return cached_code
+
     task = Task(
         description="Generate React application code with inline CSS styles from the flowchart.",
         expected_output="React application code with logic and styling.",
-        agent=app_code_generator,
+        agent=agent,
         image=flowchart_image,
-        prompt=prompt
+        prompt=CODE_PROMPT
     )
 
     # Execute the task with Crew
-    crew = Crew(agents=[app_code_generator], tasks=[task], verbose=True)
-    crew.kickoff(inputs={})
+    def run_crew(entry):
+        # Bind the agent to the config entry picked by the router (spreads load over keys, retries 429s)
+        agent.llm = get_router().crewai_llm(entry)
+        crew = Crew(agents=[agent], tasks=[task], verbose=agent.verbose)
+        output = crew.kickoff(inputs={})
+        token_usage = getattr(output, "token_usage", None)
+        record_tokens(getattr(token_usage, "prompt_tokens", 0), getattr(token_usage, "completion_tokens", 0))
+        return output
+
+    crew_output = get_router().call(run_crew, model=VISION_MODEL)
+    if usage is not None:
+        token_usage = getattr(crew_output, "token_usage", None)
+        usage.update(
+            prompt_tokens=getattr(token_usage, "prompt_tokens", 0),
+            completion_tokens=getattr(token_usage, "completion_tokens", 0),
+            total_tokens=getattr(token_usage, "total_tokens", 0),
+            cached=False,
+        )
 
     # Extract code from the task output
     generated_code = extract_code_from_output(str(task.output.raw)) if task.output else None
+    if generated_code and generated_code != "No valid code block found.":
+        result_cache.put(cache_key, generated_code)
     return generated_code
 
 # Function to extract the code block from agent output
 def extract_code_from_output(agent_output):
-    """Extract code between triple backticks (` ```javascript `)."""
-    start_idx = agent_output.find("```javascript")
-    if start_idx == -1:  # Try locating other code delimiters if not found
-        start_idx = agent_output.find("```")
-    end_idx = agent_output.rfind("```")
-    if start_idx != -1 and end_idx != -1 and start_idx < end_idx:
-        return agent_output[start_idx + len("```javascript"):end_idx].strip()
-    return "No valid code block found."
+    """Extract the App.js code from the fenced code blocks (` ```javascript `) in the agent output."""
+    code = select_app_code(parse_code_blocks(agent_output))
+    return code.strip() if code and code.strip() else "No valid code block found."
+
+# Function to stream React code for a flowchart, writing files as their code blocks complete
+def stream_code_from_flowchart(image_data, mime_type, image_hash, on_text=None, on_block=None):
+    """
+    Streaming counterpart of generate_code_from_flowchart, talking to the vision model directly.
+
+    Returns:
+        Tuple[str, StreamResult]: The App.js code and the stream (text, blocks, latency metrics).
+    """
+    cache_key = make_cache_key(CODE_PROMPT, VISION_MODEL, None, image_hash)
+    cached_code = result_cache.get(cache_key)
+    if cached_code is not None:
+        stream = consume_stream([f"```javascript\n{cached_code}\n```\n"], on_text, on_block)
+        return cached_code, stream
+
+    chunks = get_router().stream_chat(vision_messages(CODE_PROMPT, image_data, mime_type), model=VISION_MODEL)
+    stream = consume_stream(chunks, on_text, on_block)
+    generated_code = extract_code_from_output(stream.text)
+    if generated_code != "No valid code block found.":
+        result_cache.put(cache_key, generated_code)
+    return generated_code, stream
+
+# Prompt for the repair round after a failed syntax check
+REPAIR_PROMPT = """
+The following React component (src/App.js) does not parse. The JSX parser reported:
+
+{errors}
+
+Fix these errors without changing what the component does. Return the complete corrected
+file enclosed in triple backticks (```javascript).
+
+```javascript
+{code}
+```
+"""
+
+# Function to ask the model to fix syntax errors in generated code
+def repair_generated_code(generated_code, errors):
+    """
+    Send the code and the parser errors back to the code-generation model for one repair round.
+
+    Returns:
+        str: The repaired code, or None if the response held no code block.
+    """
+    response = get_router().chat(
+        [{"role": "user", "content": REPAIR_PROMPT.format(errors=errors, code=generated_code)}],
+        model=VISION_MODEL,
+    )
+    content = response["choices"][0]["message"].get("content") or ""
+    repaired = extract_code_from_output(content)
+    return None if repaired == "No valid code block found." else repaired
 
 # Function to update App.js with generated code
 def update_app_js_with_generated_code(project_path, generated_code):
     app_js_path = os.path.join(project_path, 'src', 'App.js')
     try:
-        with open(app_js_path, 'w') as file:
+        os.makedirs(os.path.dirname(app_js_path), exist_ok=True)
+        with tracer.span("file.write", path="src/App.js"), open(app_js_path, 'w') as file:
             file.write(generated_code)
         return "App.js updated successfully with generated code."
     except Exception as e:
         return f"Error updating App.js: {e}"
 
-# Initialize ShellCommandTool
-project_path = st.text_input("Enter the path for the new React project:", "D:/my-react-app")
-shell_tool = ShellCommandTool(working_dir=project_path)
+# LLM used by the Application Code Generator
+VISION_MODEL = "groq/llama-3.2-11b-vision-preview"
 
-# Initialize LLM
-llm = LLM(
-    model="groq/llama-3.2-11b-vision-preview",
-    api_key=os.getenv("GROQ_API_KEY")
-)
 
 # Define Application Code Generator Agent
-app_code_generator = Agent(
-    role="Application Code Generator",
-    goal="Generate React applications with inline CSS from flowcharts.",
-    backstory="This agent generates complete React applications by analyzing flowcharts and producing components with inline styles.",
-    llm=llm,
-    verbose=True
-)
+def build_app_code_generator(verbose=True):
+    """Create the Application Code Generator agent (one per thread when generating concurrently)."""
+    from crewai import Agent
 
-# Streamlit UI
-st.title("Dynamic React Application Generator")
+    router = get_router()
+    return Agent(
+        role="Application Code Generator",
+        goal="Generate React applications with inline CSS from flowcharts.",
+        backstory="This agent generates complete React applications by analyzing flowcharts and producing components with inline styles.",
+        llm=router.crewai_llm(router.entries_for(VISION_MODEL)[0]),
+        verbose=verbose
+    )
+
+
+_local = threading.local()
+
+
+# Built once per job worker thread and reused across jobs and reruns; crewai is only imported on first use.
+# run_crew rebinds the agent's LLM on every call, so concurrent jobs must not share one agent
+def get_app_code_generator():
+    if not hasattr(_local, "app_code_generator"):
+        _local.app_code_generator = build_app_code_generator()
+    return _local.app_code_generator
 
-# File upload for flowchart
-uploaded_file = st.file_uploader("Upload a flowchart image (PNG, JPG, etc.):", type=["png", "jpg", "jpeg"])
+# Generation pipeline, run as a background job (no Streamlit calls in here)
+def run_generation_job(job, image_bytes, project_path, concurrent_pipeline=True, reuse_near_duplicates=False,
+                       stream_tokens=True, scaffold=None, repair_rounds=1, fanout=False, preview="dev"):
+    """
+    Flowchart image -> generated App.js -> project setup -> running dev server. Returns a JSON-serializable result.
+    With `fanout`, the app is planned as components that are generated in parallel and wired together by App.js.
+    With preview="static", the project gets a production build served by the shared static server instead of a dev server.
+    """
+    timer = StageTimer()
+    result = {"project_path": project_path}
+
+    # Last lines of npm output, shown live while the job runs
+    command_output = deque(maxlen=COMMAND_OUTPUT_LINES)
+
+    def on_command_line(stream, line):
+        command_output.append(line)
+        job.set_live(command_output=list(command_output))
+
+    setup_future = None
+    if concurrent_pipeline:
+        # Project setup does not depend on the LLM output, so start it right away
+        setup_future = timer.run_in_background("project setup", setup_react_project, project_path, scaffold, on_command_line)
 
-if st.button("Generate and Add Application"):
-    if uploaded_file:
-        st.write("Analyzing the uploaded flowchart...")
-        flowchart_image = Image.open(BytesIO(uploaded_file.read()))
+    job.report("image preprocess", "Analyzing the uploaded flowchart...")
+    with timer.stage("image preprocess"):
+        prepared = preprocess_flowchart(image_bytes)
+        flowchart_image = prepared.image
+        image_hash = image_fingerprint(flowchart_image)
+        duplicate_of = near_duplicates.canonical(prepared.phash, image_hash)
+    result["image"] = {
+        "original_size": prepared.original_size, "size": prepared.size, "mode": flowchart_image.mode,
+        "original_bytes": prepared.original_bytes, "processed_bytes": prepared.processed_bytes,
+        "elapsed_s": prepared.elapsed_s,
+    }
+    result["near_duplicate"] = duplicate_of != image_hash
+    if result["near_duplicate"] and reuse_near_duplicates:
+        image_hash = duplicate_of
+    job.check_cancelled()
 
-        # Generate React code from the flowchart
-        generated_code = generate_code_from_flowchart(flowchart_image)
+    # With a dev server already up, files are pushed into it (HMR) instead of restarting it;
+    # remember its compile count so compiles triggered by streamed writes are waited for too
+    running_server = supervisor.get(project_path)
+    compile_mark = running_server.compile_count if running_server is not None else None
 
-        if generated_code:
-            st.success("Code generated successfully!")
-            st.code(generated_code)
+    # App.js generated (single-call) from this same image last time; there is no text description to diff here,
+    # so an edited image is regenerated in full (or, with fan-out, re-planned from the image against the old plan)
+    previous = load_state(project_path)
+    previous_app = None
+    if previous and not previous.get("components") and previous.get("source") == image_hash:
+        previous_app = read_previous_file(project_path, previous, "src/App.js")
 
-            # Set up React project if not already initialized
-            if not check_node_modules(project_path):
-                st.write("Setting up React app structure...")
-                react_app_output = shell_tool.run_command("npx create-react-app .")
-                st.code(react_app_output)
+    # Generate React code from the flowchart
+    job.report("code generation", "Generating React code...")
+    with timer.stage("code generation"):
+        fanned = None
+        if fanout:
+            # One planning call on the image, then one (shorter) completion per component, concurrently
+            finished = []
 
-                st.write("Installing dependencies...")
-                install_output = shell_tool.run_command("npm install web-vitals")
-                st.code(install_output)
+            def on_component(outcome):
+                finished.append(outcome["path"])
+                job.set_live(files=list(finished))
+
+            fanned = generate_fanout(
+                router_completion(VISION_MODEL), image=(prepared.data, prepared.mime_type, image_hash),
+                project_dir=project_path, repair_rounds=repair_rounds, on_component=on_component,
+            )
+        if fanned is not None and fanned.files:
+            generated_code = fanned.files["src/App.js"]
+            result["fanout"] = fanout_report(fanned)
+        elif previous_app is not None:
+            # Same flowchart as last time: App.js stays as it is on disk, no model call
+            generated_code = previous_app
+            result["incremental"] = {"changes": []}
+        elif stream_tokens:
+            # Files are written (and shown) as soon as their code block closes, before the model finishes
+            def ensure_setup():
+                # The scaffold needs an empty directory, so it must finish before the first file lands
+                if setup_future is not None:
+                    setup_future.result()
+                else:
+                    with timer.stage("project setup"):
+                        result["setup_output"] = setup_react_project(project_path, scaffold, on_command_line)
+
+            # Blocks that do not parse are held back; App.js is written after the repair round below
+            writer = ProgressiveWriter(
+                project_path, before_first_write=ensure_setup,
+                validate=lambda path, code: validator.validate(code, path, project_path).ok,
+            )
+
+            def on_block(block):
+                path = writer(block)
+                if path:
+                    job.set_live(files=list(writer.written))
+
+            generated_code, stream = stream_code_from_flowchart(
+                prepared.data, prepared.mime_type, image_hash,
+                on_text=lambda text, partial: job.set_live(text=text[-4000:]),
+                on_block=on_block,
+            )
+            result["streaming"] = {
+                "first_token_s": stream.first_token_s,
+                "first_partial_code_s": stream.first_partial_code_s,
+                "first_code_s": stream.first_code_s,
+                "total_s": stream.total_s,
+                "files_written_while_streaming": writer.written,
+            }
+        else:
+            generated_code = generate_code_from_flowchart(flowchart_image, image_hash=image_hash)
+    job.check_cancelled()
 
+    # Syntax-check before anything reaches the dev server; parser errors go back to the model once
+    # (fan-out components were already checked and repaired one by one, a kept App.js is left as it is)
+    if generated_code and generated_code != "No valid code block found." and "fanout" not in result and "incremental" not in result:
+        job.report("validate", "Checking the generated code for syntax errors...")
+        with timer.stage("validate"):
+            generated_code, result["validation"] = validate_with_repair(
+                generated_code, "src/App.js", project_path, repair_generated_code, rounds=repair_rounds,
+            )
+        job.check_cancelled()
+    result["generated_code"] = generated_code
+
+    if generated_code:
+        files = fanned.files if "fanout" in result else {os.path.join("src", "App.js"): generated_code}
+        # Set up React project if not already initialized
+        job.report("project setup", "Setting up React app structure...")
+        if setup_future is not None:
+            # Join the background setup before writing any files
+            result["setup_output"] = setup_future.result()
+        elif "setup_output" not in result:
+            with timer.stage("project setup"):
+                result["setup_output"] = setup_react_project(project_path, scaffold, on_command_line)
+        job.check_cancelled()
+
+        if preview == "dev" and compile_mark is not None and supervisor.get(project_path) is not None:
+            # Hot path: write App.js into the running project and wait for the recompile
+            job.report("hot update", "Pushing the generated code into the running dev server...")
+            with timer.stage("hot update"):
+                update = supervisor.update(project_path, files, since=compile_mark)
+                if "fanout" in result:
+                    # App.js no longer imports dropped components, so their files can go
+                    remove_project_files(project_path, fanned.removed)
+            result["hot_update"] = {key: value for key, value in update.items() if key != "server"}
+            result["update_status"] = "App.js hot-reloaded." if update["compiled"] else "App.js written, but the dev server did not recompile cleanly."
+            result["server"] = update["server"]
+        else:
             # Update App.js with the generated code
-            st.write("Updating App.js with the generated code...")
-            update_status = update_app_js_with_generated_code(project_path, generated_code)
-            st.success(update_status)
-
-            # Start the React development server
-            st.write("Starting the React development server...")
-            server_output = shell_tool.run_command("npm start")
-            st.code(server_output)
-            st.components.v1.iframe("http://localhost:3000", width=800, height=600)
+            job.report("write App.js", "Updating App.js with the generated code...")
+            with timer.stage("write App.js"):
+                if "fanout" in result:
+                    result["update_status"] = write_project_files(project_path, files, fanned.removed)
+                else:
+                    result["update_status"] = update_app_js_with_generated_code(project_path, generated_code)
+            job.check_cancelled()
+
+            if preview == "static":
+                # One production build, served precompressed by the shared static server
+                job.report("production build", "Building and compressing the app for the static preview...")
+                with timer.stage("production build"):
+                    result["preview_output"], result["preview"] = publish_preview(project_path, on_command_line)
+            else:
+                # Start the React development server
+                job.report("dev server", "Starting the React development server...")
+                with timer.stage("dev server"):
+                    server = supervisor.start(project_path)
+                result["server"] = server.status()
+
+        # Record what this run was made from so the next upload of the same or an edited flowchart only regenerates what changed
+        state = fanned.state if "fanout" in result else {"source": image_hash, "files": file_hashes(files)}
+        save_state(project_path, state)
+
+    result["timing"] = timer.summary()
+    if generated_code:
+        # Keep the generated files so this result can be restored later without calling the model
+        recorded = dict(files, **{STATE_FILE: json.dumps(state, indent=2)})
+        result["history_id"] = history.record(
+            recorded, image_hash=image_hash, project_path=project_path, model=VISION_MODEL,
+            timings=result["timing"], job_id=job.id,
+            meta={"scaffold": scaffold or DEFAULT_SCAFFOLD, "fanout": "fanout" in result},
+        )
+    job.report("done", "Finished")
+    return result
+
+
+def render_generation_result(result):
+    image = result["image"]
+    st.caption(f"Image {image['original_size'][0]}x{image['original_size'][1]} → {image['size'][0]}x{image['size'][1]} {image['mode']}, "
+               f"{image['original_bytes'] / 1024:.0f} KB → {image['processed_bytes'] / 1024:.0f} KB "
+               f"(saved {(image['original_bytes'] - image['processed_bytes']) / 1024:.0f} KB in {image['elapsed_s'] * 1000:.0f} ms)")
+    if result["near_duplicate"]:
+        st.info("This looks like a flowchart that was uploaded before.")
+
+    if result.get("streaming"):
+        render_streaming_metrics(result["streaming"])
+    if result.get("fanout"):
+        render_fanout(result["fanout"])
+    if result.get("incremental"):
+        render_incremental(result["incremental"])
+    if result.get("validation"):
+        render_validation(result["validation"])
+
+    if result["generated_code"]:
+        st.success("Code generated successfully!")
+        st.code(result["generated_code"])
+        st.code(result["setup_output"])
+        st.success(result["update_status"])
+        if result.get("hot_update"):
+            render_hot_update(result["hot_update"])
+
+        if "preview_output" in result:
+            st.code(result["preview_output"])
+            if result["preview"]:
+                st.components.v1.iframe(result["preview"]["url"], width=800, height=600)
         else:
-            st.error("Failed to generate code. Please try again with a clearer flowchart.")
+            server_status = result["server"]
+            if server_status["ready"]:
+                st.code(f"Development server ready at {server_status['url']} (pid {server_status['pid']}).")
+                st.components.v1.iframe(server_status["url"], width=800, height=600)
+            else:
+                st.code("\n".join(server_status["last_output"]))
     else:
-        st.error("Please upload a flowchart to proceed.")
+        st.error("Failed to generate code. Please try again with a clearer flowchart.")
+
+    timing = result["timing"]
+    st.write("Stage timings:")
+    st.table(timing["stages"])
+    st.caption(f"Wall clock {timing['wall_clock_s']:.2f}s vs {timing['sequential_s']:.2f}s back to back "
+               f"(saved {timing['saved_s']:.2f}s)")
+
+
+# Streamlit UI
+def main():
+    queue = get_job_queue()
+    # Prometheus endpoint, only when METRICS_PORT is set
+    start_metrics_server()
+
+    # Project location
+    project_path = st.text_input("Enter the path for the new React project:", "D:/my-react-app")
+
+    st.title("Dynamic React Application Generator")
+
+    # File upload for flowchart
+    uploaded_file = st.file_uploader("Upload a flowchart image (PNG, JPG, etc.):", type=["png", "jpg", "jpeg"])
+
+    concurrent_pipeline = st.checkbox("Set up the React project while the model is running", value=True)
+    reuse_near_duplicates = st.checkbox("Reuse results for near-duplicate flowcharts", value=False)
+    stream_tokens = st.checkbox("Stream model output and write files as they complete", value=True)
+    # Several short completions in parallel instead of one long one (large flowcharts, truncated answers)
+    fanout = st.checkbox("Generate components in parallel", value=False)
+    # Vite starts and rebuilds much faster than create-react-app's webpack dev server
+    scaffold = st.selectbox("Project template", list(scaffold_pools), index=list(scaffold_pools).index(DEFAULT_SCAFFOLD))
+    # A production build on the shared static server costs no Node process per preview, but has no hot reload
+    preview = st.radio("Preview with", ["dev", "static"], horizontal=True,
+                       format_func={"dev": "Dev server (hot reload)", "static": "Production build (static)"}.get)
+
+    if st.button("Generate and Add Application"):
+        if uploaded_file:
+            # Generation runs on the shared worker pool; this script only submits and polls
+            job_id = queue.submit(
+                run_generation_job, uploaded_file.getvalue(), project_path, concurrent_pipeline, reuse_near_duplicates,
+                stream_tokens, scaffold, fanout=fanout, preview=preview,
+                params={"project_path": project_path, "image": uploaded_file.name, "scaffold": scaffold, "fanout": fanout,
+                        "preview": preview},
+            )
+            track_job(job_id)
+        else:
+            st.error("Please upload a flowchart to proceed.")
+
+    job_id = current_job_id()
+    if job_id:
+        render_job(queue, job_id, render_generation_result)
+
+    cache_stats = result_cache.stats()
+    st.caption(f"LLM result cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses, {cache_stats['entries']} entries")
+
+    with st.sidebar:
+        render_job_history(queue)
+        render_trace_panel(job_id)
+        render_history(project_path)
+
+        # Running development servers
+        st.header("Dev servers")
+        for server_status in supervisor.status():
+            st.write(f"{server_status['workdir']} → {server_status['url']} ({'running' if server_status['running'] else 'stopped'})")
+            if server_status["running"] and st.button("Stop", key=f"stop-{server_status['port']}"):
+                supervisor.stop(server_status["workdir"])
+
+        # Production builds on the shared static server
+        st.header("Static previews")
+        for preview_status in previews.status():
+            st.write(f"{preview_status['build_dir']} → {preview_status['url']}")
+
 
+if __name__ == "__main__":
+    # `streamlit run apis.py` executes this file as __main__; importing it (e.g. from batch.py) skips the UI
+    main()
@@ -1,13 +1,25 @@
 import os
-import subprocess
+import time
 import json
-from typing import Tuple
-from io import BytesIO
-from PIL import Image
+import threading
 import streamlit as st
-from crewai import LLM, Agent, Task, Crew
-import autogen
 from dotenv import load_dotenv
+from llm_cache import result_cache, image_fingerprint, make_cache_key
+from history import history
+from static_preview import publish_preview, previews
+from scaffold_pool import get_scaffold_pool, scaffold_pools, DEFAULT_SCAFFOLD
+from dev_server import supervisor
+from code_blocks import parse_code_blocks, select_app_code
+from stage_timer import StageTimer
+from llm_client import get_router
+from image_preprocess import preprocess_flowchart, near_duplicates
+from streaming import consume_stream, ProgressiveWriter
+from jsx_validator import validator, validate_with_repair
+from fanout import generate_fanout, router_completion, fanout_report, write_project_files, remove_project_files
+from incremental import STATE_FILE, load_state, save_state, read_previous_file, description_changes, file_hashes, sha256
+from tracing import tracer, record_tokens, start_metrics_server
+from context_compaction import estimate_tokens
+from job_view import get_job_queue, track_job, current_job_id, render_job, render_job_history, render_streaming_metrics, render_hot_update, render_validation, render_trace_panel, render_fanout, render_history, render_incremental
 
 # Load environment variables
 load_dotenv()
@@ -16,86 +28,125 @@ load_dotenv()
 project_path = "D:/reacts-app"  # Change this to your desired React project path
 
 # AutoGen Configuration
+CODE_MODEL = "mixtral-8x7b-32768"
 llm_config = {
-    "config_list": [
-        {
-            "api_type": "groq",
-            "model": "mixtral-8x7b-32768",
-            "api_key": os.getenv("GROQ_API_KEY"),
-        }
-    ],
+    # Every key from the shared config list, plus the fallback model's entries
+    "config_list": get_router().autogen_config_list(CODE_MODEL),
 }
 
-Project_Code_Generator = autogen.AssistantAgent(
-    name="Project_Code_Generator",
-    llm_config=llm_config,
-    system_message="""
-    Always generate project code in multiple code blocks, put # filename: <filename with file-address> in the first line inside each code block.
-    """,
-    description="""This Agent generates project code in multiple code blocks after receiving user input.""",
-)
+VISION_MODEL = "groq/llama-3.2-90b-vision-preview"
+
+CODE_GENERATOR_SYSTEM_MESSAGE = """
+        Always generate project code in multiple code blocks, put # filename: <filename with file-address> in the first line inside each code block.
+        """
+
+
+# Long-lived resources: built once per process and reused across Streamlit reruns.
+# crewai and autogen are imported here, on first use, instead of at script start.
+@st.cache_resource(show_spinner=False)
+def get_code_generator():
+    """Return the AutoGen (Project_Code_Generator, groupchat, manager) trio."""
+    import autogen
+
+    Project_Code_Generator = autogen.AssistantAgent(
+        name="Project_Code_Generator",
+        llm_config=llm_config,
+        system_message=CODE_GENERATOR_SYSTEM_MESSAGE,
+        description="""This Agent generates project code in multiple code blocks after receiving user input.""",
+    )
+
+    groupchat = autogen.GroupChat(
+        agents=[Project_Code_Generator],
+        messages=[],
+        max_round=500,
+    )
 
-groupchat = autogen.GroupChat(
-    agents=[Project_Code_Generator],
-    messages=[],
-    max_round=500,
-)
+    manager = autogen.GroupChatManager(groupchat=groupchat, llm_config=llm_config)
+    return Project_Code_Generator, groupchat, manager
 
-manager = autogen.GroupChatManager(groupchat=groupchat, llm_config=llm_config)
 
 # CrewAI Configuration
-llm_vision = LLM(
-    model="groq/llama-3.2-90b-vision-preview",
-    api_key=os.getenv("GROQ_API_KEY"),
-)
-
-# Helper Classes
-class ShellCommandTool:
-    def __init__(self, working_dir="."):
-        self.working_dir = working_dir
-
-    def run_command(self, command):
-        try:
-            os.makedirs(self.working_dir, exist_ok=True)
-            result = subprocess.run(command, shell=True, cwd=self.working_dir, capture_output=True, text=True)
-            return result.stdout if result.returncode == 0 else result.stderr
-        except Exception as e:
-            return f"Error executing command: {e}"
+_local = threading.local()
+
+
+def get_vision_agent():
+    """
+    Return this thread's flowchart-analysis CrewAI agent, bound to the first config entry for VISION_MODEL.
+    Each job worker thread gets its own agent: run_crew rebinds the agent's LLM on every call.
+    """
+    from crewai import Agent
+
+    if not hasattr(_local, "vision_agent"):
+        router = get_router()
+        _local.vision_agent = Agent(
+            role="Flowchart Analyzer",
+            goal="Extract text from the uploaded flowchart image for generating React code.",
+            backstory="summarizes the image given",
+            llm=router.crewai_llm(router.entries_for(VISION_MODEL)[0]),
+        )
+    return _local.vision_agent
 
 # CrewAI Tasks
-def extract_from_flowchart(image) -> str:
+def extract_from_flowchart(image, image_hash=None) -> str:
     """
     Extract text from a flowchart image using CrewAI.
+    `image_hash` overrides the image fingerprint used as cache key (e.g. for a near-duplicate upload).
     """
-    vision_agent = Agent(
-        role="Flowchart Analyzer",
-        goal="Extract text from the uploaded flowchart image for generating React code.",
-        backstory="summarizes the image given",
-        llm=llm_vision,
-    )
+    from crewai import Task, Crew
+
+    prompt = "Analyze the flowchart image and summarize it."
+    cache_key = make_cache_key(prompt, VISION_MODEL, None, image_hash or image_fingerprint(image))
+    cached_text = result_cache.get(cache_key)
+    if cached_text is not None:
+        return cached_text
+
+    vision_agent = get_vision_agent()
     task = Task(
-        description="Analyze the flowchart image and summarize it.",
+        description=prompt,
         agent=vision_agent,
         expected_output="Text",
         image=image,
     )
-    crews = Crew(agents=[vision_agent], tasks=[task])
-    result = crews.kickoff()
-    return result.raw if result.raw else "Failed to analyze flowchart."
+    def run_crew(entry):
+        # Bind the agent to the config entry picked by the router (spreads load over keys, retries 429s)
+        vision_agent.llm = get_router().crewai_llm(entry)
+        crews = Crew(agents=[vision_agent], tasks=[task])
+        output = crews.kickoff()
+        token_usage = getattr(output, "token_usage", None)
+        record_tokens(getattr(token_usage, "prompt_tokens", 0), getattr(token_usage, "completion_tokens", 0))
+        return output
+
+    result = get_router().call(run_crew, model=VISION_MODEL)
+    if not result.raw:
+        return "Failed to analyze flowchart."
+    result_cache.put(cache_key, result.raw)
+    return result.raw
 
-def initialize_react_project(project_path: str) -> str:
+def initialize_react_project(project_path: str, scaffold: str = None) -> str:
     """
     Initialize a React project if not already set up.
+    Projects are cloned from the pre-warmed scaffold pool of the chosen template ("cra" or "vite")
+    instead of running create-react-app each time.
     """
-    tool = ShellCommandTool(working_dir=project_path)
-    return tool.run_command("npx create-react-app .")
+    try:
+        start = time.perf_counter()
+        mode = get_scaffold_pool(scaffold).acquire(project_path)
+        return f"React project ready ({mode}) in {time.perf_counter() - start:.2f}s."
+    except Exception as e:
+        return f"Error initializing React project: {e}"
 
 def start_react_server(project_path: str) -> str:
     """
-    Start the React development server.
+    Start the React development server in the background, reusing it if it is already running.
     """
-    tool = ShellCommandTool(working_dir=project_path)
-    return tool.run_command("npm start")
+    try:
+        server = supervisor.start(project_path)
+        status = server.status()
+        if status["ready"]:
+            return f"Development server ready at {server.url} (pid {status['pid']})."
+        return f"Development server did not become ready at {server.url}:\n" + "\n".join(status["last_output"])
+    except Exception as e:
+        return f"Error starting development server: {e}"
 
 def update_app_js(project_path: str, generated_code: str) -> str:
     """
@@ -103,57 +154,401 @@ def update_app_js(project_path: str, generated_code: str) -> str:
     """
     app_js_path = os.path.join(project_path, "src", "App.js")
     try:
-        with open(app_js_path, "w", encoding="utf-8") as file:
+        with tracer.span("file.write", path="src/App.js"), open(app_js_path, "w", encoding="utf-8") as file:
             file.write(generated_code)
         return "App.js updated successfully with generated code."
     except Exception as e:
         return f"Error updating App.js: {e}"
 
+# Function to call an AutoGen agent and record (estimated) token usage on the current span
+def _generate_reply(agent, messages):
+    reply = agent.generate_reply(messages)
+    # generate_reply does not expose usage, so estimate it from the text
+    record_tokens(sum(estimate_tokens(m["content"]) for m in messages), estimate_tokens(reply or ""), estimated=True)
+    return reply
+
 def generate_react_code(description: str) -> str:
     """
     Generate React code using AutoGen's Project_Code_Generator.
     """
     message = f"Generate a complete React app based on the following description:\n\n{description}"
-    chat_result = manager.groupchat.agents[0].generate_reply([
-        {"role": "user", "content": message}  # Include the "role" property
-    ])
-    return chat_result["content"] if "content" in chat_result else "Code generation failed."
+    cache_key = make_cache_key(message, CODE_MODEL, llm_config.get("temperature"))
+    cached_code = result_cache.get(cache_key)
+    if cached_code is not None:
+        return cached_code
 
-# Streamlit UI
-st.title("Dynamic React Application Generator")
+    Project_Code_Generator, _, _ = get_code_generator()
+    chat_result = get_router().call(
+        lambda entry: _generate_reply(Project_Code_Generator, [
+            {"role": "user", "content": message}  # Include the "role" property
+        ]),
+        model=CODE_MODEL,
+    )
+    if isinstance(chat_result, str):
+        chat_result = {"content": chat_result}
+    if not chat_result or not chat_result.get("content"):
+        return "Code generation failed."
+    result_cache.put(cache_key, chat_result["content"])
+    return chat_result["content"]
+
+def repair_react_code(app_code: str, errors: str) -> str:
+    """
+    Send App.js and the parser errors back to Project_Code_Generator for a repair round.
+    Returns the corrected App.js, or None if the reply held no code.
+    """
+    message = (
+        f"The src/App.js you generated does not parse. The JSX parser reported:\n\n{errors}\n\n"
+        f"Fix these errors without changing what the component does and return the complete corrected src/App.js.\n\n"
+        f"```javascript\n{app_code}\n```"
+    )
+    Project_Code_Generator, _, _ = get_code_generator()
+    reply = get_router().call(
+        lambda entry: _generate_reply(Project_Code_Generator, [{"role": "user", "content": message}]),
+        model=CODE_MODEL,
+    )
+    content = reply if isinstance(reply, str) else (reply or {}).get("content") or ""
+    return select_app_code(parse_code_blocks(content))
+
+def update_react_code(app_code: str, changes) -> str:
+    """
+    Incremental counterpart of generate_react_code for an edited flowchart: sends the current App.js and only the
+    description lines that changed. Returns the updated App.js, or None if the reply held no code.
+    """
+    message = (
+        "The flowchart this src/App.js was generated from was edited. These lines of its description changed "
+        "(- removed, + added):\n\n" + "\n".join(changes) + "\n\n"
+        "Update the app to match them, keep everything else as it is and return the complete updated src/App.js.\n\n"
+        f"```javascript\n{app_code}\n```"
+    )
+    cache_key = make_cache_key(message, CODE_MODEL, llm_config.get("temperature"))
+    cached_code = result_cache.get(cache_key)
+    if cached_code is not None:
+        return cached_code
+
+    Project_Code_Generator, _, _ = get_code_generator()
+    reply = get_router().call(
+        lambda entry: _generate_reply(Project_Code_Generator, [{"role": "user", "content": message}]),
+        model=CODE_MODEL,
+    )
+    content = reply if isinstance(reply, str) else (reply or {}).get("content") or ""
+    code = select_app_code(parse_code_blocks(content))
+    if code:
+        result_cache.put(cache_key, code)
+    return code
+
+def stream_react_code(description: str, on_text=None, on_block=None):
+    """
+    Streaming counterpart of generate_react_code: same prompt and cache entry, sent straight to CODE_MODEL.
+    Returns the full response text and the StreamResult with its latency metrics.
+    """
+    message = f"Generate a complete React app based on the following description:\n\n{description}"
+    cache_key = make_cache_key(message, CODE_MODEL, llm_config.get("temperature"))
+    cached_code = result_cache.get(cache_key)
+    if cached_code is not None:
+        return cached_code, consume_stream([cached_code], on_text, on_block)
 
-# File upload for flowchart
-uploaded_file = st.file_uploader("Upload a flowchart image (PNG, JPG, etc.):", type=["png", "jpg", "jpeg"])
+    chunks = get_router().stream_chat(
+        [{"role": "system", "content": CODE_GENERATOR_SYSTEM_MESSAGE}, {"role": "user", "content": message}],
+        model=CODE_MODEL,
+    )
+    stream = consume_stream(chunks, on_text, on_block)
+    if not stream.text:
+        return "Code generation failed.", stream
+    result_cache.put(cache_key, stream.text)
+    return stream.text, stream
 
-if uploaded_file:
-    st.write("Analyzing the uploaded flowchart...")
+# Generation pipeline, run as a background job (no Streamlit calls in here)
+def run_generation_job(job, image_bytes, project_path, concurrent_pipeline=True, reuse_near_duplicates=False,
+                       stream_tokens=True, scaffold=None, repair_rounds=1, fanout=False, preview="dev"):
+    """
+    Flowchart image -> extracted text -> React code -> project setup -> running dev server.
+    With `fanout`, the extracted text is planned as components that are generated in parallel and wired together by App.js.
+    With preview="static", the project gets a production build served by the shared static server instead of a dev server.
+    """
+    timer = StageTimer()
+    result = {"project_path": project_path}
+    scaffold_future = None
+    if concurrent_pipeline:
+        # Project setup does not depend on the LLM output, so start it right away
+        scaffold_future = timer.run_in_background("scaffold", initialize_react_project, project_path, scaffold)
 
     # Step 1: Analyze flowchart with CrewAI
-    flowchart_image = Image.open(BytesIO(uploaded_file.read()))
-    extracted_text = extract_from_flowchart(flowchart_image)
-    st.write("Extracted Text from Flowchart:")
-    st.write(extracted_text)
+    job.report("image preprocess", "Analyzing the uploaded flowchart...")
+    with timer.stage("image preprocess"):
+        prepared = preprocess_flowchart(image_bytes)
+        flowchart_image = prepared.image
+        image_hash = image_fingerprint(flowchart_image)
+        duplicate_of = near_duplicates.canonical(prepared.phash, image_hash)
+    result["image"] = {
+        "original_size": prepared.original_size, "size": prepared.size, "mode": flowchart_image.mode,
+        "original_bytes": prepared.original_bytes, "processed_bytes": prepared.processed_bytes,
+        "elapsed_s": prepared.elapsed_s,
+    }
+    result["near_duplicate"] = duplicate_of != image_hash
+    if result["near_duplicate"] and reuse_near_duplicates:
+        image_hash = duplicate_of
+    job.check_cancelled()
+
+    job.report("vision extraction", "Extracting text from the flowchart...")
+    with timer.stage("vision extraction"):
+        extracted_text = extract_from_flowchart(flowchart_image, image_hash=image_hash)
+    result["extracted_text"] = extracted_text
+    job.check_cancelled()
+
+    # With a dev server already up, files are pushed into it (HMR) instead of restarting it;
+    # remember its compile count so compiles triggered by streamed writes are waited for too
+    running_server = supervisor.get(project_path)
+    compile_mark = running_server.compile_count if running_server is not None else None
+
+    # The description the current App.js was generated from (single-call runs only; fan-out keeps its own plan)
+    previous = load_state(project_path)
+    previous_app = read_previous_file(project_path, previous, "src/App.js") if previous and not previous.get("components") else None
+    node_changes = None
+    if extracted_text and previous_app is not None and previous.get("description") is not None:
+        node_changes = description_changes(previous["description"], extracted_text)
 
     # Step 2: Generate React code with AutoGen
     if extracted_text:
-        st.write("Generating React code from extracted text...")
-        react_code = generate_react_code(extracted_text)
-        st.write("Generated React Code:")
-        st.code(react_code)
+        job.report("code generation", "Generating React code from extracted text...")
+        with timer.stage("code generation"):
+            fanned = None
+            if fanout:
+                # One planning call on the extracted text, then one (shorter) completion per component, concurrently
+                finished = []
+
+                def on_component(outcome):
+                    finished.append(outcome["path"])
+                    job.set_live(files=list(finished))
+
+                fanned = generate_fanout(
+                    router_completion(CODE_MODEL, llm_config.get("temperature")), description=extracted_text,
+                    project_dir=project_path, repair_rounds=repair_rounds, on_component=on_component,
+                )
+            incremental_code = None
+            if node_changes is not None and not (fanned is not None and fanned.files):
+                # Unchanged description: App.js stays as it is; otherwise only the changed lines go to the model
+                incremental_code = update_react_code(previous_app, node_changes) if node_changes else previous_app
+            if fanned is not None and fanned.files:
+                react_code = "\n\n".join(f"// filename: {path}\n{code}" for path, code in fanned.files.items())
+                result["fanout"] = fanout_report(fanned)
+            elif incremental_code is not None:
+                react_code = incremental_code
+                result["incremental"] = {"changes": node_changes}
+            elif stream_tokens:
+                # Files are written (and shown) as soon as their code block closes, before the model finishes
+                def ensure_scaffold():
+                    # The scaffold needs an empty directory, so it must finish before the first file lands
+                    if scaffold_future is not None:
+                        scaffold_future.result()
+                    else:
+                        with timer.stage("scaffold"):
+                            result["init_output"] = initialize_react_project(project_path, scaffold)
+
+                # Blocks that do not parse are held back; App.js is written after the repair round below
+                writer = ProgressiveWriter(
+                    project_path, before_first_write=ensure_scaffold,
+                    validate=lambda path, code: validator.validate(code, path, project_path).ok,
+                )
+
+                def on_block(block):
+                    if writer(block):
+                        job.set_live(files=list(writer.written))
+
+                react_code, stream = stream_react_code(
+                    extracted_text,
+                    on_text=lambda text, partial: job.set_live(text=text[-4000:]),
+                    on_block=on_block,
+                )
+                result["streaming"] = {
+                    "first_token_s": stream.first_token_s,
+                    "first_partial_code_s": stream.first_partial_code_s,
+                    "first_code_s": stream.first_code_s,
+                    "total_s": stream.total_s,
+                    "files_written_while_streaming": writer.written,
+                }
+            else:
+                react_code = generate_react_code(extracted_text)
+        result["react_code"] = react_code
+        job.check_cancelled()
+
+        if "fanout" in result:
+            # Components were already checked and repaired one by one; App.js is assembled, not generated
+            files = fanned.files
+            app_code = files["src/App.js"]
+        elif result.get("incremental") and not node_changes:
+            # Kept from the previous run as it is on disk, so nothing to check or repair
+            app_code = react_code
+            files = {os.path.join("src", "App.js"): app_code}
+        else:
+            # Syntax-check App.js before anything reaches the dev server; parser errors go back to the generator once
+            app_code = select_app_code(parse_code_blocks(react_code)) or react_code
+            job.report("validate", "Checking the generated code for syntax errors...")
+            with timer.stage("validate"):
+                app_code, result["validation"] = validate_with_repair(
+                    app_code, "src/App.js", project_path, repair_react_code, rounds=repair_rounds,
+                )
+            files = {os.path.join("src", "App.js"): app_code}
+        job.check_cancelled()
+
+        # Step 3: Setup environment and run the server
+        job.report("scaffold", "Setting up React environment...")
+        if scaffold_future is not None:
+            # Join the background setup before writing any files
+            result["init_output"] = scaffold_future.result()
+        elif "init_output" not in result:
+            with timer.stage("scaffold"):
+                result["init_output"] = initialize_react_project(project_path, scaffold)
+        job.check_cancelled()
+
+        if preview == "dev" and compile_mark is not None and supervisor.get(project_path) is not None:
+            # Hot path: write App.js into the running project and wait for the recompile
+            job.report("hot update", "Pushing the generated code into the running dev server...")
+            with timer.stage("hot update"):
+                update = supervisor.update(project_path, files, since=compile_mark)
+                if "fanout" in result:
+                    # App.js no longer imports dropped components, so their files can go
+                    remove_project_files(project_path, fanned.removed)
+            result["hot_update"] = {key: value for key, value in update.items() if key != "server"}
+            result["update_status"] = "App.js hot-reloaded." if update["compiled"] else "App.js written, but the dev server did not recompile cleanly."
+            result["server_output"] = f"Development server at {update['server']['url']} kept running (pid {update['server']['pid']})."
+        else:
+            job.report("write App.js", "Updating App.js with generated code...")
+            with timer.stage("write App.js"):
+                if "fanout" in result:
+                    result["update_status"] = write_project_files(project_path, files, fanned.removed)
+                else:
+                    result["update_status"] = update_app_js(project_path, app_code)
+            job.check_cancelled()
+
+            if preview == "static":
+                job.report("production build", "Building and compressing the app for the static preview...")
+                with timer.stage("production build"):
+                    result["server_output"], published = publish_preview(project_path)
+                result["server_url"] = published["url"] if published is not None else None
+            else:
+                job.report("dev server", "Starting the React development server...")
+                with timer.stage("dev server"):
+                    result["server_output"] = start_react_server(project_path)
+        if "server_url" not in result:
+            server = supervisor.get(project_path)
+            result["server_url"] = server.url if server is not None else None
+
+        # Record what this run was made from so the next upload of an edited flowchart only regenerates what changed
+        state = fanned.state if "fanout" in result else {
+            "source": sha256(extracted_text), "description": extracted_text, "files": file_hashes(files),
+        }
+        save_state(project_path, state)
+
+    result["timing"] = timer.summary()
+    if extracted_text:
+        # Keep the generated files so this result can be restored later without calling the model
+        recorded = dict(files, **{STATE_FILE: json.dumps(state, indent=2)})
+        result["history_id"] = history.record(
+            recorded, image_hash=image_hash, project_path=project_path, extracted_text=extracted_text,
+            model=CODE_MODEL, timings=result["timing"], job_id=job.id,
+            meta={"vision_model": VISION_MODEL, "scaffold": scaffold or DEFAULT_SCAFFOLD, "fanout": "fanout" in result},
+        )
+    job.report("done", "Finished")
+    return result
 
-        # Step 3: Setup environment and run the server using CrewAI
-        st.write("Setting up React environment...")
-        init_output = initialize_react_project(project_path)
-        st.code(init_output)
 
-        st.write("Updating App.js with generated code...")
-        update_status = update_app_js(project_path, react_code)
-        st.success(update_status)
+def render_generation_result(result):
+    image = result["image"]
+    st.caption(f"Image {image['original_size'][0]}x{image['original_size'][1]} → {image['size'][0]}x{image['size'][1]} {image['mode']}, "
+               f"{image['original_bytes'] / 1024:.0f} KB → {image['processed_bytes'] / 1024:.0f} KB "
+               f"(saved {(image['original_bytes'] - image['processed_bytes']) / 1024:.0f} KB in {image['elapsed_s'] * 1000:.0f} ms)")
+    if result["near_duplicate"]:
+        st.info("This looks like a flowchart that was uploaded before.")
+    st.write("Extracted Text from Flowchart:")
+    st.write(result["extracted_text"])
+
+    if result.get("streaming"):
+        render_streaming_metrics(result["streaming"])
+    if result.get("fanout"):
+        render_fanout(result["fanout"])
+    if result.get("incremental"):
+        render_incremental(result["incremental"])
+    if result.get("validation"):
+        render_validation(result["validation"])
 
-        st.write("Starting the React development server...")
-        server_output = start_react_server(project_path)
-        st.code(server_output)
-        st.components.v1.iframe("http://localhost:3000", width=800, height=600)
+    if result["extracted_text"]:
+        st.write("Generated React Code:")
+        st.code(result["react_code"])
+        st.code(result["init_output"])
+        st.success(result["update_status"])
+        if result.get("hot_update"):
+            render_hot_update(result["hot_update"])
+        st.code(result["server_output"])
+        if result["server_url"]:
+            st.components.v1.iframe(result["server_url"], width=800, height=600)
     else:
         st.error("Failed to extract meaningful text from the uploaded flowchart.")
 
+    timing = result["timing"]
+    st.write("Stage timings:")
+    st.table(timing["stages"])
+    st.caption(f"Wall clock {timing['wall_clock_s']:.2f}s vs {timing['sequential_s']:.2f}s back to back "
+               f"(saved {timing['saved_s']:.2f}s)")
+
+
+# Streamlit UI
+def main():
+    queue = get_job_queue()
+    # Prometheus endpoint, only when METRICS_PORT is set
+    start_metrics_server()
+    st.title("Dynamic React Application Generator")
+
+    # File upload for flowchart
+    uploaded_file = st.file_uploader("Upload a flowchart image (PNG, JPG, etc.):", type=["png", "jpg", "jpeg"])
+
+    # Concurrent mode starts project setup while the model calls are in flight
+    concurrent_pipeline = st.checkbox("Set up the React project while the model is running", value=True)
+    reuse_near_duplicates = st.checkbox("Reuse results for near-duplicate flowcharts", value=False)
+    stream_tokens = st.checkbox("Stream model output and write files as they complete", value=True)
+    # Several short completions in parallel instead of one long one (large flowcharts, truncated answers)
+    fanout = st.checkbox("Generate components in parallel", value=False)
+    # Vite starts and rebuilds much faster than create-react-app's webpack dev server
+    scaffold = st.selectbox("Project template", list(scaffold_pools), index=list(scaffold_pools).index(DEFAULT_SCAFFOLD))
+    # A production build on the shared static server costs no Node process per preview, but has no hot reload
+    preview = st.radio("Preview with", ["dev", "static"], horizontal=True,
+                       format_func={"dev": "Dev server (hot reload)", "static": "Production build (static)"}.get)
+
+    # Submit each upload once; later reruns only poll the job
+    if uploaded_file and st.session_state.get("submitted_upload") != uploaded_file.file_id:
+        job_id = queue.submit(
+            run_generation_job, uploaded_file.getvalue(), project_path, concurrent_pipeline, reuse_near_duplicates,
+            stream_tokens, scaffold, fanout=fanout, preview=preview,
+            params={"project_path": project_path, "image": uploaded_file.name, "scaffold": scaffold, "fanout": fanout,
+                    "preview": preview},
+        )
+        st.session_state["submitted_upload"] = uploaded_file.file_id
+        track_job(job_id)
+
+    job_id = current_job_id()
+    if job_id:
+        render_job(queue, job_id, render_generation_result)
+
+    cache_stats = result_cache.stats()
+    st.caption(f"LLM result cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses, {cache_stats['entries']} entries")
+
+    with st.sidebar:
+        render_job_history(queue)
+        render_trace_panel(job_id)
+        render_history(project_path)
+
+        # Running development servers
+        st.header("Dev servers")
+        for server_status in supervisor.status():
+            st.write(f"{server_status['workdir']} → {server_status['url']} ({'running' if server_status['running'] else 'stopped'})")
+            if server_status["running"] and st.button("Stop", key=f"stop-{server_status['port']}"):
+                supervisor.stop(server_status["workdir"])
+
+        # Production builds on the shared static server
+        st.header("Static previews")
+        for preview_status in previews.status():
+            st.write(f"{preview_status['build_dir']} → {preview_status['url']}")
+
+
+if __name__ == "__main__":
+    # `streamlit run app.py` executes this file as __main__; importing it skips the UI
+    main()
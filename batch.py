@@ -0,0 +1,153 @@
+"""
+Headless batch generation: turn a directory of flowchart images into React projects.
+
+Usage:
+    python batch.py flowcharts/ output/ --workers 4
+    python batch.py flowcharts/ output/ --scaffold --force --summary summary.json
+    python batch.py flowcharts/ output/ --scaffold vite
+
+Each image becomes <output>/<image name>/ with the generated src/App.js. Images whose
+project was already generated from the same image content are skipped unless --force is given.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from apis import build_app_code_generator, generate_code_from_flowchart, update_app_js_with_generated_code, repair_generated_code, VISION_MODEL
+from jsx_validator import validate_with_repair
+from scaffold_pool import get_scaffold_pool, scaffold_pools, DEFAULT_SCAFFOLD
+from image_preprocess import preprocess_flowchart
+from llm_cache import image_fingerprint
+from history import history
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+# Written next to each generated project to detect up-to-date outputs
+MANIFEST_NAME = ".flowchart-batch.json"
+
+_local = threading.local()
+
+
+def _agent():
+    # CrewAI agents hold per-run state, so every worker thread gets its own
+    if not hasattr(_local, "agent"):
+        _local.agent = build_app_code_generator(verbose=False)
+    return _local.agent
+
+
+def find_images(input_dir):
+    return sorted(
+        os.path.join(input_dir, name)
+        for name in os.listdir(input_dir)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def is_up_to_date(project_dir, image_hash):
+    """True if project_dir already holds code generated from an image with this content hash."""
+    try:
+        with open(os.path.join(project_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return manifest.get("image_sha256") == image_hash and os.path.exists(os.path.join(project_dir, "src", "App.js"))
+
+
+def process_image(image_path, output_dir, scaffold=None, force=False):
+    """Generate one project and return its summary record."""
+    name = os.path.splitext(os.path.basename(image_path))[0]
+    project_dir = os.path.join(output_dir, name)
+    record = {"image": image_path, "project": project_dir, "status": None, "latency_s": 0.0,
+              "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    start = time.perf_counter()
+    try:
+        with open(image_path, "rb") as f:
+            image_bytes = f.read()
+        image_hash = hashlib.sha256(image_bytes).hexdigest()
+        if not force and is_up_to_date(project_dir, image_hash):
+            record["status"] = "skipped"
+            return record
+
+        usage = {}
+        flowchart_image = preprocess_flowchart(image_bytes).image
+        generated_code = generate_code_from_flowchart(flowchart_image, usage=usage, agent=_agent())
+        record.update({key: usage.get(key, 0) for key in ("prompt_tokens", "completion_tokens", "total_tokens")})
+        if not generated_code or generated_code == "No valid code block found.":
+            record["status"] = "failed"
+            record["error"] = "No valid code block found."
+            return record
+
+        # One repair round for code that does not parse, before it is written anywhere
+        generated_code, validation = validate_with_repair(generated_code, "src/App.js", project_dir, repair_generated_code)
+        record["syntax_ok"] = validation["ok"]
+        record["repair_rounds"] = validation["repair_rounds"]
+
+        if scaffold:
+            get_scaffold_pool(scaffold).acquire(project_dir)
+        update_status = update_app_js_with_generated_code(project_dir, generated_code)
+        if update_status.startswith("Error"):
+            record["status"] = "failed"
+            record["error"] = update_status
+            return record
+
+        with open(os.path.join(project_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump({"image": os.path.abspath(image_path), "image_sha256": image_hash, "generated_at": time.time()}, f, indent=2)
+        record["status"] = "cached" if usage.get("cached") else "generated"
+        record["history_id"] = history.record(
+            {os.path.join("src", "App.js"): generated_code}, image_hash=image_fingerprint(flowchart_image),
+            project_path=project_dir, model=VISION_MODEL, timings={"latency_s": round(time.perf_counter() - start, 3)},
+            meta={"scaffold": scaffold, "image": os.path.abspath(image_path), "batch": True},
+        )
+        return record
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = str(e)
+        return record
+    finally:
+        record["latency_s"] = round(time.perf_counter() - start, 3)
+
+
+def run_batch(input_dir, output_dir, workers=4, scaffold=None, force=False):
+    images = find_images(input_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        records = list(executor.map(lambda path: process_image(path, output_dir, scaffold, force), images))
+    statuses = [record["status"] for record in records]
+    return {
+        "input_dir": os.path.abspath(input_dir),
+        "output_dir": os.path.abspath(output_dir),
+        "workers": workers,
+        "wall_clock_s": round(time.perf_counter() - start, 3),
+        "counts": {status: statuses.count(status) for status in sorted(set(statuses))},
+        "total_tokens": sum(record["total_tokens"] for record in records),
+        "images": records,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input_dir", help="Directory containing flowchart images")
+    parser.add_argument("output_dir", help="Directory to write one project per image into")
+    parser.add_argument("--workers", type=int, default=4, help="Maximum concurrent generations")
+    parser.add_argument("--scaffold", nargs="?", const=DEFAULT_SCAFFOLD, default=None, choices=list(scaffold_pools),
+                        help="Scaffold a full React project (from the scaffold pool) for each image, optionally naming the template")
+    parser.add_argument("--force", action="store_true", help="Regenerate images whose outputs are already up to date")
+    parser.add_argument("--summary", default=None, help="Path of the JSON summary (default: <output_dir>/batch_summary.json)")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(args.input_dir, args.output_dir, args.workers, args.scaffold, args.force)
+    summary_path = args.summary or os.path.join(args.output_dir, "batch_summary.json")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    print(json.dumps({key: value for key, value in summary.items() if key != "images"}, indent=2))
+    print(f"Summary written to {summary_path}")
+    return 0 if "failed" not in summary["counts"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
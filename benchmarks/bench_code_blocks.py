@@ -0,0 +1,83 @@
+"""
+Micro-benchmark for fenced-code-block extraction on large multi-file LLM responses.
+
+Compares the shared single-pass parser (whole text and streamed in small chunks) with the
+two extraction approaches it replaced.
+
+Usage:
+    python benchmarks/bench_code_blocks.py --files 200 --lines 80
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from code_blocks import CodeBlockParser, parse_code_blocks
+
+
+def make_response(files, lines):
+    parts = ["Here is the complete project:\n"]
+    for i in range(files):
+        parts.append(f"\n### Component {i}\n\n```javascript\n// filename: src/components/Component{i}.js\n")
+        parts.append("".join(f"    const value{j} = {{ padding: '{j}px', color: '#{j:06x}' }};\n" for j in range(lines)))
+        parts.append("```\n")
+    return "".join(parts)
+
+
+def legacy_find_rfind(text):
+    start_idx = text.find("```javascript")
+    end_idx = text.rfind("```")
+    if start_idx != -1 and end_idx != -1 and start_idx < end_idx:
+        return [text[start_idx + len("```javascript"):end_idx].strip()]
+    return []
+
+
+def legacy_regex(text):
+    blocks = []
+    for block in re.finditer(r'[\w-]*\n(.*?)', text, re.DOTALL):
+        code = block.group(1)
+        if code.strip() and re.search(r'filename:\s*([\w/.-]+)', code.split('\n')[0]):
+            blocks.append('\n'.join(code.split('\n')[1:]).strip())
+    return blocks
+
+
+def streamed(text, chunk_size):
+    parser = CodeBlockParser()
+    blocks = []
+    for i in range(0, len(text), chunk_size):
+        blocks.extend(parser.feed(text[i:i + chunk_size]))
+    blocks.extend(parser.close())
+    return blocks
+
+
+def bench(label, fn, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - start)
+    mb_per_s = len(text) / best / 1e6 if best else float("inf")
+    print(f"{label:<28} {best * 1000:9.2f} ms  {mb_per_s:8.1f} MB/s  blocks={len(result)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=80)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=16, help="Chunk size for the streaming run")
+    args = parser.parse_args()
+
+    text = make_response(args.files, args.lines)
+    print(f"response: {len(text) / 1e6:.2f} MB, {args.files} files x {args.lines} lines")
+    bench("single-pass parser", parse_code_blocks, text, args.repeat)
+    bench(f"streamed ({args.chunk_size}-char chunks)", lambda t: streamed(t, args.chunk_size), text, args.repeat)
+    bench("legacy find/rfind", legacy_find_rfind, text, args.repeat)
+    bench("legacy regex", legacy_regex, text, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
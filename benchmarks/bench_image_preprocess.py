@@ -0,0 +1,68 @@
+"""
+Measure what the vision-input preprocessing saves.
+
+For every image in a directory (or a set of generated flowcharts when no directory is given)
+prints original vs. processed payload size, resolution, colour mode and preprocessing time.
+The base64 column is what actually travels in the vision request.
+
+Usage:
+    python benchmarks/bench_image_preprocess.py [image_dir]
+"""
+import os
+import sys
+import argparse
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from image_preprocess import preprocess_flowchart
+
+
+def synthetic_flowcharts():
+    """A screenshot-like PNG and a phone-photo-like JPEG of the same diagram."""
+    image = Image.new("RGB", (4032, 3024), "white")
+    draw = ImageDraw.Draw(image)
+    for i in range(6):
+        x, y = 600 + (i % 3) * 1000, 700 + (i // 3) * 1000
+        draw.rectangle((x, y, x + 600, y + 300), outline="black", width=10)
+        draw.text((x + 40, y + 120), f"Step {i + 1}", fill=(20, 20, 160))
+        if i % 3:
+            draw.line((x - 400, y + 150, x, y + 150), fill="black", width=8)
+    png, jpeg = BytesIO(), BytesIO()
+    image.save(png, format="PNG")
+    image.save(jpeg, format="JPEG", quality=95)
+    return [("synthetic.png", png.getvalue()), ("synthetic-photo.jpg", jpeg.getvalue())]
+
+
+def load_directory(path):
+    return [
+        (name, open(os.path.join(path, name), "rb").read())
+        for name in sorted(os.listdir(path))
+        if name.lower().endswith((".png", ".jpg", ".jpeg", ".webp"))
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("image_dir", nargs="?", help="Directory with flowchart images (default: synthetic images)")
+    args = parser.parse_args()
+
+    images = load_directory(args.image_dir) if args.image_dir else synthetic_flowcharts()
+    total_before = total_after = 0
+    print(f"{'image':<28}{'before':>10}{'after':>10}{'base64':>10}  {'resolution':<24}{'mode':<6}{'time':>8}")
+    for name, data in images:
+        result = preprocess_flowchart(data)
+        total_before += result.original_bytes
+        total_after += result.processed_bytes
+        resolution = f"{result.original_size[0]}x{result.original_size[1]}->{result.size[0]}x{result.size[1]}"
+        print(f"{name[:27]:<28}{result.original_bytes / 1024:>9.0f}K{result.processed_bytes / 1024:>9.0f}K"
+              f"{(result.processed_bytes + 2) // 3 * 4 / 1024:>9.0f}K  {resolution:<24}{result.image.mode:<6}"
+              f"{result.elapsed_s * 1000:>6.0f}ms")
+    if total_before:
+        print(f"total: {total_before / 1024:.0f}K -> {total_after / 1024:.0f}K ({100 * (1 - total_after / total_before):.0f}% smaller)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,465 @@
+"""
+End-to-end benchmark of the flowchart -> code -> scaffold -> dev server pipeline.
+
+The real functions run with the external pieces swapped out:
+  * a local OpenAI-compatible stub (benchmarks/stub_llm.py) instead of Groq
+  * generated fixture flowchart images (or --fixtures DIR with your own)
+  * a stubbed npm/npx (benchmarks/stub_npm.py) first on PATH
+
+Reports p50/p95 per stage (generate_code_from_flowchart, stream_code_from_flowchart,
+fanout_from_flowchart, extract_from_flowchart, generate_react_code, save_code_blocks,
+update_app_js, run_app), end-to-end job latency of parallel per-component generation (fan-out)
+against the single-call path, and throughput of whole generation jobs at each --concurrency level. Stages whose framework
+(crewai, autogen) is not installed are reported as skipped. Results are written to
+benchmarks/results/ and compared with the previous run, flagging p50 regressions.
+
+Usage:
+    python benchmarks/bench_pipeline.py --iterations 10 --concurrency 1 4 --jobs 8
+    python benchmarks/bench_pipeline.py --first-token 0 --tokens-per-second 0 --npm-start 0.2
+    python benchmarks/bench_pipeline.py --components 8 --iterations 3   # fan-out on a larger app
+"""
+import os
+import sys
+import json
+import time
+import glob
+import shutil
+import argparse
+import importlib.util
+import tempfile
+import traceback
+import subprocess
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from stub_llm import StubLLMServer, CODE_RESPONSE, DESCRIPTION_RESPONSE
+
+DEFAULT_RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+# A p50 this much slower than the previous run is reported as a regression
+REGRESSION_THRESHOLD = 0.20
+# ...unless it is within timer noise
+REGRESSION_MIN_DELTA_S = 0.005
+
+
+def percentile(samples, q):
+    """Linearly interpolated percentile, q in [0, 100]."""
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * q / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def describe(samples):
+    return {
+        "n": len(samples),
+        "p50_s": round(percentile(samples, 50), 4) if samples else None,
+        "p95_s": round(percentile(samples, 95), 4) if samples else None,
+        "mean_s": round(sum(samples) / len(samples), 4) if samples else None,
+    }
+
+
+def make_fixture_images(directory, count):
+    """Draw simple box-and-arrow flowcharts of different sizes and layouts."""
+    from PIL import Image, ImageDraw
+
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index in range(count):
+        width, height = 800 + 200 * (index % 3), 1000 + 150 * (index % 4)
+        image = Image.new("RGB", (width, height), "white")
+        draw = ImageDraw.Draw(image)
+        steps = 3 + index % 4
+        box_w, box_h = width // 3, height // (steps * 2)
+        left = (width - box_w) // 2
+        for step in range(steps):
+            top = box_h // 2 + step * 2 * box_h
+            shape = draw.ellipse if step in (0, steps - 1) else draw.rectangle
+            shape((left, top, left + box_w, top + box_h), outline="black", width=3, fill=(230, 240, 255))
+            draw.text((left + 16, top + box_h // 2 - 6), f"Step {step + 1} of fixture {index}", fill="black")
+            if step < steps - 1:
+                x = width // 2
+                draw.line((x, top + box_h, x, top + 2 * box_h), fill="black", width=3)
+                draw.polygon([(x - 8, top + 2 * box_h - 12), (x + 8, top + 2 * box_h - 12), (x, top + 2 * box_h)], fill="black")
+        path = os.path.join(directory, f"fixture-{index:02d}.png")
+        image.save(path)
+        paths.append(path)
+    return paths
+
+
+def install_stub_npm(bin_dir):
+    """Put npm/npx wrappers that exec stub_npm.py at the front of PATH."""
+    os.makedirs(bin_dir, exist_ok=True)
+    stub = os.path.join(BENCH_DIR, "stub_npm.py")
+    for tool in ("npm", "npx"):
+        path = os.path.join(bin_dir, tool)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{stub}" {tool} "$@"\n')
+        os.chmod(path, 0o755)
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ.get("PATH", "")
+
+
+def configure_environment(scratch, llm_url, args):
+    """Point every module at the stubs and at scratch directories; must run before they are imported."""
+    install_stub_npm(os.path.join(scratch, "bin"))
+    os.environ["OAI_CONFIG_LIST"] = json.dumps([{
+        "model": "stub", "api_key": "bench", "api_type": "openai", "base_url": llm_url,
+        # Measure the pipeline, not the provider's rate limits
+        "requests_per_minute": 1_000_000, "tokens_per_minute": 1_000_000_000,
+    }])
+    os.environ["SCAFFOLD_POOL_DIR"] = os.path.join(scratch, "scaffold-pool")
+    os.environ["LLM_CACHE_PATH"] = os.path.join(scratch, "llm_results.sqlite3")
+    os.environ["JOB_STORE_DIR"] = os.path.join(scratch, "jobs")
+    os.environ["REACT_SCAFFOLD"] = "cra"
+    os.environ["STUB_NPM_INSTALL_S"] = str(args.npm_install)
+    os.environ["STUB_NPM_START_S"] = str(args.npm_start)
+    os.environ["STUB_NPM_REBUILD_S"] = str(args.npm_rebuild)
+    # new.py creates its hard-coded project folder relative to the working directory
+    os.chdir(scratch)
+
+
+def load_modules():
+    """Import the entry points; a missing framework only disables the stages that need it."""
+    modules, missing = {}, {}
+    for name in ("apis", "app", "new"):
+        try:
+            modules[name] = __import__(name)
+        except ImportError as e:
+            missing[name] = str(e)
+    return modules, missing
+
+
+def unwrap(tool):
+    # AutoGen's register_for_llm may wrap the function in a Tool object
+    return getattr(tool, "func", tool)
+
+
+class StageRunner:
+    """Times one pipeline function per call, clearing the LLM cache so every call does the work."""
+
+    def __init__(self, modules, scratch, fixtures, warm_cache=False):
+        self.modules = modules
+        self.scratch = scratch
+        self.fixtures = fixtures
+        self.warm_cache = warm_cache
+        from llm_cache import result_cache
+        from image_preprocess import preprocess_flowchart
+        self.result_cache = result_cache
+        self.prepared = [preprocess_flowchart(open(path, "rb").read()) for path in fixtures]
+        self.project_dir = os.path.join(scratch, "stage-project")
+
+    def stages(self):
+        apis, app, new = (self.modules.get(name) for name in ("apis", "app", "new"))
+        # name: (module, module name, framework imported lazily by the stage, runner)
+        return {
+            "generate_code_from_flowchart": (apis, "apis", "crewai", self.generate_code_from_flowchart),
+            "stream_code_from_flowchart": (apis, "apis", None, self.stream_code_from_flowchart),
+            "fanout_from_flowchart": (apis, "apis", None, self.fanout_from_flowchart),
+            "extract_from_flowchart": (app, "app", "crewai", self.extract_from_flowchart),
+            "generate_react_code": (app, "app", "autogen", self.generate_react_code),
+            "save_code_blocks": (new, "new", None, self.save_code_blocks),
+            "update_app_js": (app, "app", None, self.update_app_js),
+            "run_app": (new, "new", None, self.run_app),
+        }
+
+    def prepare(self):
+        """Scaffold the project the file-writing stages work on (not timed)."""
+        from scaffold_pool import scaffold_pool
+        scaffold_pool.acquire(self.project_dir)
+        if "new" in self.modules:
+            self.modules["new"].default_path = self.project_dir + os.sep
+            self.modules["new"].workdir = self.project_dir
+
+    def before_call(self):
+        if not self.warm_cache:
+            self.result_cache.clear()
+
+    def generate_code_from_flowchart(self, iteration):
+        prepared = self.prepared[iteration % len(self.prepared)]
+        code = self.modules["apis"].generate_code_from_flowchart(prepared.image)
+        assert code and code != "No valid code block found.", code
+
+    def stream_code_from_flowchart(self, iteration):
+        from llm_cache import image_fingerprint
+        prepared = self.prepared[iteration % len(self.prepared)]
+        code, _ = self.modules["apis"].stream_code_from_flowchart(prepared.data, prepared.mime_type, image_fingerprint(prepared.image))
+        assert code and code != "No valid code block found.", code
+
+    def fanout_from_flowchart(self, iteration):
+        from llm_cache import image_fingerprint
+        from fanout import generate_fanout, router_completion
+        prepared = self.prepared[iteration % len(self.prepared)]
+        fanned = generate_fanout(router_completion(self.modules["apis"].VISION_MODEL),
+                                 image=(prepared.data, prepared.mime_type, image_fingerprint(prepared.image)))
+        assert fanned.files and not any(c["error"] for c in fanned.components), fanned.components
+
+    def extract_from_flowchart(self, iteration):
+        prepared = self.prepared[iteration % len(self.prepared)]
+        assert self.modules["app"].extract_from_flowchart(prepared.image)
+
+    def generate_react_code(self, iteration):
+        code = self.modules["app"].generate_react_code(f"{DESCRIPTION_RESPONSE}\n(iteration {iteration})")
+        assert code != "Code generation failed."
+
+    def save_code_blocks(self, iteration):
+        new = self.modules["new"]
+        # A fresh message per iteration, with changed content so the files are actually rewritten
+        new.groupchat.messages.append({"role": "user", "name": "Project_Code_Generator",
+                                       "content": CODE_RESPONSE.replace("Flowchart Counter", f"Flowchart Counter {iteration}")})
+        status, message = unwrap(new.save_code_blocks)()
+        assert status == 0, message
+
+    def update_app_js(self, iteration):
+        message = self.modules["app"].update_app_js(self.project_dir, f"// iteration {iteration}\n" + CODE_RESPONSE)
+        assert not message.startswith("Error"), message
+
+    def run_app(self, iteration):
+        status, message = unwrap(self.modules["new"].run_app)()
+        assert status == 0, message
+
+    def after_call(self, name):
+        if name == "run_app":
+            # Every iteration measures a cold start of the (stub) dev server
+            from dev_server import supervisor
+            supervisor.stop(self.project_dir)
+
+
+def bench_stages(runner, iterations, missing):
+    results = {}
+    runner.prepare()
+    for name, (module, module_name, framework, fn) in runner.stages().items():
+        if module is None:
+            reason = f"{module_name}.py could not be imported: {missing.get(module_name)}"
+        elif framework and importlib.util.find_spec(framework) is None:
+            reason = f"{framework} is not installed"
+        else:
+            reason = None
+        if reason:
+            results[name] = {"skipped": reason}
+            print(f"{name:<30} skipped ({reason})")
+            continue
+        samples, errors = [], []
+        for iteration in range(iterations):
+            runner.before_call()
+            start = time.perf_counter()
+            try:
+                fn(iteration)
+                samples.append(time.perf_counter() - start)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+            finally:
+                runner.after_call(name)
+        results[name] = dict(describe(samples), errors=len(errors), first_error=errors[0] if errors else None)
+        stats = results[name]
+        if samples:
+            print(f"{name:<30} n={stats['n']:<3} p50={stats['p50_s']:.3f}s p95={stats['p95_s']:.3f}s errors={len(errors)}")
+        else:
+            print(f"{name:<30} all {len(errors)} calls failed: {errors[0]}")
+    return results
+
+
+def bench_throughput(modules, scratch, fixtures, concurrency_levels, jobs, warm_cache=False):
+    """Run whole generation jobs (apis.run_generation_job, streaming) on a JobQueue with N workers."""
+    if "apis" not in modules:
+        print("throughput skipped (apis.py could not be imported)")
+        return []
+    from jobs import JobQueue
+    from dev_server import supervisor
+    from llm_cache import result_cache
+
+    images = [open(path, "rb").read() for path in fixtures]
+    levels = []
+    for workers in concurrency_levels:
+        if not warm_cache:
+            result_cache.clear()
+        queue = JobQueue(store_dir=os.path.join(scratch, f"jobs-{workers}"), workers=workers)
+        start = time.perf_counter()
+        finished = run_jobs(queue, modules["apis"].run_generation_job, [
+            ((images[i % len(images)], os.path.join(scratch, f"throughput-{workers}-{i}"), True, False, True, "cra"), {})
+            for i in range(jobs)
+        ])
+        wall = time.perf_counter() - start
+        supervisor.stop_all()
+
+        latencies = [job["finished_at"] - job["created_at"] for job in finished]
+        succeeded = [job for job in finished if job["status"] == "succeeded"]
+        stage_samples = {}
+        for job in succeeded:
+            for stage in job["result"]["timing"]["stages"]:
+                stage_samples.setdefault(stage["stage"], []).append(stage["duration_s"])
+        level = {
+            "concurrency": workers,
+            "jobs": jobs,
+            "succeeded": len(succeeded),
+            "wall_clock_s": round(wall, 3),
+            "jobs_per_minute": round(60.0 * len(succeeded) / wall, 2) if wall else None,
+            "latency": describe(latencies),
+            "stages": {name: describe(samples) for name, samples in stage_samples.items()},
+            "first_error": next((job["error"] for job in finished if job["error"]), None),
+        }
+        levels.append(level)
+        print(f"concurrency={workers:<3} jobs={jobs} ok={len(succeeded)} wall={wall:.2f}s "
+              f"throughput={level['jobs_per_minute']} jobs/min p50={level['latency']['p50_s']}s p95={level['latency']['p95_s']}s")
+        if level["first_error"]:
+            print(f"  first error: {level['first_error']}")
+    return levels
+
+
+def run_jobs(queue, fn, jobs):
+    """Submit [(args, kwargs)] to the queue and wait for all of them; returns the finished job dicts."""
+    from jobs import FINISHED_STATUSES
+    job_ids = [queue.submit(fn, *args, **kwargs) for args, kwargs in jobs]
+    while any(queue.get(job_id)["status"] not in FINISHED_STATUSES for job_id in job_ids):
+        time.sleep(0.05)
+    return [queue.get(job_id) for job_id in job_ids]
+
+
+def bench_fanout(modules, scratch, fixtures, iterations, warm_cache=False):
+    """End-to-end latency of apis.run_generation_job with one streamed completion versus fan-out, one job at a time."""
+    if "apis" not in modules:
+        print("fan-out comparison skipped (apis.py could not be imported)")
+        return {}
+    from jobs import JobQueue
+    from dev_server import supervisor
+    from llm_cache import result_cache
+
+    images = [open(path, "rb").read() for path in fixtures]
+    queue = JobQueue(store_dir=os.path.join(scratch, "jobs-fanout"), workers=1)
+    modes = {}
+    for mode, fanout in (("single_call", False), ("fanout", True)):
+        latencies, errors = [], []
+        for i in range(iterations):
+            if not warm_cache:
+                result_cache.clear()
+            project = os.path.join(scratch, f"{mode}-{i}")
+            job, = run_jobs(queue, modules["apis"].run_generation_job,
+                            [((images[i % len(images)], project, True, False, True, "cra"), {"fanout": fanout})])
+            supervisor.stop(project)
+            if job["status"] == "succeeded" and (not fanout or job["result"].get("fanout")):
+                latencies.append(job["finished_at"] - job["started_at"])
+            else:
+                errors.append(job["error"] or "fan-out fell back to the single-call path")
+        modes[mode] = dict(describe(latencies), errors=len(errors), first_error=errors[0] if errors else None)
+        stats = modes[mode]
+        if latencies:
+            print(f"{mode:<30} n={stats['n']:<3} p50={stats['p50_s']:.3f}s p95={stats['p95_s']:.3f}s errors={len(errors)}")
+        else:
+            print(f"{mode:<30} all {len(errors)} jobs failed: {errors[0]}")
+    single, fanned = modes["single_call"].get("p50_s"), modes["fanout"].get("p50_s")
+    if single and fanned:
+        print(f"fan-out p50 is {single / fanned:.2f}x the speed of the single call ({fanned - single:+.3f}s)")
+    return modes
+
+
+def git_version():
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        return f"{sha}{'-dirty' if dirty else ''}" if sha else "unknown"
+    except OSError:
+        return "unknown"
+
+
+def compare_with_previous(results, results_dir):
+    """Print p50 changes against the most recent earlier result file."""
+    previous_files = sorted(glob.glob(os.path.join(results_dir, "pipeline-*.json")))
+    if not previous_files:
+        return
+    with open(previous_files[-1], "r", encoding="utf-8") as f:
+        previous = json.load(f)
+    print(f"\n== compared with {os.path.basename(previous_files[-1])} ({previous.get('version')}) ==")
+    pairs = [(name, stats, previous.get("stages", {}).get(name, {})) for name, stats in results["stages"].items()]
+    pairs += [(f"jobs ({mode})", stats, previous.get("fanout", {}).get(mode, {})) for mode, stats in results["fanout"].items()]
+    previous_levels = {level["concurrency"]: level for level in previous.get("throughput", [])}
+    for level in results["throughput"]:
+        pairs.append((f"jobs @ concurrency {level['concurrency']}", level["latency"],
+                      previous_levels.get(level["concurrency"], {}).get("latency", {})))
+    for name, stats, before in pairs:
+        now, then = stats.get("p50_s"), before.get("p50_s")
+        if now is None or not then:
+            continue
+        change = (now - then) / then
+        flag = "  REGRESSION" if change > REGRESSION_THRESHOLD and now - then > REGRESSION_MIN_DELTA_S else ""
+        print(f"{name:<30} p50 {then:.3f}s -> {now:.3f}s ({change:+.0%}){flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=10, help="Calls per stage")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4], help="Worker counts for the throughput run")
+    parser.add_argument("--jobs", type=int, default=8, help="Generation jobs per concurrency level")
+    parser.add_argument("--fixtures", default=None, help="Directory of flowchart images (default: generated)")
+    parser.add_argument("--fixture-count", type=int, default=4)
+    parser.add_argument("--first-token", type=float, default=0.3, help="Stub LLM seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0, help="Stub LLM generation speed (0 = instant)")
+    parser.add_argument("--components", type=int, default=3,
+                        help="Components in the stub's app; larger apps make the single-call answer longer")
+    parser.add_argument("--npm-install", type=float, default=0.2, help="Stub npm install seconds")
+    parser.add_argument("--npm-start", type=float, default=1.0, help="Stub dev server seconds to first compile")
+    parser.add_argument("--npm-rebuild", type=float, default=0.1, help="Stub dev server seconds per rebuild")
+    parser.add_argument("--warm-cache", action="store_true", help="Keep LLM results cached between calls")
+    parser.add_argument("--results-dir", default=DEFAULT_RESULTS_DIR)
+    parser.add_argument("--no-save", action="store_true", help="Print results without storing them")
+    args = parser.parse_args()
+    if os.name == "nt":
+        parser.error("the stubbed npm wrappers are POSIX shell scripts; run the benchmark under WSL or Linux/macOS")
+
+    results_dir = os.path.abspath(args.results_dir)
+    scratch = tempfile.mkdtemp(prefix="bench-pipeline-")
+    llm = StubLLMServer(first_token_s=args.first_token, tokens_per_second=args.tokens_per_second,
+                        components=args.components).start()
+    cwd = os.getcwd()
+    try:
+        fixtures = (sorted(glob.glob(os.path.join(args.fixtures, "*.png")) + glob.glob(os.path.join(args.fixtures, "*.jp*g")))
+                    if args.fixtures else make_fixture_images(os.path.join(scratch, "fixtures"), args.fixture_count))
+        configure_environment(scratch, llm.url, args)
+        modules, missing = load_modules()
+
+        print(f"== stages ({args.iterations} calls each, stub LLM at {llm.url}) ==")
+        runner = StageRunner(modules, scratch, fixtures, warm_cache=args.warm_cache)
+        stages = bench_stages(runner, args.iterations, missing)
+
+        print(f"\n== fan-out vs single call ({args.iterations} jobs each) ==")
+        fanout = bench_fanout(modules, scratch, fixtures, args.iterations, args.warm_cache)
+
+        print(f"\n== throughput ({args.jobs} jobs per level) ==")
+        throughput = bench_throughput(modules, scratch, fixtures, args.concurrency, args.jobs, args.warm_cache)
+
+        results = {
+            "version": git_version(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "params": {key: value for key, value in vars(args).items() if key not in ("results_dir", "no_save")},
+            "llm_requests": llm.requests,
+            "stages": stages,
+            "fanout": fanout,
+            "throughput": throughput,
+        }
+        compare_with_previous(results, results_dir)
+        if not args.no_save:
+            os.makedirs(results_dir, exist_ok=True)
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+            path = os.path.join(results_dir, f"pipeline-{stamp}-{results['version']}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+            print(f"\nResults written to {path}")
+    except Exception:
+        traceback.print_exc()
+        return 1
+    finally:
+        from dev_server import supervisor
+        supervisor.stop_all()
+        llm.stop()
+        os.chdir(cwd)
+        shutil.rmtree(scratch, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
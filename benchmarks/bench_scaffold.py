@@ -0,0 +1,78 @@
+"""
+Compare cold `npx create-react-app .` scaffolding with the pre-warmed scaffold pool.
+
+Usage:
+    python benchmarks/bench_scaffold.py --runs 3
+    python benchmarks/bench_scaffold.py --skip-cold --pool-dir /tmp/pool
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scaffold_pool import ScaffoldPool, CRA_SCAFFOLD_COMMAND
+
+
+def time_cold(workdir, command):
+    os.makedirs(workdir, exist_ok=True)
+    start = time.perf_counter()
+    subprocess.run(command, shell=True, cwd=workdir, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def time_pooled(pool, workdir, wait_for_refill):
+    start = time.perf_counter()
+    mode = pool.acquire(workdir)
+    elapsed = time.perf_counter() - start
+    if wait_for_refill and pool._refill_thread is not None:
+        # Measure the steady state: the pool is refilled between user requests
+        pool._refill_thread.join()
+    return elapsed, mode
+
+
+def summarize(label, samples):
+    print(f"{label:<22} runs={len(samples)} min={min(samples):.3f}s median={statistics.median(samples):.3f}s max={max(samples):.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--pool-dir", default=None, help="Reuse an existing pool directory (default: temporary)")
+    parser.add_argument("--command", default=CRA_SCAFFOLD_COMMAND, help="Cold scaffold command")
+    parser.add_argument("--skip-cold", action="store_true", help="Only time the pooled path")
+    parser.add_argument("--no-wait", action="store_true", help="Do not wait for the background refill between runs")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="bench-scaffold-")
+    pool = ScaffoldPool(pool_dir=args.pool_dir or os.path.join(scratch, "pool"), scaffold_command=args.command)
+    try:
+        print("Preparing template project (one-time cost)...")
+        start = time.perf_counter()
+        pool.refill()
+        print(f"Template and pool ready in {time.perf_counter() - start:.1f}s")
+
+        if not args.skip_cold:
+            cold = [time_cold(os.path.join(scratch, f"cold-{i}"), args.command) for i in range(args.runs)]
+            summarize("cold create-react-app", cold)
+
+        pooled, modes = [], []
+        for i in range(args.runs):
+            elapsed, mode = time_pooled(pool, os.path.join(scratch, f"pooled-{i}"), not args.no_wait)
+            pooled.append(elapsed)
+            modes.append(mode)
+        summarize("pooled acquire", pooled)
+        print(f"acquire modes: {', '.join(modes)}")
+        if not args.skip_cold:
+            print(f"speedup (median): {statistics.median(cold) / max(statistics.median(pooled), 1e-9):.0f}x")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Compare the create-react-app and Vite templates: scaffold time, dev-server cold start and
+rebuild latency after editing src/App.js in the running server.
+
+Usage:
+    python benchmarks/bench_scaffold_flavors.py --runs 3
+    python benchmarks/bench_scaffold_flavors.py --flavors vite --pool-dir /tmp/pools --edits 10
+
+The first scaffold of each template runs npm and needs network access; pass --pool-dir to
+keep templates between invocations and only measure the warm paths.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scaffold_pool import ScaffoldPool, SCAFFOLD_COMMANDS
+from dev_server import DevServerSupervisor
+
+APP_TEMPLATE = """function App() {{
+  return <div style={{{{ padding: 16 }}}}>Edit {n}</div>;
+}}
+
+export default App;
+"""
+
+
+def summarize(label, samples):
+    samples = [sample for sample in samples if sample is not None]
+    if not samples:
+        print(f"{label:<28} no successful runs")
+        return None
+    print(f"{label:<28} runs={len(samples)} min={min(samples):.3f}s median={statistics.median(samples):.3f}s max={max(samples):.3f}s")
+    return statistics.median(samples)
+
+
+def bench_flavor(flavor, pool_dir, scratch, runs, edits, timeout):
+    print(f"\n== {flavor} ==")
+    pool = ScaffoldPool(pool_dir=pool_dir, size=1, scaffold_command=SCAFFOLD_COMMANDS[flavor])
+    start = time.perf_counter()
+    was_ready = pool.template_ready()
+    pool.ensure_template()
+    template_s = time.perf_counter() - start
+    print(f"{'template scaffold':<28} {template_s:.1f}s" + (" (already built)" if was_ready else ""))
+
+    acquire, cold_start, rebuild = [], [], []
+    for run in range(runs):
+        workdir = os.path.join(scratch, f"{flavor}-{run}")
+        start = time.perf_counter()
+        pool.acquire(workdir)
+        acquire.append(time.perf_counter() - start)
+        if pool._refill_thread is not None:
+            pool._refill_thread.join()
+
+        supervisor = DevServerSupervisor(port_range=(4100, 4999))
+        try:
+            server = supervisor.start(workdir, timeout=timeout)
+            status = server.status()
+            cold_start.append(status["startup_seconds"])
+            if not status["ready"]:
+                print(f"  run {run}: dev server not ready:\n    " + "\n    ".join(status["last_output"]))
+                continue
+            for n in range(edits):
+                update = server.apply_update({os.path.join("src", "App.js"): APP_TEMPLATE.format(n=f"{run}-{n}")}, timeout=timeout)
+                rebuild.append(update["write_to_compiled_s"])
+        finally:
+            supervisor.stop_all()
+
+    return {
+        "template_s": template_s,
+        "acquire_s": summarize("pooled acquire", acquire),
+        "cold_start_s": summarize("dev server cold start", cold_start),
+        "rebuild_s": summarize("rebuild after edit", rebuild),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flavors", nargs="+", default=list(SCAFFOLD_COMMANDS), choices=list(SCAFFOLD_COMMANDS))
+    parser.add_argument("--runs", type=int, default=3, help="Projects (and dev server cold starts) per template")
+    parser.add_argument("--edits", type=int, default=5, help="Edits of src/App.js per running server")
+    parser.add_argument("--timeout", type=float, default=180.0)
+    parser.add_argument("--pool-dir", default=None, help="Keep template pools here (default: temporary)")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="bench-flavors-")
+    try:
+        results = {}
+        for flavor in args.flavors:
+            pool_dir = os.path.join(args.pool_dir or os.path.join(scratch, "pools"), flavor)
+            results[flavor] = bench_flavor(flavor, pool_dir, scratch, args.runs, args.edits, args.timeout)
+
+        if len(results) > 1:
+            print("\n== median comparison ==")
+            metrics = ("template_s", "acquire_s", "cold_start_s", "rebuild_s")
+            print(f"{'metric':<16}" + "".join(f"{flavor:>12}" for flavor in results))
+            for metric in metrics:
+                row = "".join(f"{results[flavor][metric]:>11.3f}s" if results[flavor][metric] is not None else f"{'n/a':>12}" for flavor in results)
+                print(f"{metric:<16}{row}")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
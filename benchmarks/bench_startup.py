@@ -0,0 +1,94 @@
+"""
+Startup-time benchmark for the two Streamlit apps.
+
+Measures, each in a fresh interpreter:
+  * module load time of app.py / apis.py (the UI is skipped, heavy frameworks stay unloaded)
+  * the import cost of crewai and autogen that the lazy loading defers
+  * first script run vs. reruns through streamlit's AppTest (what every widget interaction pays)
+
+Usage:
+    python benchmarks/bench_startup.py --runs 5
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPS = ("app.py", "apis.py")
+
+LOAD_SNIPPET = """
+import time, runpy
+start = time.perf_counter()
+runpy.run_path({path!r}, run_name="startup_bench")
+print(time.perf_counter() - start)
+"""
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+RERUN_SNIPPET = """
+import json, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({path!r}, default_timeout=300)
+timings = []
+for _ in range({reruns}):
+    start = time.perf_counter()
+    app.run()
+    timings.append(time.perf_counter() - start)
+print(json.dumps(timings))
+"""
+
+
+def run_python(snippet):
+    result = subprocess.run([sys.executable, "-c", snippet], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed")
+    return result.stdout.strip().splitlines()[-1]
+
+
+def sample(snippet, runs):
+    return [float(run_python(snippet)) for _ in range(runs)]
+
+
+def report(label, samples):
+    print(f"{label:<34} median={statistics.median(samples) * 1000:8.1f} ms  min={min(samples) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--reruns", type=int, default=5, help="Script runs per AppTest session")
+    args = parser.parse_args()
+
+    for app in APPS:
+        try:
+            report(f"load {app}", sample(LOAD_SNIPPET.format(path=os.path.join(ROOT, app)), args.runs))
+        except RuntimeError as e:
+            print(f"load {app}: skipped ({e})")
+
+    for module in ("crewai", "autogen"):
+        try:
+            report(f"import {module} (deferred)", sample(IMPORT_SNIPPET.format(module=module), args.runs))
+        except RuntimeError as e:
+            print(f"import {module}: skipped ({e})")
+
+    for app in APPS:
+        try:
+            timings = json.loads(run_python(RERUN_SNIPPET.format(path=os.path.join(ROOT, app), reruns=args.reruns)))
+        except RuntimeError as e:
+            print(f"rerun {app}: skipped ({e})")
+            continue
+        print(f"{'first run ' + app:<34} {timings[0] * 1000:8.1f} ms")
+        if len(timings) > 1:
+            report(f"rerun {app}", timings[1:])
+
+
+if __name__ == "__main__":
+    main()
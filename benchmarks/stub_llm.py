@@ -0,0 +1,275 @@
+"""
+Local OpenAI-compatible chat completions server with canned answers, standing in for Groq.
+
+Answers depend on the prompt: flowchart summaries for "summarize" requests, fixed code for
+repair requests, a JSON component plan (or plan update) and one component per request for fan-out generation,
+and a multi-file React project for everything else. Both plain and streamed
+(SSE) responses are supported; latency is simulated as time-to-first-token plus a token rate.
+
+Usage:
+    python benchmarks/stub_llm.py --port 8765 --first-token 0.3 --tokens-per-second 400
+"""
+import re
+import json
+import time
+import uuid
+import argparse
+import threading
+import http.server
+
+DESCRIPTION_RESPONSE = """The flowchart describes a small counter application.
+1. Start: show a header with the application title.
+2. The user clicks the "Increment" button, which adds one to the counter.
+3. Decision: if the counter is above 10, show a warning message, otherwise keep counting.
+4. A "Reset" button sets the counter back to zero.
+5. End."""
+
+APP_JS = """import React, { useState } from 'react';
+import Header from './components/Header';
+import './App.css';
+
+function App() {
+  const [count, setCount] = useState(0);
+  const styles = {
+    page: { padding: 24, fontFamily: 'sans-serif', background: '#f5f7fb', minHeight: '100vh' },
+    button: { padding: '8px 16px', marginRight: 8, borderRadius: 6, border: 'none', background: '#3b82f6', color: '#fff' },
+    warning: { color: '#b91c1c', marginTop: 12 },
+  };
+  return (
+    <div style={styles.page}>
+      <Header title="Flowchart Counter" />
+      <p>Count: {count}</p>
+      <button style={styles.button} onClick={() => setCount(count + 1)}>Increment</button>
+      <button style={styles.button} onClick={() => setCount(0)}>Reset</button>
+      {count > 10 && <p style={styles.warning}>The counter is above 10.</p>}
+    </div>
+  );
+}
+
+export default App;
+"""
+
+HEADER_JS = """import React from 'react';
+
+function Header({ title }) {
+  return <h1 style={{ fontSize: 28, color: '#1f2937' }}>{title}</h1>;
+}
+
+export default Header;
+"""
+
+APP_CSS = """body {
+  margin: 0;
+}
+"""
+
+CODE_RESPONSE = f"""Here is the complete project.
+
+```javascript
+// filename: src/App.js
+{APP_JS}```
+
+```javascript
+// filename: src/components/Header.js
+{HEADER_JS}```
+
+```css
+/* filename: src/App.css */
+{APP_CSS}```
+"""
+
+REPAIR_RESPONSE = f"""```javascript
+{APP_JS}```
+"""
+
+# Components of the canned app; --components N makes the app (and the single-call answer) larger
+COMPONENT_SPECS = [
+    ("Header", "Shows the application title in a large heading."),
+    ("Counter", "Holds the count, with Increment and Reset buttons."),
+    ("Warning", "Explains that the counter warns above ten."),
+    ("History", "Lists the previous counter values."),
+    ("Settings", "Lets the user change the warning threshold."),
+    ("Chart", "Draws the counter history as a bar chart with divs."),
+    ("Help", "Explains how to use the application."),
+    ("Footer", "Shows a short footer line."),
+]
+
+
+def plan_response(components=3):
+    return json.dumps({
+        "summary": "A small counter application with a header, a counter with increment and reset buttons, "
+                   "and a warning shown above ten.",
+        "components": [{"name": name, "spec": spec} for name, spec in COMPONENT_SPECS[:components]],
+    })
+
+
+def plan_update_response(components=3):
+    # Re-upload of an edited flowchart: the last component's spec changed, the others are left out
+    name, spec = COMPONENT_SPECS[:components][-1]
+    return json.dumps({
+        "summary": "A small counter application with a header, a counter with increment and reset buttons, "
+                   "and a warning shown above ten.",
+        "changed": [{"name": name, "spec": spec + " It also shows how far the count is above ten."}],
+        "removed": [],
+    })
+
+
+def component_response(name):
+    return f"""```javascript
+// filename: src/components/{name}.js
+import React, {{ useState }} from 'react';
+
+function {name}() {{
+  const [active, setActive] = useState(false);
+  const styles = {{
+    box: {{ padding: 16, margin: '8px 0', borderRadius: 8, background: active ? '#dbeafe' : '#f5f7fb' }},
+  }};
+  return (
+    <section style={{styles.box}} onClick={{() => setActive(!active)}}>
+      <h2 style={{{{ margin: 0, fontSize: 18 }}}}>{name}</h2>
+    </section>
+  );
+}}
+
+export default {name};
+```
+"""
+
+
+def _prompt_text(messages):
+    parts = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            parts.extend(part.get("text", "") for part in content if isinstance(part, dict))
+        elif content:
+            parts.append(content)
+    return "\n".join(parts)
+
+
+def code_response(components=3):
+    # The single-call answer: the canned project plus every component beyond the ones it already holds
+    extra = "".join(component_response(name) for name, _ in COMPONENT_SPECS[3:components])
+    return CODE_RESPONSE + extra
+
+
+def canned_response(messages, components=3):
+    """Pick the canned answer for a chat request."""
+    text = _prompt_text(messages[-1:]).lower()
+    if "does not parse" in text:
+        return REPAIR_RESPONSE
+    if "listing only what the edit affects" in text:
+        return plan_update_response(components)
+    if "into independent react components" in text:
+        return plan_response(components)
+    component = re.search(r"write the react component `(\w+)`", _prompt_text(messages[-1:]), re.IGNORECASE)
+    if component:
+        return component_response(component.group(1))
+    if "summarize" in text:
+        return DESCRIPTION_RESPONSE
+    return code_response(components)
+
+
+class StubLLMServer:
+    """Runs the stub on a background thread; counts requests so benchmarks can report them."""
+
+    def __init__(self, host="127.0.0.1", port=0, first_token_s=0.3, tokens_per_second=400.0, components=3):
+        self.first_token_s = first_token_s
+        self.components = components
+        self.tokens_per_second = tokens_per_second
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.httpd = http.server.ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}/v1"
+        self._thread = None
+
+    def _handler(self):
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                with stub._lock:
+                    stub.requests += 1
+                text = canned_response(body.get("messages") or [], stub.components)
+                if body.get("stream"):
+                    self._stream(body, text)
+                else:
+                    self._complete(body, text)
+
+            def _complete(self, body, text):
+                time.sleep(stub.first_token_s + stub.generation_seconds(text))
+                payload = json.dumps({
+                    "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                    "usage": stub.usage(body, text),
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, body, text):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                time.sleep(stub.first_token_s)
+                chunks = [text[i:i + 16] for i in range(0, len(text), 16)]
+                delay = stub.generation_seconds(text) / max(len(chunks), 1)
+                for chunk in chunks:
+                    event = {"choices": [{"index": 0, "delta": {"content": chunk}}]}
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    time.sleep(delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
+
+    def generation_seconds(self, text):
+        # Roughly four characters per token
+        return len(text) / 4 / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    @staticmethod
+    def usage(body, text):
+        prompt_tokens = len(_prompt_text(body.get("messages") or [])) // 4
+        completion_tokens = len(text) // 4
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="stub-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-token", type=float, default=0.3, help="Seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--components", type=int, default=3, help="Components in the canned app (1-8)")
+    args = parser.parse_args()
+    server = StubLLMServer(port=args.port, first_token_s=args.first_token, tokens_per_second=args.tokens_per_second,
+                           components=args.components)
+    print(f"Stub LLM listening on {server.url}")
+    server.httpd.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Stand-in for npm/npx used by the pipeline benchmark, so timings exclude the registry and webpack.
+
+Supported:
+    npm install [package ...]     create node_modules/<name> for declared and named packages
+    npm start | npm run dev       serve the project on $PORT, print webpack-style compile lines
+    npx create-react-app .        write a minimal create-react-app project, then install
+
+Latencies are configurable with STUB_NPM_INSTALL_S, STUB_NPM_START_S and STUB_NPM_REBUILD_S.
+bench_pipeline.py puts `npm`/`npx` wrappers that exec this script first on PATH.
+"""
+import os
+import sys
+import json
+import time
+import threading
+import http.server
+
+INSTALL_S = float(os.getenv("STUB_NPM_INSTALL_S", "0.2"))
+START_S = float(os.getenv("STUB_NPM_START_S", "1.0"))
+REBUILD_S = float(os.getenv("STUB_NPM_REBUILD_S", "0.1"))
+
+CRA_PACKAGE_JSON = {
+    "name": "react-app",
+    "version": "0.1.0",
+    "private": True,
+    "dependencies": {"react": "^18.3.1", "react-dom": "^18.3.1", "react-scripts": "5.0.1", "web-vitals": "^2.1.4"},
+    "scripts": {"start": "react-scripts start", "build": "react-scripts build"},
+}
+CRA_FILES = {
+    os.path.join("public", "index.html"): '<!doctype html><html><body><div id="root"></div></body></html>\n',
+    os.path.join("src", "index.js"): "import React from 'react';\nimport ReactDOM from 'react-dom/client';\nimport App from './App';\n\n"
+                                      "ReactDOM.createRoot(document.getElementById('root')).render(<App />);\n",
+    os.path.join("src", "App.js"): "function App() {\n  return <div>Hello</div>;\n}\n\nexport default App;\n",
+}
+
+
+def package_name(spec):
+    # "@scope/name@^1.0.0" -> "@scope/name", "vite@5" -> "vite"
+    at = spec.rfind("@")
+    return spec[:at] if at > 0 else spec
+
+
+def install(packages):
+    time.sleep(INSTALL_S)
+    wanted = set(package_name(spec.strip('"')) for spec in packages)
+    if os.path.exists("package.json"):
+        with open("package.json", "r", encoding="utf-8") as f:
+            package_data = json.load(f)
+        for dep_type in ("dependencies", "devDependencies"):
+            wanted.update(package_data.get(dep_type, {}))
+    for name in wanted:
+        os.makedirs(os.path.join("node_modules", name), exist_ok=True)
+        with open(os.path.join("node_modules", name, "package.json"), "w", encoding="utf-8") as f:
+            json.dump({"name": name, "version": "0.0.0"}, f)
+    print(f"added {len(wanted)} packages in {INSTALL_S:.1f}s")
+
+
+def create_react_app():
+    with open("package.json", "w", encoding="utf-8") as f:
+        json.dump(CRA_PACKAGE_JSON, f, indent=2)
+    for path, content in CRA_FILES.items():
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+    install([])
+    print("Success! Created react-app")
+
+
+def snapshot():
+    mtimes = {}
+    for root, _, files in os.walk("src"):
+        for name in files:
+            path = os.path.join(root, name)
+            mtimes[path] = os.path.getmtime(path)
+    return mtimes
+
+
+def start():
+    port = int(os.getenv("PORT", "3000"))
+    print("Starting the development server...", flush=True)
+    time.sleep(START_S)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), http.server.SimpleHTTPRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print("Compiled successfully!", flush=True)
+    print(f"  Local:            http://localhost:{port}", flush=True)
+    last = snapshot()
+    while True:
+        time.sleep(0.05)
+        current = snapshot()
+        if current != last:
+            last = current
+            print("Compiling...", flush=True)
+            time.sleep(REBUILD_S)
+            print("webpack compiled successfully", flush=True)
+
+
+def main(argv):
+    tool, args = argv[0], argv[1:]
+    if tool == "npx":
+        if args and args[0] == "create-react-app":
+            create_react_app()
+            return 0
+        print(f"stub npx: unsupported command {' '.join(args)}", file=sys.stderr)
+        return 1
+    if args and args[0] in ("install", "i"):
+        install([arg for arg in args[1:] if not arg.startswith("-")])
+        return 0
+    if args and (args[0] == "start" or args[:2] == ["run", "dev"]):
+        start()
+        return 0
+    print(f"stub npm: unsupported command {' '.join(args)}", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,162 @@
+import os
+import re
+from typing import List, NamedTuple, Optional
+
+# `filename: src/App.js`, optionally behind a comment marker (#, //, /*, <!--) or inside the info string
+FILENAME_PATTERN = re.compile(r'^\s*(?:#|//|/\*|<!--|\*)?\s*filename:\s*([\w./\\-]+)', re.IGNORECASE)
+INFO_FILENAME_PATTERN = re.compile(r'(?:filename|title)[:=]\s*["\']?([\w./\\-]+)', re.IGNORECASE)
+
+# Languages that can be written to src/App.js
+APP_LANGUAGES = ("javascript", "js", "jsx", "typescript", "ts", "tsx", "react", "")
+
+
+class CodeBlock(NamedTuple):
+    language: str
+    filename: Optional[str]
+    code: str
+    complete: bool
+    start_line: int
+
+
+class CodeBlockParser:
+    """
+    Single-pass parser for fenced (``` or ~~~) code blocks.
+
+    Text can be fed in arbitrary chunks while a response is still streaming; each line is
+    looked at exactly once, so the total cost is linear in the size of the response.
+    """
+
+    def __init__(self):
+        self._pending = []
+        self._line_no = 0
+        self._fence = None
+        self._language = ""
+        self._filename = None
+        self._lines = []
+        self._start_line = 0
+        self._expect_header = False
+
+    def feed(self, text: str) -> List[CodeBlock]:
+        """Consume the next chunk of text and return the blocks it completed."""
+        completed = []
+        start = 0
+        end = text.find("\n")
+        while end != -1:
+            line = text[start:end]
+            if self._pending:
+                # Finish the line that started in an earlier chunk
+                line = "".join(self._pending) + line
+                self._pending = []
+            block = self._process_line(line.rstrip("\r"))
+            if block is not None:
+                completed.append(block)
+            start = end + 1
+            end = text.find("\n", start)
+        if start < len(text):
+            self._pending.append(text[start:])
+        return completed
+
+    def close(self) -> List[CodeBlock]:
+        """Flush the trailing partial line; an unterminated block is returned with complete=False."""
+        completed = []
+        if self._pending:
+            block = self._process_line("".join(self._pending).rstrip("\r"))
+            self._pending = []
+            if block is not None:
+                completed.append(block)
+        if self._fence is not None:
+            completed.append(self._finish(complete=False))
+        return completed
+
+    @property
+    def in_block(self) -> bool:
+        """True inside an open fence; unlike partial() this does not copy the block."""
+        return self._fence is not None
+
+    def partial(self) -> Optional[CodeBlock]:
+        """Return the block currently being streamed, or None when outside a fence."""
+        if self._fence is None:
+            return None
+        tail = "".join(self._pending)
+        lines = self._lines + ([tail] if tail and not self._is_header(tail) else [])
+        return CodeBlock(self._language, self._filename, "\n".join(lines), False, self._start_line)
+
+    def _is_header(self, line):
+        return self._expect_header and FILENAME_PATTERN.match(line) is not None
+
+    def _process_line(self, line):
+        self._line_no += 1
+        stripped = line.strip()
+        if self._fence is None:
+            if stripped.startswith("```") or stripped.startswith("~~~"):
+                fence_char = stripped[0]
+                length = len(stripped) - len(stripped.lstrip(fence_char))
+                info = stripped[length:].strip()
+                self._fence = fence_char * length
+                self._language = info.split()[0].lower() if info else ""
+                info_filename = INFO_FILENAME_PATTERN.search(info)
+                self._filename = info_filename.group(1) if info_filename else None
+                self._lines = []
+                self._start_line = self._line_no
+                self._expect_header = self._filename is None
+            return None
+
+        if stripped.startswith(self._fence) and not stripped.lstrip(self._fence[0]):
+            return self._finish(complete=True)
+
+        if self._expect_header:
+            self._expect_header = False
+            header = FILENAME_PATTERN.match(line)
+            if header:
+                self._filename = header.group(1)
+                return None
+        self._lines.append(line)
+        return None
+
+    def _finish(self, complete):
+        block = CodeBlock(self._language, self._filename, "\n".join(self._lines).strip("\n"), complete, self._start_line)
+        self._fence = None
+        self._lines = []
+        self._expect_header = False
+        return block
+
+
+def parse_code_blocks(text: str, include_incomplete: bool = False) -> List[CodeBlock]:
+    """Return every fenced code block in text, in order."""
+    parser = CodeBlockParser()
+    blocks = parser.feed(text)
+    blocks.extend(block for block in parser.close() if block.complete or include_incomplete)
+    return blocks
+
+
+def select_app_code(blocks: List[CodeBlock]) -> Optional[str]:
+    """Pick the block that belongs in src/App.js: an explicit App.js/App.jsx file, else the first JS-like block."""
+    for block in blocks:
+        if block.filename and block.filename.replace("\\", "/").rsplit("/", 1)[-1] in ("App.js", "App.jsx", "App.tsx"):
+            return block.code
+    for block in blocks:
+        if block.language in APP_LANGUAGES and block.code.strip():
+            return block.code
+    return blocks[0].code if blocks else None
+
+
+def resolve_project_path(project_dir: str, path: str) -> Optional[str]:
+    """
+    Absolute location of a project-relative path (e.g. a model's `filename:`), or None when it would
+    land outside project_dir: absolute paths, `..` escapes and symlinks pointing elsewhere.
+    """
+    if not path:
+        return None
+    root = os.path.realpath(project_dir)
+    full_path = os.path.realpath(os.path.join(root, path))
+    if not full_path.startswith(os.path.join(root, "")):
+        return None
+    return full_path
+
+
+def block_path(block: CodeBlock, default: Optional[str] = "src/App.js") -> Optional[str]:
+    """Project-relative path a block should be written to: its filename: header, else `default` for JS-like blocks."""
+    if block.filename:
+        path = block.filename.replace("\\", "/")
+        return path[2:] if path.startswith("./") else path
+    return default if block.language in APP_LANGUAGES else None
@@ -0,0 +1,153 @@
+import os
+import time
+import signal
+import asyncio
+import threading
+import subprocess
+import contextvars
+from collections import deque
+from typing import Callable, List, NamedTuple, Optional
+
+from tracing import tracer
+
+# Lines kept per command; older output is counted but dropped so memory stays bounded
+DEFAULT_TAIL_LINES = 200
+# Longer lines (minified bundles, progress bars without newlines) are cut to this many characters
+MAX_LINE_CHARS = 2000
+# Pipe reads larger than this are split instead of growing the reader's buffer
+READ_LIMIT = 64 * 1024
+
+
+class CommandResult(NamedTuple):
+    command: str
+    returncode: Optional[int]  # None when the command was killed after the timeout
+    duration_s: float
+    tail: List[tuple]  # (stream, line) for the last tail_lines lines, stdout and stderr interleaved
+    total_lines: int
+    timed_out: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+    @property
+    def output(self) -> str:
+        return "\n".join(line for _, line in self.tail)
+
+    def summary(self) -> str:
+        """Exit status, timing and the captured tail, as returned to agents and shown in logs."""
+        status = "timed out" if self.timed_out else f"exit code {self.returncode}"
+        dropped = self.total_lines - len(self.tail)
+        header = f"`{self.command}`: {status} after {self.duration_s:.1f}s"
+        if dropped > 0:
+            header += f" (last {len(self.tail)} of {self.total_lines} lines)"
+        return header + ("\n" + self.output if self.tail else "")
+
+
+def _kill_tree(process):
+    # npm/npx spawn node children that inherit the pipes, so the whole group must go
+    try:
+        if os.name == "nt":
+            subprocess.run(f"taskkill /F /T /PID {process.pid}", shell=True, capture_output=True)
+        else:
+            os.killpg(os.getpgid(process.pid), signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+async def _drain(stream, name, sink):
+    # readuntil instead of readline so an overlong line is split rather than raising
+    split = False
+    while True:
+        try:
+            chunk = await stream.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            chunk = e.partial
+            if not chunk:
+                return
+        except asyncio.LimitOverrunError as e:
+            chunk = await stream.read(e.consumed or READ_LIMIT)
+            sink(name, chunk.decode("utf-8", errors="replace"))
+            split = True
+            continue
+        if not (split and chunk in (b"\n", b"\r\n")):
+            sink(name, chunk.decode("utf-8", errors="replace").rstrip("\r\n"))
+        split = False
+
+
+async def run_command_async(command: str, cwd: Optional[str] = None, env: Optional[dict] = None,
+                            tail_lines: int = DEFAULT_TAIL_LINES, on_line: Optional[Callable[[str, str], None]] = None,
+                            log_path: Optional[str] = None, timeout: Optional[float] = None) -> CommandResult:
+    """
+    Run a shell command, draining stdout and stderr concurrently.
+
+    Every line is passed to `on_line(stream, line)` and appended to `log_path` as it arrives;
+    only the last `tail_lines` lines are kept in memory.
+    """
+    tail = deque(maxlen=tail_lines)
+    counts = {"lines": 0}
+    log_file = open(log_path, "a", encoding="utf-8") if log_path else None
+
+    def sink(stream, line):
+        line = line[:MAX_LINE_CHARS]
+        counts["lines"] += 1
+        tail.append((stream, line))
+        if log_file is not None:
+            log_file.write(f"[{stream}] {line}\n")
+            log_file.flush()
+        if on_line is not None:
+            on_line(stream, line)
+
+    kwargs = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if os.name == "nt" else {"start_new_session": True}
+    start = time.perf_counter()
+    timed_out = False
+    try:
+        process = await asyncio.create_subprocess_shell(
+            command, cwd=cwd, env=env, limit=READ_LIMIT,
+            stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            **kwargs,
+        )
+        readers = asyncio.gather(_drain(process.stdout, "stdout", sink), _drain(process.stderr, "stderr", sink))
+        try:
+            await asyncio.wait_for(asyncio.shield(readers), timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            _kill_tree(process)
+            await readers
+        returncode = await process.wait()
+    finally:
+        if log_file is not None:
+            log_file.close()
+    return CommandResult(command, None if timed_out else returncode, time.perf_counter() - start,
+                         list(tail), counts["lines"], timed_out)
+
+
+def run_command(command: str, cwd: Optional[str] = None, span_name: str = "command", **kwargs) -> CommandResult:
+    """Blocking wrapper around run_command_async; safe to call from threads and from inside an event loop."""
+    with tracer.span(span_name, command=command) as span:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            result = asyncio.run(run_command_async(command, cwd=cwd, **kwargs))
+        else:
+            # asyncio.run cannot nest, so run the command on a loop of its own in a helper thread
+            outcome = {}
+
+            def target():
+                try:
+                    outcome["result"] = asyncio.run(run_command_async(command, cwd=cwd, **kwargs))
+                except BaseException as e:
+                    outcome["error"] = e
+
+            context = contextvars.copy_context()
+            thread = threading.Thread(target=context.run, args=(target,), name="command-runner", daemon=True)
+            thread.start()
+            thread.join()
+            if "error" in outcome:
+                raise outcome["error"]
+            result = outcome["result"]
+        span.set(returncode=result.returncode, lines=result.total_lines)
+        if not result.ok:
+            span.error = f"exit code {result.returncode}"
+        return result
+
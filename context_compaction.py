@@ -0,0 +1,123 @@
+import os
+import json
+from typing import Callable, Dict, Iterable, List, Optional
+
+from code_blocks import CodeBlockParser
+
+# Number of most recent messages that are always sent verbatim
+DEFAULT_KEEP_RECENT = 6
+# Default prompt budget per agent, in estimated tokens
+DEFAULT_MAX_PROMPT_TOKENS = 6000
+SUMMARY_CHARS = 200
+
+
+def estimate_tokens(text) -> int:
+    """Cheap token estimate (~4 characters per token) that needs no tokenizer."""
+    if isinstance(text, list):
+        # Multimodal content: only the text parts (image tokens are billed by the provider's own rules)
+        return sum(estimate_tokens(part.get("text", "")) for part in text if isinstance(part, dict))
+    if text and not isinstance(text, str):
+        text = json.dumps(text, default=str)
+    return len(text) // 4 + 1 if text else 0
+
+
+def messages_tokens(messages: List[dict]) -> int:
+    return sum(estimate_tokens(message.get("content") or "") for message in messages)
+
+
+def replace_saved_code_blocks(content: str, saved_files: Iterable[str]) -> str:
+    """Replace fenced blocks whose filename is already saved on disk with a short file reference."""
+    if "```" not in content and "~~~" not in content:
+        return content
+    saved = {os.path.normpath(filename) for filename in saved_files}
+    output, block_lines = [], []
+    parser = CodeBlockParser()
+    for line in content.split("\n"):
+        in_block = parser.in_block
+        completed = parser.feed(line + "\n")
+        if completed:
+            block = completed[0]
+            if block.filename and os.path.normpath(block.filename) in saved:
+                output.append(f"[code for {block.filename} omitted: already saved to disk]")
+            else:
+                output.extend(block_lines + [line])
+            block_lines = []
+        elif in_block or parser.in_block:
+            block_lines.append(line)
+        else:
+            output.append(line)
+    # An unterminated block is kept as it was
+    output.extend(block_lines)
+    return "\n".join(output)
+
+
+def summarize_message(message: dict) -> str:
+    content = (message.get("content") or "").strip()
+    first_line = content.split("\n", 1)[0]
+    summary = first_line[:SUMMARY_CHARS] + ("..." if len(content) > len(first_line[:SUMMARY_CHARS]) else "")
+    return f"[earlier turn by {message.get('name', message.get('role', 'unknown'))}, summarized] {summary}"
+
+
+class HistoryCompactor:
+    """
+    Shrinks the message history an agent sees before it replies.
+
+    The stored group chat history is left untouched; each agent gets a compacted copy where
+    saved code blocks become file references, old turns become one-line summaries and the
+    oldest turns are dropped once the agent's prompt budget is exceeded.
+    """
+
+    def __init__(self, saved_files: Callable[[], Iterable[str]], keep_recent: int = DEFAULT_KEEP_RECENT,
+                 max_prompt_tokens: int = DEFAULT_MAX_PROMPT_TOKENS, agent_budgets: Optional[Dict[str, int]] = None):
+        self.saved_files = saved_files
+        self.keep_recent = keep_recent
+        self.max_prompt_tokens = max_prompt_tokens
+        self.agent_budgets = agent_budgets or {}
+        self.rounds = []
+
+    def attach(self, agent) -> None:
+        """Compact the history every time agent generates a reply."""
+        agent.register_hook(
+            "process_all_messages_before_reply",
+            lambda messages: self.compact(messages, agent_name=agent.name),
+        )
+
+    def compact(self, messages: List[dict], agent_name: str = "") -> List[dict]:
+        if not messages:
+            return messages
+        saved = list(self.saved_files())
+        recent_start = max(1, len(messages) - self.keep_recent)
+        compacted = []
+        for index, message in enumerate(messages):
+            content = message.get("content")
+            # Tool calls and their results must keep their exact shape
+            if not isinstance(content, str) or message.get("tool_calls") or message.get("role") == "tool":
+                compacted.append(message)
+                continue
+            new_content = replace_saved_code_blocks(content, saved)
+            if 0 < index < recent_start:
+                new_content = summarize_message(dict(message, content=new_content))
+            compacted.append(dict(message, content=new_content) if new_content != content else message)
+
+        # Enforce the per-agent budget by dropping the oldest turns (the task message is always kept)
+        budget = self.agent_budgets.get(agent_name, self.max_prompt_tokens)
+        while messages_tokens(compacted) > budget and len(compacted) > self.keep_recent + 1:
+            compacted.pop(1)
+            # Never leave tool results without the call that produced them
+            while len(compacted) > 1 and compacted[1].get("role") == "tool":
+                compacted.pop(1)
+
+        before, after = messages_tokens(messages), messages_tokens(compacted)
+        self.rounds.append({"agent": agent_name, "tokens_before": before, "tokens_after": after, "tokens_saved": before - after})
+        return compacted
+
+    def total_saved(self) -> int:
+        return sum(round_stats["tokens_saved"] for round_stats in self.rounds)
+
+    def report(self) -> str:
+        lines = [
+            f"round {i + 1} ({r['agent']}): {r['tokens_before']} -> {r['tokens_after']} tokens (saved {r['tokens_saved']})"
+            for i, r in enumerate(self.rounds)
+        ]
+        lines.append(f"total estimated tokens saved: {self.total_saved()}")
+        return "\n".join(lines)
@@ -0,0 +1,123 @@
+import os
+import json
+import hashlib
+import subprocess
+from typing import Callable, Iterable, List, Optional
+
+from command_runner import run_command
+
+# Lives inside node_modules, so deleting node_modules also invalidates it
+STAMP_FILE = os.path.join("node_modules", ".deps-stamp.json")
+LOCKFILES = ("package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml")
+
+
+def run_npm(command: str, cwd: str, on_line: Optional[Callable[[str, str], None]] = None, env: Optional[dict] = None):
+    """
+    Run an npm/npx command in cwd (with env, default the current environment) under an "npm" trace span,
+    passing each output line to on_line.
+
+    Returns the CommandResult; raises subprocess.CalledProcessError (with the output tail) on failure.
+    """
+    result = run_command(command, cwd=cwd, span_name="npm", on_line=on_line, env=env)
+    if not result.ok:
+        raise subprocess.CalledProcessError(result.returncode, command, output=result.output)
+    return result
+
+
+def dependency_fingerprint(project_path: str) -> str:
+    """sha256 over package.json and whichever lockfiles exist; empty string without package.json."""
+    digest = hashlib.sha256()
+    package_json_path = os.path.join(project_path, "package.json")
+    if not os.path.exists(package_json_path):
+        return ""
+    for name in ("package.json",) + LOCKFILES:
+        path = os.path.join(project_path, name)
+        if os.path.exists(path):
+            digest.update(name.encode("utf-8") + b"\0")
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def read_stamp(project_path: str) -> dict:
+    try:
+        with open(os.path.join(project_path, STAMP_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_stamp(project_path: str, required: Iterable[str] = ()) -> None:
+    """Record the current fingerprint after a successful install."""
+    path = os.path.join(project_path, STAMP_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": dependency_fingerprint(project_path), "required": sorted(required)}, f)
+    # Replace rather than rewrite in place: node_modules may be hardlinked from the scaffold template
+    os.replace(tmp_path, path)
+
+
+def dependencies_up_to_date(project_path: str, required: Iterable[str] = ()) -> bool:
+    """O(1) check: package.json and lockfile are unchanged since the last install that covered `required`."""
+    stamp = read_stamp(project_path)
+    fingerprint = dependency_fingerprint(project_path)
+    return (
+        bool(fingerprint)
+        and stamp.get("fingerprint") == fingerprint
+        and set(required) <= set(stamp.get("required", []))
+    )
+
+
+def missing_dependencies(project_path: str, required: Iterable[str] = ()) -> List[str]:
+    """
+    Install specs (name@version) for declared or required packages not present in node_modules.
+
+    This is the slow path that looks at every package; it only runs when the stamp is stale.
+    """
+    with open(os.path.join(project_path, "package.json"), "r", encoding="utf-8") as f:
+        package_data = json.load(f)
+
+    wanted = {}
+    for dep_type in ("dependencies", "devDependencies"):
+        wanted.update(package_data.get(dep_type, {}))
+    for name in required:
+        wanted.setdefault(name, None)
+
+    node_modules_path = os.path.join(project_path, "node_modules")
+    missing = []
+    for name, version in wanted.items():
+        if not os.path.exists(os.path.join(node_modules_path, name, "package.json")):
+            # Declared versions may be paths or URLs, which npm accepts as install specs too
+            missing.append(f"{name}@{version}" if version and "/" not in version and ":" not in version else name)
+    return missing
+
+
+def ensure_dependencies(project_path: str, required: Iterable[str] = (),
+                        on_line: Optional[Callable[[str, str], None]] = None) -> List[str]:
+    """
+    Make sure every declared and required package is installed, running npm only when needed.
+
+    Returns:
+        List[str]: The npm commands that were run (empty when the stamp was current).
+
+    Raises subprocess.CalledProcessError if npm fails; the stamp is then left untouched.
+    """
+    required = list(required)
+    if dependencies_up_to_date(project_path, required):
+        return []
+
+    commands = []
+    if not os.path.isdir(os.path.join(project_path, "node_modules")):
+        # Nothing installed yet: one full install from the lockfile beats installing packages one by one
+        commands.append("npm install")
+        run_npm("npm install", project_path, on_line)
+
+    missing = missing_dependencies(project_path, required)
+    if missing:
+        command = "npm install " + " ".join(f'"{spec}"' for spec in missing)
+        commands.append(command)
+        run_npm(command, project_path, on_line)
+
+    # npm may have rewritten package.json and the lockfile, so fingerprint after installing
+    write_stamp(project_path, required)
+    return commands
@@ -0,0 +1,348 @@
+import os
+import time
+import atexit
+import socket
+import signal
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+from collections import deque
+
+from tracing import tracer
+from code_blocks import resolve_project_path
+
+# Output lines that mean the dev server finished its first compile (webpack, or "VITE v5.4.11  ready in 312 ms")
+READY_MARKERS = ("compiled successfully", "webpack compiled", "compiled with warnings", "ready in")
+# Output lines printed after a file change was picked up (webpack recompiles, Vite HMR)
+UPDATE_MARKERS = READY_MARKERS + ("hmr update", "page reload")
+FAILED_MARKERS = ("failed to compile", "internal server error")
+# Source files Vite transforms on request
+VITE_MODULE_EXTENSIONS = (".js", ".jsx", ".ts", ".tsx", ".css")
+
+
+def detect_flavor(workdir):
+    """Return "vite" for projects with a vite.config file, "cra" (webpack) otherwise."""
+    for ext in ("js", "mjs", "cjs", "ts"):
+        if os.path.exists(os.path.join(workdir, f"vite.config.{ext}")):
+            return "vite"
+    return "cra"
+
+
+def find_free_port(start=3000, end=3999, exclude=()):
+    """Return the first port in [start, end] that nothing is listening on."""
+    for port in range(start, end + 1):
+        if port in exclude:
+            continue
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            try:
+                sock.bind(("127.0.0.1", port))
+            except OSError:
+                continue
+            return port
+    raise RuntimeError(f"No free port between {start} and {end}")
+
+
+def project_targets(workdir, files):
+    """Absolute target of every project-relative path in files; ValueError if any would leave workdir."""
+    targets = {path: resolve_project_path(workdir, path) for path in files}
+    outside = [path for path, full_path in targets.items() if full_path is None]
+    if outside:
+        raise ValueError(f"Refusing to write outside {workdir}: {', '.join(outside)}")
+    return targets
+
+
+def probe_http(url, timeout=1.0):
+    """Return True if url answers with any HTTP status below 500."""
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return response.status < 500
+    except urllib.error.HTTPError as e:
+        return e.code < 500
+    except Exception:
+        return False
+
+
+class DevServer:
+    """A single background `npm start` process bound to one project directory."""
+
+    def __init__(self, workdir, port, command="npm start"):
+        self.workdir = os.path.abspath(workdir)
+        self.port = port
+        self.command = command
+        self.url = f"http://localhost:{port}"
+        self.flavor = detect_flavor(self.workdir)
+        self.process = None
+        self.started_at = None
+        self.ready_at = None
+        self.output = deque(maxlen=500)
+        # Every (re)compile bumps compile_count; writers wait for it to move past their mark
+        self.compile_count = 0
+        self.last_compile_ok = None
+        self._compile_changed = threading.Condition()
+        self._reader = None
+
+    def start(self):
+        env = dict(os.environ, PORT=str(self.port), BROWSER="none", CI="true")
+        kwargs = {}
+        if os.name == "nt":
+            kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs["start_new_session"] = True
+        self.started_at = time.time()
+        self.process = subprocess.Popen(
+            self.command,
+            cwd=self.workdir,
+            env=env,
+            shell=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            text=True,
+            **kwargs,
+        )
+        # Drain output continuously so a chatty server can never block on a full pipe
+        self._reader = threading.Thread(target=self._read_output, name=f"dev-server-{self.port}", daemon=True)
+        self._reader.start()
+
+    def _read_output(self):
+        for line in self.process.stdout:
+            line = line.rstrip()
+            self.output.append(line)
+            lowered = line.lower()
+            updated = any(marker in lowered for marker in UPDATE_MARKERS)
+            # "webpack compiled with 1 error" matches a ready marker but is a failed compile
+            failed = any(marker in lowered for marker in FAILED_MARKERS) or (updated and "error" in lowered)
+            if failed or updated:
+                with self._compile_changed:
+                    self.compile_count += 1
+                    self.last_compile_ok = not failed
+                    self._compile_changed.notify_all()
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def wait_until_ready(self, timeout=180.0, interval=0.5):
+        """Block until the server answers HTTP requests, the process dies or timeout expires."""
+        with tracer.span("server.ready", port=self.port, flavor=self.flavor) as span:
+            deadline = time.time() + timeout
+            while time.time() < deadline:
+                if not self.is_running():
+                    span.set(ready=False)
+                    return False
+                if probe_http(self.url):
+                    if self.ready_at is None:
+                        self.ready_at = time.time()
+                    span.set(ready=True)
+                    return True
+                time.sleep(interval)
+            span.set(ready=False)
+            return False
+
+    def wait_for_compile(self, since, timeout=30.0):
+        """
+        Block until a compile newer than the `since` mark (a previous compile_count) finished.
+
+        Returns:
+            Optional[bool]: Whether that compile succeeded, or None on timeout / if the server died.
+        """
+        deadline = time.time() + timeout
+        with self._compile_changed:
+            while self.compile_count <= since:
+                remaining = deadline - time.time()
+                if remaining <= 0 or not self.is_running():
+                    return None
+                self._compile_changed.wait(min(remaining, 0.5))
+            return self.last_compile_ok
+
+    def apply_update(self, files, since=None, timeout=30.0):
+        """
+        Write changed files into the running project and wait for the watcher to recompile.
+
+        `files` maps paths relative to the project to their content; identical files are not
+        touched. Pass `since` (a compile_count taken earlier) when files may already have been
+        written outside this call, e.g. while streaming.
+
+        Returns:
+            dict: changed paths, whether the recompile succeeded, and the write->compiled and
+            write->served latencies in seconds.
+
+        Raises ValueError, before writing anything, if a path would land outside the project.
+        """
+        targets = project_targets(self.workdir, files)
+        mark = self.compile_count if since is None else since
+        write_start = time.perf_counter()
+        changed = []
+        with tracer.span("file.write", files=len(files)) as span:
+            for path, content in files.items():
+                full_path = targets[path]
+                try:
+                    with open(full_path, "r", encoding="utf-8") as f:
+                        if f.read() == content:
+                            continue
+                except OSError:
+                    pass
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                with open(full_path, "w", encoding="utf-8") as f:
+                    f.write(content)
+                changed.append(path)
+            span.set(changed=len(changed))
+
+        update = {"changed": changed, "compiled": None, "write_to_compiled_s": None, "write_to_served_s": None}
+        if self.flavor == "vite":
+            # Vite compiles modules on request and only logs HMR for modules a browser has loaded,
+            # so transforming the files (a fresh ?t= query bypasses its cache) is the rebuild
+            modules = changed if since is None else list(files)
+            if not modules:
+                update["compiled"] = True
+                return update
+            update["compiled"] = self._transform_modules(modules, timeout)
+        elif not changed and (since is None or self.compile_count > since):
+            # Nothing new on disk, or the pending recompile already finished
+            update["compiled"] = self.last_compile_ok if since is not None else True
+            return update
+        else:
+            update["compiled"] = self.wait_for_compile(mark, timeout=timeout)
+        if update["compiled"] is not None:
+            update["write_to_compiled_s"] = time.perf_counter() - write_start
+            if probe_http(self.url, timeout=5.0):
+                update["write_to_served_s"] = time.perf_counter() - write_start
+        return update
+
+    def _transform_modules(self, paths, timeout):
+        """Request each source module from Vite; returns False if any fails to transform, None if unreachable."""
+        ok = True
+        for path in paths:
+            if not path.endswith(VITE_MODULE_EXTENSIONS):
+                continue
+            url = f"{self.url}/{path.replace(os.sep, '/').lstrip('/')}?t={time.time_ns()}"
+            try:
+                with urllib.request.urlopen(url, timeout=timeout) as response:
+                    response.read()
+            except urllib.error.HTTPError:
+                ok = False
+            except Exception:
+                return None
+        self.last_compile_ok = ok
+        return ok
+
+    def stop(self, timeout=10.0):
+        if not self.is_running():
+            return
+        # npm spawns child processes, so signal the whole process group
+        try:
+            if os.name == "nt":
+                subprocess.run(f"taskkill /F /T /PID {self.process.pid}", shell=True, capture_output=True)
+            else:
+                os.killpg(os.getpgid(self.process.pid), signal.SIGTERM)
+            self.process.wait(timeout=timeout)
+        except (ProcessLookupError, subprocess.TimeoutExpired):
+            if os.name != "nt":
+                try:
+                    os.killpg(os.getpgid(self.process.pid), signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def status(self):
+        return {
+            "workdir": self.workdir,
+            "port": self.port,
+            "flavor": self.flavor,
+            "url": self.url,
+            "pid": self.process.pid if self.process else None,
+            "running": self.is_running(),
+            "ready": self.ready_at is not None,
+            "compiles": self.compile_count,
+            "last_compile_ok": self.last_compile_ok,
+            "startup_seconds": (self.ready_at - self.started_at) if self.ready_at else None,
+            "last_output": list(self.output)[-20:],
+        }
+
+
+class DevServerSupervisor:
+    """Keeps one long-lived dev server per project directory, each on its own port."""
+
+    def __init__(self, port_range=(3000, 3999)):
+        self.port_range = port_range
+        self.servers = {}
+        self._lock = threading.Lock()
+
+    def start(self, workdir, command="npm start", wait=True, timeout=180.0):
+        """
+        Start (or reuse) the dev server for workdir.
+
+        Returns:
+            DevServer: The running server; check `status()["ready"]` when wait=False.
+        """
+        key = os.path.abspath(workdir)
+        with self._lock:
+            server = self.servers.get(key)
+            if server is None or not server.is_running():
+                used_ports = {s.port for s in self.servers.values() if s.is_running()}
+                port = find_free_port(*self.port_range, exclude=used_ports)
+                server = DevServer(key, port, command=command)
+                server.start()
+                self.servers[key] = server
+        if wait:
+            server.wait_until_ready(timeout=timeout)
+        return server
+
+    def update(self, workdir, files, since=None, command="npm start", timeout=30.0):
+        """
+        Push files into workdir: hot (the running server recompiles) if its server is up,
+        otherwise write them and cold-start the server.
+
+        Returns:
+            dict: apply_update's result plus "mode" ("hot" or "cold") and the server status.
+        """
+        server = self.get(workdir)
+        targets = project_targets(workdir, files)
+        if server is not None and server.ready_at is not None:
+            update = server.apply_update(files, since=since, timeout=timeout)
+            update["mode"] = "hot"
+        else:
+            start = time.perf_counter()
+            with tracer.span("file.write", files=len(files)):
+                for path, content in files.items():
+                    full_path = targets[path]
+                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                    with open(full_path, "w", encoding="utf-8") as f:
+                        f.write(content)
+            server = self.start(workdir, command=command)
+            ready = server.status()["ready"]
+            update = {
+                "changed": list(files), "compiled": ready, "mode": "cold",
+                "write_to_compiled_s": time.perf_counter() - start if ready else None,
+                "write_to_served_s": time.perf_counter() - start if ready else None,
+            }
+        update["server"] = server.status()
+        return update
+
+    def get(self, workdir):
+        server = self.servers.get(os.path.abspath(workdir))
+        return server if server is not None and server.is_running() else None
+
+    def stop(self, workdir):
+        """Stop the dev server for workdir. Returns True if one was running."""
+        with self._lock:
+            server = self.servers.pop(os.path.abspath(workdir), None)
+        if server is None:
+            return False
+        server.stop()
+        return True
+
+    def stop_all(self):
+        for workdir in list(self.servers):
+            self.stop(workdir)
+
+    def status(self, workdir=None):
+        """Return the status of one server, or of every supervised server."""
+        if workdir is not None:
+            server = self.servers.get(os.path.abspath(workdir))
+            return server.status() if server else None
+        return [server.status() for server in self.servers.values()]
+
+
+# Shared supervisor used by the Streamlit apps and the AutoGen AppRunner
+supervisor = DevServerSupervisor()
+atexit.register(supervisor.stop_all)
@@ -0,0 +1,407 @@
+import os
+import re
+import json
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from code_blocks import parse_code_blocks, select_app_code, resolve_project_path
+from incremental import description_changes, file_hashes, load_state, read_previous_file, sha256
+from jsx_validator import validate_with_repair
+from llm_cache import result_cache, make_cache_key
+from llm_client import get_router
+from streaming import vision_messages
+from tracing import tracer
+
+# Upper bound on components per app; more would mostly add scheduling and rate-limit pressure
+MAX_COMPONENTS = 8
+# Component requests in flight at once (the router still enforces each key's budget)
+DEFAULT_FANOUT_WORKERS = int(os.getenv("FANOUT_WORKERS", "4"))
+
+PLAN_PROMPT = """
+You are an expert React developer. Split the application {source} into independent React components.
+Answer with JSON only, no prose and no code:
+{{"summary": "<one paragraph describing the whole application>",
+  "components": [{{"name": "<PascalCase name>", "spec": "<what it renders, its state, its behaviour and its inline styles>"}}]}}
+List at most {max_components} components, in the order they appear on the page. Every component is
+self-contained: it keeps its own state and takes no props.
+"""
+
+COMPONENT_PROMPT = """
+You are an expert React developer. Write the React component `{name}` (src/components/{name}.js) of this application:
+
+{summary}
+
+What `{name}` does: {spec}
+
+The page renders these components in order, each written separately (do not re-implement the others): {others}.
+
+Rules: one default-exported function component named {name} that takes no props; import only from 'react';
+pure inline styles (JavaScript style objects), no CSS files or class names. Return only the file, in a single
+```javascript code block.
+"""
+
+# Re-upload of an edited flowchart: the planner only answers with the components the edit affects,
+# every other component keeps its spec (and its file) as it is
+PLAN_UPDATE_PROMPT = """
+You are an expert React developer. An application was split into these independent React components:
+
+{previous}
+
+The application was then edited{edit}
+
+Answer with JSON only, no prose and no code, listing only what the edit affects:
+{{"summary": "<one paragraph describing the whole edited application>",
+  "changed": [{{"name": "<PascalCase name>", "spec": "<what it renders, its state, its behaviour and its inline styles>"}}],
+  "removed": ["<name of a component the edited application no longer has>"]}}
+"changed" holds components whose spec must change (under their existing name) and new components (under a new name).
+Leave every other component out. There are at most {max_components} components in total.
+"""
+EDIT_FROM_DESCRIPTION = """; these lines of its flowchart description changed (- removed, + added):
+
+{changes}
+"""
+EDIT_FROM_IMAGE = "; the edited flowchart is shown in the image."
+
+COMPONENT_REPAIR_PROMPT = """
+The following React component (src/components/{name}.js) does not parse. The JSX parser reported:
+
+{errors}
+
+Fix these errors without changing what the component does. Return the complete corrected
+file enclosed in triple backticks (```javascript).
+
+```javascript
+{code}
+```
+"""
+
+
+class ComponentSpec(NamedTuple):
+    name: str
+    spec: str
+
+    @property
+    def path(self) -> str:
+        return f"src/components/{self.name}.js"
+
+
+class FanoutResult(NamedTuple):
+    files: Dict[str, str]  # project-relative path -> code, App.js included; empty if planning failed
+    summary: str
+    components: List[dict]  # per component: name, spec, elapsed_s, validation, error, reused
+    plan_s: float
+    generate_s: float
+    total_s: float
+    removed: Tuple[str, ...] = ()  # generated files of components dropped from the plan (unmodified since)
+    state: Optional[dict] = None  # what incremental.save_state records once the files are written
+    plan_changes: Optional[dict] = None  # diff_plans against the previous plan (None on a first run)
+
+
+# Function to build a cached completion callable for one model: complete(prompt, image=None) -> text
+def router_completion(model: str, temperature: Optional[float] = None) -> Callable[..., str]:
+    """`image` is an optional (data, mime_type, image_hash) tuple; answers are cached like every other LLM result."""
+    def complete(prompt, image=None):
+        cache_key = make_cache_key(prompt, model, temperature, image[2] if image else "")
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        messages = vision_messages(prompt, image[0], image[1]) if image else [{"role": "user", "content": prompt}]
+        params = {"temperature": temperature} if temperature is not None else {}
+        response = get_router().chat(messages, model=model, **params)
+        content = response["choices"][0]["message"].get("content") or ""
+        if content:
+            result_cache.put(cache_key, content)
+        return content
+    return complete
+
+
+def _json_object(text: str):
+    # Models wrap JSON in prose or fences despite being asked not to; take the outermost object
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        return json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+
+
+def _component_name(raw) -> str:
+    words = re.findall(r"[A-Za-z0-9]+", str(raw or ""))
+    return "".join(word[:1].upper() + word[1:] for word in words)
+
+
+def parse_component_plan(text: str) -> Tuple[str, List[ComponentSpec]]:
+    """Summary and component specs from the planner's answer; names become unique PascalCase identifiers."""
+    data = _json_object(text) or {}
+    specs, seen = [], {"App"}
+    for item in data.get("components") or []:
+        if not isinstance(item, dict):
+            continue
+        name = _component_name(item.get("name"))
+        if not name or not name[0].isalpha():
+            name = f"Section{len(specs) + 1}"
+        while name in seen:
+            name += str(len(specs) + 1)
+        seen.add(name)
+        specs.append(ComponentSpec(name, str(item.get("spec") or item.get("description") or "").strip()))
+    return str(data.get("summary") or "").strip(), specs[:MAX_COMPONENTS]
+
+
+def apply_plan_update(previous: List[ComponentSpec], text: str) -> Optional[Tuple[str, List[ComponentSpec]]]:
+    """
+    Merge the planner's answer to PLAN_UPDATE_PROMPT into the previous plan: changed specs replace
+    theirs, new components are appended, removed ones dropped, everything else is kept verbatim.
+    None if the answer is not a JSON object (callers then plan from scratch).
+    """
+    data = _json_object(text)
+    if not isinstance(data, dict):
+        return None
+    removed = {_component_name(name) for name in data.get("removed") or []}
+    updates = {}
+    for item in data.get("changed") or []:
+        name = _component_name(item.get("name")) if isinstance(item, dict) else ""
+        spec = str(item.get("spec") or item.get("description") or "").strip() if name else ""
+        if name and name[0].isalpha() and name != "App" and spec:
+            updates[name] = ComponentSpec(name, spec)
+    specs = [updates.pop(spec.name, spec) for spec in previous if spec.name not in removed]
+    specs.extend(spec for spec in updates.values() if spec.name not in removed)
+    return str(data.get("summary") or "").strip(), specs[:MAX_COMPONENTS]
+
+
+def assemble_app(specs: List[ComponentSpec]) -> str:
+    """App.js that imports every generated component and renders them in plan order."""
+    imports = "\n".join(f"import {spec.name} from './components/{spec.name}';" for spec in specs)
+    children = "\n".join(f"      <{spec.name} />" for spec in specs)
+    return f"""import React from 'react';
+{imports}
+
+function App() {{
+  return (
+    <div style={{{{ fontFamily: 'sans-serif', padding: 24 }}}}>
+{children}
+    </div>
+  );
+}}
+
+export default App;
+"""
+
+
+def placeholder_component(spec: ComponentSpec) -> str:
+    # Stands in for a component that could not be generated, so the rest of the app still builds
+    return f"""import React from 'react';
+
+function {spec.name}() {{
+  return <div style={{{{ padding: 12, border: '1px dashed #999', color: '#666' }}}}>{{{json.dumps(spec.name + ': ' + spec.spec)}}}</div>;
+}}
+
+export default {spec.name};
+"""
+
+
+def _extract_code(text: str) -> Optional[str]:
+    code = select_app_code(parse_code_blocks(text or ""))
+    return code.strip() + "\n" if code and code.strip() else None
+
+
+def generate_component(spec: ComponentSpec, summary: str, specs: List[ComponentSpec], complete,
+                       project_dir: Optional[str] = None, repair_rounds: int = 1) -> dict:
+    """Generate, syntax-check and (if needed) repair one component; falls back to a placeholder."""
+    start = time.perf_counter()
+    outcome = {"name": spec.name, "spec": spec.spec, "path": spec.path, "validation": None, "error": None}
+    with tracer.span("fanout.component", component=spec.name):
+        others = ", ".join(other.name for other in specs if other.name != spec.name) or "none"
+        try:
+            code = _extract_code(complete(COMPONENT_PROMPT.format(name=spec.name, summary=summary, spec=spec.spec, others=others)))
+        except Exception as e:
+            code, outcome["error"] = None, f"{type(e).__name__}: {e}"
+        if code is None:
+            outcome["error"] = outcome["error"] or "No code block in the response."
+        else:
+            def repair(broken, errors):
+                return _extract_code(complete(COMPONENT_REPAIR_PROMPT.format(name=spec.name, errors=errors, code=broken)))
+
+            code, outcome["validation"] = validate_with_repair(code, spec.path, project_dir, repair, rounds=repair_rounds)
+            if outcome["validation"]["ok"] is False:
+                code, outcome["error"] = None, "Still does not parse after repair."
+    outcome["code"] = code if code is not None else placeholder_component(spec)
+    outcome["elapsed_s"] = time.perf_counter() - start
+    return outcome
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return file.read()
+    except OSError:
+        return None
+
+
+def diff_plans(previous: List[ComponentSpec], current: List[ComponentSpec]) -> dict:
+    """Component names grouped by what happened to them between two plans."""
+    before = {spec.name: spec.spec for spec in previous}
+    after = {spec.name: spec.spec for spec in current}
+    return {
+        "unchanged": [name for name in after if before.get(name) == after[name]],
+        "changed": [name for name in after if name in before and before[name] != after[name]],
+        "added": [name for name in after if name not in before],
+        "removed": [name for name in before if name not in after],
+    }
+
+
+def _reusable_code(project_dir: Optional[str], previous: Optional[dict], spec: ComponentSpec) -> Optional[str]:
+    # An unchanged component keeps its file as it is on disk, including any hand edits;
+    # it is regenerated only if the file is gone or was a placeholder (no recorded hash)
+    if not project_dir or not previous:
+        return None
+    recorded = next((c for c in previous.get("components", []) if c["name"] == spec.name), None)
+    if recorded is None or not recorded.get("sha256"):
+        return None
+    return read_previous_file(project_dir, previous, spec.path)
+
+
+def generate_fanout(complete, description: Optional[str] = None, image=None, project_dir: Optional[str] = None,
+                    repair_rounds: int = 1, max_workers: int = DEFAULT_FANOUT_WORKERS,
+                    on_component: Optional[Callable[[dict], None]] = None, component_complete=None,
+                    incremental: bool = True) -> FanoutResult:
+    """
+    Fan-out/fan-in generation: one planning call splits the app (from `description` text or an
+    `image` tuple) into component specs, the components are generated concurrently, and a
+    deterministic App.js wires them together.
+
+    With `incremental`, the state recorded in project_dir by the previous run (see incremental.py)
+    is diffed against the new upload: an identical flowchart reuses everything without any LLM call;
+    otherwise the planner only sees what changed (the changed description lines, or the edited
+    image) and answers with the affected components, and diff_plans decides which components are
+    regenerated, kept as they are on disk or removed.
+
+    `component_complete` overrides the completion used for the component calls (e.g. a text
+    model when planning needs the vision model). `on_component(outcome)` is called from the
+    worker threads as each component finishes. Returns empty `files` when the plan has no
+    components, so callers can fall back to the single-call path.
+    """
+    start = time.perf_counter()
+    source_key = image[2] if image else sha256(description or "")
+    previous = load_state(project_dir) if incremental and project_dir else None
+    previous_specs = [ComponentSpec(c["name"], c["spec"]) for c in (previous or {}).get("components") or []]
+    node_changes = None
+    if previous_specs and description is not None and previous.get("description") is not None:
+        node_changes = description_changes(previous["description"], description)
+
+    with tracer.span("fanout.plan") as span:
+        planned = None
+        if previous_specs and (previous.get("source") == source_key or node_changes == []):
+            # Same flowchart as last time: keep the plan, no planning call
+            planned = previous.get("summary", ""), previous_specs
+            span.set(reused=True)
+        elif previous_specs and (node_changes or image):
+            edit = EDIT_FROM_DESCRIPTION.format(changes="\n".join(node_changes)) if node_changes else EDIT_FROM_IMAGE
+            prompt = PLAN_UPDATE_PROMPT.format(previous=json.dumps({"components": [spec._asdict() for spec in previous_specs]}, indent=2),
+                                               edit=edit, max_components=MAX_COMPONENTS)
+            planned = apply_plan_update(previous_specs, complete(prompt, image))
+            span.set(update=True, changed_lines=len(node_changes or []))
+        if planned is None:
+            source = "shown in the flowchart image" if image else f"described below:\n\n{description}"
+            planned = parse_component_plan(complete(PLAN_PROMPT.format(source=source, max_components=MAX_COMPONENTS), image))
+    summary, specs = planned
+    summary = summary or description or ""
+    plan_s = time.perf_counter() - start
+    if not specs:
+        return FanoutResult({}, summary, [], plan_s, 0.0, plan_s)
+
+    changes = diff_plans(previous_specs, specs) if previous else None
+    unchanged = set(changes["unchanged"]) if changes else set()
+    component_complete = component_complete or complete
+
+    def build(spec):
+        code = _reusable_code(project_dir, previous, spec) if spec.name in unchanged else None
+        if code is not None:
+            outcome = {"name": spec.name, "spec": spec.spec, "path": spec.path, "validation": None, "error": None,
+                       "code": code, "elapsed_s": 0.0, "reused": True}
+        else:
+            outcome = dict(generate_component(spec, summary, specs, component_complete, project_dir, repair_rounds), reused=False)
+        if on_component is not None:
+            on_component(outcome)
+        return outcome
+
+    generate_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(specs))), thread_name_prefix="fanout") as pool:
+        # Each worker runs in a copy of this context so its spans join the caller's trace
+        futures = [pool.submit(contextvars.copy_context().run, build, spec) for spec in specs]
+        outcomes = [future.result() for future in futures]
+    generate_s = time.perf_counter() - generate_start
+
+    files = {outcome["path"]: outcome["code"] for outcome in outcomes}
+    files["src/App.js"] = assemble_app(specs)
+    components = [{key: value for key, value in outcome.items() if key != "code"} for outcome in outcomes]
+
+    # Files of dropped components are removed only if nobody edited them since they were generated
+    removed = []
+    for recorded in (previous or {}).get("components") or []:
+        if recorded["name"] in (changes or {}).get("removed", []) and recorded["path"] not in files:
+            code = read_previous_file(project_dir, previous, recorded["path"])
+            if code is not None and sha256(code) == recorded.get("sha256"):
+                removed.append(recorded["path"])
+
+    state = {
+        "source": source_key,
+        "description": description,
+        "summary": summary,
+        # Placeholders are not recorded as generated, so the next run retries them
+        "components": [{"name": o["name"], "spec": o["spec"], "path": o["path"],
+                        "sha256": None if o["error"] else sha256(o["code"])} for o in outcomes],
+        "files": file_hashes(files),
+    }
+    return FanoutResult(files, summary, components, plan_s, generate_s, time.perf_counter() - start, tuple(removed), state, changes)
+
+
+def fanout_report(fanned: FanoutResult) -> dict:
+    """JSON-serializable summary of a fan-out run for job results."""
+    return {
+        "summary": fanned.summary,
+        "components": fanned.components,
+        "plan_s": fanned.plan_s,
+        "generate_s": fanned.generate_s,
+        "total_s": fanned.total_s,
+        "reused": [c["name"] for c in fanned.components if c.get("reused")],
+        "removed": fanned.removed,
+        "plan_changes": fanned.plan_changes,
+    }
+
+
+# Function to delete the files of components that were dropped from the plan
+def remove_project_files(project_path: str, paths) -> None:
+    for path in paths:
+        full_path = resolve_project_path(project_path, path)
+        if full_path is None:
+            continue
+        try:
+            os.remove(full_path)
+        except FileNotFoundError:
+            pass
+
+
+# Function to write the assembled src/ tree into the project (identical files are left untouched)
+def write_project_files(project_path: str, files: Dict[str, str], removed: List[str] = ()) -> str:
+    try:
+        targets = {path: resolve_project_path(project_path, path) for path in files}
+        outside = [path for path, full_path in targets.items() if full_path is None]
+        if outside:
+            return f"Error writing generated files: outside the project: {', '.join(outside)}"
+        written = []
+        for path, code in files.items():
+            full_path = targets[path]
+            if _read(full_path) == code:
+                continue
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with tracer.span("file.write", path=path), open(full_path, "w", encoding="utf-8") as file:
+                file.write(code)
+            written.append(path)
+        remove_project_files(project_path, removed)
+        message = f"Wrote {len(written)} of {len(files)} files" + (f": {', '.join(sorted(written))}" if written else "")
+        return message + (f"; removed {', '.join(removed)}." if removed else ".")
+    except Exception as e:
+        return f"Error writing generated files: {e}"
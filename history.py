@@ -0,0 +1,244 @@
+"""
+Generation history: every finished job's files, extracted text, model and timings in SQLite.
+
+Usage:
+    python history.py list --project D:/my-react-app
+    python history.py list --image <image hash> --since 2026-10-01
+    python history.py restore 42 --workdir D:/restored-app
+"""
+import os
+import sys
+import json
+import argparse
+import datetime
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+from tracing import tracer
+
+# Default location of the generation history (override with HISTORY_PATH)
+DEFAULT_HISTORY_PATH = os.getenv("HISTORY_PATH", os.path.join(".cache", "history.sqlite3"))
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class GenerationHistory:
+    """
+    Every finished generation, stored in a single SQLite file.
+
+    File contents live in a content-addressed `blobs` table, so regenerating an app that changed
+    in one component adds one blob, not a copy of the whole tree.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """CREATE TABLE IF NOT EXISTS generations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT,
+                created REAL NOT NULL,
+                project_path TEXT,
+                image_hash TEXT,
+                extracted_text TEXT,
+                model TEXT,
+                timings TEXT,
+                meta TEXT
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS generation_files (
+                generation_id INTEGER NOT NULL REFERENCES generations (id) ON DELETE CASCADE,
+                path TEXT NOT NULL,
+                hash TEXT NOT NULL REFERENCES blobs (hash),
+                PRIMARY KEY (generation_id, path)
+            );
+            CREATE INDEX IF NOT EXISTS generations_image ON generations (image_hash, created);
+            CREATE INDEX IF NOT EXISTS generations_project ON generations (project_path, created);
+            CREATE INDEX IF NOT EXISTS generations_created ON generations (created);
+            CREATE INDEX IF NOT EXISTS generation_files_hash ON generation_files (hash);"""
+        )
+        self._conn.commit()
+
+    def record(self, files: Dict[str, str], image_hash: Optional[str] = None, project_path: Optional[str] = None,
+               extracted_text: Optional[str] = None, model: Optional[str] = None, timings: Optional[dict] = None,
+               job_id: Optional[str] = None, meta: Optional[dict] = None) -> int:
+        """Store one generation ({relative path: content} plus what produced it) and return its id."""
+        project_path = os.path.abspath(project_path) if project_path else None
+        with tracer.span("history.record", files=len(files)), self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO generations (job_id, created, project_path, image_hash, extracted_text, model, timings, meta) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, time.time(), project_path, image_hash, extracted_text, model,
+                 json.dumps(timings) if timings is not None else None, json.dumps(meta or {})),
+            )
+            generation_id = cursor.lastrowid
+            for path, content in files.items():
+                digest = content_hash(content)
+                self._conn.execute("INSERT OR IGNORE INTO blobs (hash, content, size) VALUES (?, ?, ?)",
+                                   (digest, content, len(content.encode("utf-8"))))
+                self._conn.execute("INSERT OR REPLACE INTO generation_files (generation_id, path, hash) VALUES (?, ?, ?)",
+                                   (generation_id, path.replace("\\", "/"), digest))
+            self._conn.commit()
+        return generation_id
+
+    def _row(self, row) -> dict:
+        generation_id, job_id, created, project_path, image_hash, extracted_text, model, timings, meta, file_count = row
+        return {
+            "id": generation_id, "job_id": job_id, "created": created, "project_path": project_path,
+            "image_hash": image_hash, "extracted_text": extracted_text, "model": model,
+            "timings": json.loads(timings) if timings else None, "meta": json.loads(meta) if meta else {},
+            "file_count": file_count,
+        }
+
+    def find(self, image_hash: Optional[str] = None, project_path: Optional[str] = None, since: Optional[float] = None,
+             until: Optional[float] = None, limit: int = 20) -> List[dict]:
+        """Most recent generations first, filtered by image, project and/or a created-at range (epoch seconds)."""
+        clauses, params = [], []
+        if image_hash:
+            clauses.append("g.image_hash = ?")
+            params.append(image_hash)
+        if project_path:
+            clauses.append("g.project_path = ?")
+            params.append(os.path.abspath(project_path))
+        if since is not None:
+            clauses.append("g.created >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("g.created < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT g.id, g.job_id, g.created, g.project_path, g.image_hash, g.extracted_text, g.model, g.timings, g.meta, "
+                f"(SELECT COUNT(*) FROM generation_files f WHERE f.generation_id = g.id) FROM generations g {where} "
+                "ORDER BY g.created DESC, g.id DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def get(self, generation_id: int) -> Optional[dict]:
+        """One generation with its files."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT g.id, g.job_id, g.created, g.project_path, g.image_hash, g.extracted_text, g.model, g.timings, g.meta, "
+                "(SELECT COUNT(*) FROM generation_files f WHERE f.generation_id = g.id) FROM generations g WHERE g.id = ?",
+                (generation_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(self._row(row), files=self.files(generation_id))
+
+    def files(self, generation_id: int) -> Dict[str, str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT f.path, b.content FROM generation_files f JOIN blobs b ON b.hash = f.hash "
+                "WHERE f.generation_id = ? ORDER BY f.path",
+                (generation_id,),
+            ).fetchall()
+        return dict(rows)
+
+    def restore(self, generation_id: int, workdir: Optional[str] = None) -> dict:
+        """
+        Rematerialize a stored generation into workdir (default: the project it was generated for), no LLM call.
+
+        A workdir without a project is scaffolded from the pool first (if the generation used a scaffold). If its dev server is running the
+        files are pushed into it (hot update), otherwise they are written; identical files are not touched.
+
+        Returns:
+            dict: The workdir, the paths written, how many files were unchanged, the mode and elapsed seconds.
+
+        Raises KeyError for an unknown id and ValueError if a stored path would land outside workdir.
+        """
+        from dev_server import supervisor, project_targets
+        from scaffold_pool import get_scaffold_pool
+
+        start = time.perf_counter()
+        generation = self.get(generation_id)
+        if generation is None:
+            raise KeyError(f"No generation with id {generation_id}")
+        workdir = workdir or generation["project_path"]
+        files = {path.replace("/", os.sep): content for path, content in generation["files"].items()}
+        targets = project_targets(workdir, files)
+        with tracer.span("history.restore", generation_id=generation_id, files=len(files)):
+            scaffold = generation["meta"].get("scaffold")
+            if scaffold and not os.path.exists(os.path.join(workdir, "package.json")):
+                get_scaffold_pool(scaffold).acquire(workdir)
+            if supervisor.get(workdir) is not None:
+                update = supervisor.update(workdir, files)
+                written, mode = update["changed"], update["mode"]
+            else:
+                written, mode = [], "write"
+                for path, content in files.items():
+                    full_path = targets[path]
+                    try:
+                        with open(full_path, "r", encoding="utf-8") as f:
+                            if f.read() == content:
+                                continue
+                    except OSError:
+                        pass
+                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                    with open(full_path, "w", encoding="utf-8") as f:
+                        f.write(content)
+                    written.append(path)
+        return {"workdir": workdir, "written": written, "unchanged": len(files) - len(written), "mode": mode,
+                "elapsed_s": time.perf_counter() - start}
+
+    def stats(self) -> dict:
+        """Generation and blob counts; `bytes` is what the deduplicated file contents take."""
+        with self._lock:
+            generations = self._conn.execute("SELECT COUNT(*) FROM generations").fetchone()[0]
+            files = self._conn.execute("SELECT COUNT(*) FROM generation_files").fetchone()[0]
+            blobs, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        return {"generations": generations, "files": files, "blobs": blobs, "bytes": total}
+
+
+# Shared history used by the Streamlit apps and the batch CLI
+history = GenerationHistory()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_parser = commands.add_parser("list", help="Show recent generations")
+    list_parser.add_argument("--image", default=None, help="Only generations of this image hash")
+    list_parser.add_argument("--project", default=None, help="Only generations written to this project directory")
+    list_parser.add_argument("--since", default=None, help="Only generations on or after this date (YYYY-MM-DD)")
+    list_parser.add_argument("--limit", type=int, default=20)
+    restore_parser = commands.add_parser("restore", help="Write a previous generation back into a project, without any LLM call")
+    restore_parser.add_argument("generation_id", type=int)
+    restore_parser.add_argument("--workdir", default=None, help="Target directory (default: the project it was generated for)")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        since = datetime.datetime.fromisoformat(args.since).timestamp() if args.since else None
+        for generation in history.find(image_hash=args.image, project_path=args.project, since=since, limit=args.limit):
+            created = datetime.datetime.fromtimestamp(generation["created"]).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"{generation['id']:>5}  {created}  {generation['file_count']:>3} files  {generation['model'] or '-'}  "
+                  f"{(generation['image_hash'] or '-')[:12]}  {generation['project_path'] or '-'}")
+        print(json.dumps(history.stats()))
+        return 0
+
+    try:
+        restored = history.restore(args.generation_id, args.workdir)
+    except (KeyError, ValueError) as e:
+        print(e.args[0])
+        return 1
+    print(f"Restored generation {args.generation_id} into {restored['workdir']}: {len(restored['written'])} written, "
+          f"{restored['unchanged']} unchanged ({restored['mode']}) in {restored['elapsed_s']:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+import time
+import threading
+from io import BytesIO
+from typing import NamedTuple, Optional, Union
+
+from PIL import Image, ImageChops, ImageOps, ImageStat
+
+from tracing import tracer
+
+# Longest side sent to the vision model; flowchart text stays legible well below this
+MAX_DIMENSION = 1568
+# Pixels differing less than this from the background count as whitespace
+WHITESPACE_THRESHOLD = 24
+# Margin kept around the content, as a fraction of the longest side (scale-invariant for hashing)
+CROP_PADDING = 0.005
+# Max per-channel spread for an image to be treated as grayscale
+GRAYSCALE_TOLERANCE = 12
+# Mean absolute error (0-255) accepted when reducing a diagram to a palette
+PALETTE_MAX_ERROR = 2.0
+PALETTE_COLORS = 64
+# Perceptual hashes closer than this (in bits) are treated as the same diagram
+NEAR_DUPLICATE_DISTANCE = 6
+
+
+class PreprocessResult(NamedTuple):
+    image: Image.Image
+    data: bytes
+    mime_type: str
+    original_bytes: int
+    processed_bytes: int
+    original_size: tuple
+    size: tuple
+    phash: str
+    elapsed_s: float
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.processed_bytes
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """Apply EXIF rotation and composite transparency onto white."""
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        background = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+        return Image.alpha_composite(background, rgba).convert("RGB")
+    return image.convert("RGB")
+
+
+def crop_whitespace(image: Image.Image) -> Image.Image:
+    """Crop uniform margins, using the top-left pixel as the background colour."""
+    background = Image.new(image.mode, image.size, image.getpixel((0, 0)))
+    diff = ImageChops.difference(image, background).convert("L")
+    bbox = diff.point(lambda value: 255 if value > WHITESPACE_THRESHOLD else 0).getbbox()
+    if not bbox:
+        return image
+    left, top, right, bottom = bbox
+    padding = max(2, round(max(image.size) * CROP_PADDING))
+    return image.crop((
+        max(0, left - padding),
+        max(0, top - padding),
+        min(image.width, right + padding),
+        min(image.height, bottom + padding),
+    ))
+
+
+def reduce_colors(image: Image.Image) -> Image.Image:
+    """Convert to grayscale or a small palette when that loses (almost) nothing."""
+    red, green, blue = image.split()
+    spread = max(
+        ImageChops.difference(red, green).getextrema()[1],
+        ImageChops.difference(green, blue).getextrema()[1],
+    )
+    if spread <= GRAYSCALE_TOLERANCE:
+        return image.convert("L")
+
+    # Exact palette if the diagram uses few colours, otherwise accept a quantized one if it is close enough
+    colors = image.getcolors(maxcolors=256)
+    if colors is not None:
+        return image.quantize(colors=len(colors), method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+    quantized = image.quantize(colors=PALETTE_COLORS, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+    error = ImageStat.Stat(ImageChops.difference(image, quantized.convert("RGB"))).mean
+    return quantized if max(error) <= PALETTE_MAX_ERROR else image
+
+
+def encode(image: Image.Image) -> tuple:
+    """Return (bytes, mime type) of the smallest suitable encoding."""
+    png = BytesIO()
+    image.save(png, format="PNG", optimize=True)
+    candidates = [(png.getvalue(), "image/png")]
+    if image.mode == "RGB":
+        # Photos of whiteboards compress far better as JPEG
+        jpeg = BytesIO()
+        image.save(jpeg, format="JPEG", quality=85, optimize=True)
+        candidates.append((jpeg.getvalue(), "image/jpeg"))
+    return min(candidates, key=lambda candidate: len(candidate[0]))
+
+
+def perceptual_hash(image: Image.Image) -> str:
+    """64-bit difference hash (dHash) as 16 hex digits; robust to rescaling and re-encoding."""
+    small = image.convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    pixels = small.tobytes()  # one byte per pixel in mode L
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return f"{bits:016x}"
+
+
+def hamming_distance(hash_a: str, hash_b: str) -> int:
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
+
+
+def preprocess_flowchart(source: Union[bytes, Image.Image], max_dimension: int = MAX_DIMENSION) -> PreprocessResult:
+    """Bound resolution, crop whitespace, reduce colours and re-encode a flowchart image."""
+    start = time.perf_counter()
+    if isinstance(source, (bytes, bytearray)):
+        original_bytes = len(source)
+        with tracer.span("image.decode", bytes=original_bytes):
+            image = Image.open(BytesIO(source))
+            image.load()
+    else:
+        image = source
+        buffer = BytesIO()
+        image.save(buffer, format=image.format or "PNG")
+        original_bytes = len(buffer.getvalue())
+    original_size = image.size
+
+    image = crop_whitespace(_flatten(image))
+    image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    phash = perceptual_hash(image)
+    image = reduce_colors(image)
+    data, mime_type = encode(image)
+
+    # Hand the model the re-encoded image so what is sent matches what was measured
+    processed = Image.open(BytesIO(data))
+    processed.load()
+    return PreprocessResult(
+        image=processed,
+        data=data,
+        mime_type=mime_type,
+        original_bytes=original_bytes,
+        processed_bytes=len(data),
+        original_size=original_size,
+        size=processed.size,
+        phash=phash,
+        elapsed_s=time.perf_counter() - start,
+    )
+
+
+class NearDuplicateIndex:
+    """Maps perceptual hashes to the fingerprint of the first image seen that looks like them."""
+
+    def __init__(self, max_distance: int = NEAR_DUPLICATE_DISTANCE, max_entries: int = 1000):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self._entries = []
+        self._lock = threading.Lock()
+
+    def find(self, phash: str) -> Optional[str]:
+        with self._lock:
+            best = min(self._entries, key=lambda entry: hamming_distance(entry[0], phash), default=None)
+        if best is not None and hamming_distance(best[0], phash) <= self.max_distance:
+            return best[1]
+        return None
+
+    def canonical(self, phash: str, fingerprint: str) -> str:
+        """Return the fingerprint of a known near-duplicate, or register and return this one."""
+        existing = self.find(phash)
+        if existing is not None:
+            return existing
+        with self._lock:
+            self._entries.append((phash, fingerprint))
+            del self._entries[:-self.max_entries]
+        return fingerprint
+
+
+# Shared index used by the Streamlit apps
+near_duplicates = NearDuplicateIndex()
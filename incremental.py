@@ -0,0 +1,74 @@
+import os
+import json
+import difflib
+import hashlib
+from typing import Dict, List, Optional
+
+from code_blocks import resolve_project_path
+
+# What the last generation into a project was made from (source key, flowchart description, fan-out
+# plan) and the hashes of the files it wrote; kept in the project root so a re-upload only regenerates
+# what changed
+STATE_FILE = ".flowchart-state.json"
+
+
+def sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_hashes(files: Dict[str, str]) -> Dict[str, str]:
+    """{project-relative path with forward slashes: sha256 of its content}"""
+    return {path.replace("\\", "/"): sha256(content) for path, content in files.items()}
+
+
+def load_state(project_dir: str) -> Optional[dict]:
+    """The state recorded by the last generation into project_dir, if any."""
+    try:
+        with open(os.path.join(project_dir, STATE_FILE), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def save_state(project_dir: str, state: dict) -> None:
+    path = os.path.join(project_dir, STATE_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(state, file, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_previous_file(project_dir: str, state: Optional[dict], path: str) -> Optional[str]:
+    """
+    A file the previous generation wrote, as it is on disk now (hand edits included).
+    None if the state does not record it or it is gone.
+    """
+    if not state or path.replace("\\", "/") not in (state.get("files") or {}):
+        return None
+    full_path = resolve_project_path(project_dir, path)
+    if full_path is None:
+        return None
+    try:
+        with open(full_path, "r", encoding="utf-8") as file:
+            return file.read()
+    except OSError:
+        return None
+
+
+def description_nodes(description: str) -> List[str]:
+    # extract_from_flowchart describes one node or edge per line (or bullet); blank lines carry nothing
+    return [line.strip() for line in (description or "").splitlines() if line.strip()]
+
+
+def description_changes(previous: str, current: str) -> List[str]:
+    """
+    The nodes (non-empty lines) of a flowchart description that changed between two uploads:
+    "- <line>" for removed or replaced ones, "+ <line>" for new ones. Empty when nothing changed.
+    """
+    before, after = description_nodes(previous), description_nodes(current)
+    changes = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, before, after, autojunk=False).get_opcodes():
+        if tag != "equal":
+            changes.extend(f"- {line}" for line in before[i1:i2])
+            changes.extend(f"+ {line}" for line in after[j1:j2])
+    return changes
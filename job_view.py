@@ -0,0 +1,196 @@
+import json
+import time
+import datetime
+
+import streamlit as st
+
+from jobs import JobQueue, FINISHED_STATUSES
+from history import history
+from tracing import tracer, summarize_spans
+
+# How often an unfinished job's status is re-read (also bounds how late streamed code shows up)
+POLL_SECONDS = 1
+
+
+@st.cache_resource(show_spinner=False)
+def get_job_queue():
+    """One worker pool per server process, shared by every browser session."""
+    return JobQueue()
+
+
+def track_job(job_id):
+    """Remember the job in the session and the URL, so a page refresh reattaches to it."""
+    st.session_state["job_id"] = job_id
+    st.query_params["job"] = job_id
+
+
+def current_job_id():
+    return st.session_state.get("job_id") or st.query_params.get("job")
+
+
+def _render_status(queue, job):
+    elapsed = (job.get("finished_at") or time.time()) - (job.get("started_at") or job["created_at"])
+    st.write(f"Job `{job['id']}`: **{job['status']}** ({elapsed:.0f}s)")
+    for event in job["events"]:
+        st.write(f"- {event['stage']}: {event['message']}")
+    live = job.get("live") or {}
+    if job["status"] not in FINISHED_STATUSES:
+        for path in live.get("files", []):
+            st.write(f"✔ wrote `{path}`")
+        if live.get("text"):
+            st.code(live["text"], language="markdown")
+        if live.get("command_output"):
+            st.code("\n".join(live["command_output"]), language="text")
+    if job["status"] not in FINISHED_STATUSES and st.button("Cancel job", key=f"cancel-{job['id']}"):
+        queue.cancel(job["id"])
+
+
+def render_job(queue, job_id, render_result):
+    """Show progress of a job without blocking the script, then hand the finished result to render_result."""
+    job = queue.get(job_id)
+    if job is None:
+        st.warning(f"Job {job_id} not found.")
+        return
+
+    if job["status"] in FINISHED_STATUSES:
+        _render_status(queue, job)
+        if job["status"] == "succeeded":
+            render_result(job["result"])
+        elif job["status"] == "failed":
+            st.error(job["error"])
+        return
+
+    # Poll inside a fragment so only this block reruns; a full rerun shows the result once the job is done
+    @st.fragment(run_every=POLL_SECONDS)
+    def poll():
+        latest = queue.get(job_id)
+        if latest["status"] in FINISHED_STATUSES:
+            st.rerun()
+        _render_status(queue, latest)
+
+    poll()
+
+
+def render_job_history(queue):
+    """Sidebar list of recent jobs; clicking one reattaches the page to it."""
+    st.header("Jobs")
+    st.caption(f"{queue.queue_depth()} active, {queue.workers} workers")
+    for job in queue.list(limit=10):
+        if st.button(f"{job['id']} · {job['status']}", key=f"job-{job['id']}"):
+            track_job(job["id"])
+            st.rerun()
+
+
+def render_history(project_path, limit=10):
+    """Sidebar list of earlier generations for the project; "Restore" writes one back without any model call."""
+    st.header("History")
+    generations = history.find(project_path=project_path, limit=limit)
+    if not generations:
+        st.caption("Nothing generated into this project yet.")
+        return
+    for generation in generations:
+        created = datetime.datetime.fromtimestamp(generation["created"]).strftime("%Y-%m-%d %H:%M")
+        st.caption(f"#{generation['id']} · {created} · {generation['file_count']} files · {generation['model']}")
+        if st.button("Restore", key=f"restore-{generation['id']}"):
+            with st.spinner("Restoring..."):
+                restored = history.restore(generation["id"], project_path)
+            st.success(f"Restored #{generation['id']}: {len(restored['written'])} written, {restored['unchanged']} unchanged "
+                       f"({restored['mode']}) in {restored['elapsed_s']:.2f}s")
+
+
+def render_trace_panel(job_id):
+    """Sidebar breakdown of where the current job spent its time and tokens; refreshes while it runs."""
+    st.header("Trace")
+    if not job_id:
+        st.caption("No job selected.")
+        return
+    # A finished (or unknown) job's trace no longer changes, so it is rendered once instead of polled
+    job = get_job_queue().get(job_id)
+    running = job is not None and job["status"] not in FINISHED_STATUSES
+
+    @st.fragment(run_every=POLL_SECONDS if running else None)
+    def panel():
+        spans = tracer.spans_for(job_id)
+        if not spans:
+            st.caption("No spans recorded for this job yet.")
+            return
+        rows = summarize_spans(spans)
+        job_span = next((span for span in spans if span["name"] == "job"), None)
+        total = f"{job_span['duration_s']:.1f}s" if job_span else "running"
+        st.caption(f"{total} · {sum(row['prompt_tokens'] for row in rows)} prompt / "
+                   f"{sum(row['completion_tokens'] for row in rows)} completion tokens · "
+                   f"${sum(row['cost_usd'] for row in rows):.4f}")
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+        st.download_button("Download trace (JSONL)", "".join(json.dumps(span, default=str) + "\n" for span in spans),
+                           file_name=f"trace-{job_id}.jsonl", mime="application/jsonl", key=f"trace-{job_id}")
+
+    panel()
+
+
+def render_streaming_metrics(metrics):
+    """Latency of the streamed response, measured from the start of the model call."""
+    def seconds(value):
+        return f"{value:.2f}s" if value is not None else "n/a"
+
+    columns = st.columns(4)
+    columns[0].metric("First token", seconds(metrics["first_token_s"]))
+    columns[1].metric("First code visible", seconds(metrics["first_partial_code_s"]))
+    columns[2].metric("First file written", seconds(metrics["first_code_s"]))
+    columns[3].metric("Full response", seconds(metrics["total_s"]))
+    if metrics.get("files_written_while_streaming"):
+        st.caption("Written while streaming: " + ", ".join(metrics["files_written_while_streaming"]))
+
+
+def render_fanout(fanout):
+    """Plan and per-component timings of a parallel (fan-out) generation."""
+    reused = fanout.get("reused", [])
+    st.caption(f"{len(fanout['components'])} components ({len(reused)} unchanged and kept): planned in {fanout['plan_s']:.2f}s, "
+               f"generated in parallel in {fanout['generate_s']:.2f}s ({fanout['total_s']:.2f}s total)")
+    st.dataframe(
+        [{"component": c["name"], "seconds": round(c["elapsed_s"], 2),
+          "status": c["error"] or ("unchanged" if c.get("reused") else "generated")} for c in fanout["components"]],
+        hide_index=True, use_container_width=True,
+    )
+    if fanout.get("removed"):
+        st.caption("Removed: " + ", ".join(fanout["removed"]))
+    failed = [c["name"] for c in fanout["components"] if c["error"]]
+    if failed:
+        st.warning("Replaced with placeholders: " + ", ".join(failed))
+
+
+def render_incremental(incremental):
+    """What a re-upload of a flowchart generated into this project before sent to the model."""
+    changes = incremental["changes"]
+    if not changes:
+        st.caption("Same flowchart as last time: kept the existing App.js, no model call.")
+        return
+    st.caption(f"Edited flowchart: only {len(changes)} changed description line(s) were sent to the model with the current App.js.")
+    with st.expander("Changed lines"):
+        st.code("\n".join(changes), language="diff")
+
+
+def render_hot_update(update):
+    """How long a change pushed into the running dev server took to recompile and be served."""
+    if not update["changed"]:
+        st.caption("Hot update: no file changed, the running app is current.")
+    elif update["write_to_compiled_s"] is None:
+        st.warning("Hot update: the dev server did not report a recompile in time.")
+    else:
+        served = update["write_to_served_s"]
+        st.caption(f"Hot update of {', '.join(update['changed'])}: recompiled in {update['write_to_compiled_s']:.2f}s"
+                   + (f", served in {served:.2f}s" if served is not None else ""))
+
+
+def render_validation(report):
+    """Outcome of the pre-flight syntax check and the repair round."""
+    if report["ok"] is None:
+        st.caption("Syntax check skipped: no JSX parser available (node_modules not installed yet).")
+    elif report["ok"]:
+        repaired = f" after {report['repair_rounds']} repair round(s)" if report["repair_rounds"] else ""
+        st.caption(f"Syntax check passed{repaired}.")
+    else:
+        st.error("Generated code still has syntax errors:")
+        st.code(report["remaining_errors"])
+    if report["repair_rounds"] and report["errors"]:
+        with st.expander("Errors sent back to the model"):
+            st.code(report["errors"])
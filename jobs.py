@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import uuid
+import threading
+
+from tracing import tracer, trace_context
+from concurrent.futures import ThreadPoolExecutor
+
+# Where job status files are kept (override with JOB_STORE_DIR)
+DEFAULT_STORE_DIR = os.getenv("JOB_STORE_DIR", os.path.join(".cache", "jobs"))
+DEFAULT_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Finished jobs' status files are deleted after this many days, and beyond this many (override with JOB_RETENTION_DAYS / JOB_RETENTION_COUNT)
+JOB_RETENTION_DAYS = float(os.getenv("JOB_RETENTION_DAYS", "7"))
+JOB_RETENTION_COUNT = int(os.getenv("JOB_RETENTION_COUNT", "200"))
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled", "interrupted")
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function when its job was cancelled."""
+
+
+def _pid_alive(pid):
+    if os.name == "nt":
+        # os.kill would terminate the process on Windows, so ask for a handle instead
+        import ctypes
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Job:
+    """A unit of work running on the JobQueue; job functions receive it to report progress."""
+
+    def __init__(self, queue, job_id, kind, params):
+        self._queue = queue
+        self.id = job_id
+        self.kind = kind
+        self.params = params
+        self.status = "queued"
+        self.events = []
+        self.result = None
+        self.error = None
+        self.live = {}
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = threading.Event()
+
+    def report(self, stage, message="", **data):
+        """Record a progress event and persist it so other sessions (and page refreshes) can see it."""
+        self.events.append({"time": time.time(), "stage": stage, "message": message, **data})
+        self._queue._save(self)
+
+    def set_live(self, **values):
+        """Update fast-changing in-memory state (e.g. streamed text); not written to disk on every call."""
+        self.live.update(values)
+
+    def check_cancelled(self):
+        """Call between stages; raises JobCancelled once cancellation was requested."""
+        if self.cancel_requested.is_set():
+            raise JobCancelled()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "pid": os.getpid(),  # the process running the job; only it can finish the job
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "events": self.events,
+            "result": self.result,
+            "error": self.error,
+            "live": dict(self.live),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """Runs submitted jobs on a bounded worker pool and persists their status as JSON files."""
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR, workers=DEFAULT_WORKERS,
+                 retention_days=JOB_RETENTION_DAYS, retention_count=JOB_RETENTION_COUNT):
+        self.store_dir = store_dir
+        self.workers = workers
+        self.retention_days = retention_days
+        self.retention_count = retention_count
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job-worker")
+        os.makedirs(store_dir, exist_ok=True)
+        self._mark_interrupted()
+        self._prune()
+
+    def _path(self, job_id):
+        return os.path.join(self.store_dir, f"{job_id}.json")
+
+    def _save(self, job):
+        # Write to a temp file first so readers never see a half-written status file
+        path = self._path(job.id)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job.to_dict(), f, default=str)
+        os.replace(tmp_path, path)
+
+    def _status_files(self):
+        """(mtime, path) of every status file, most recently updated first."""
+        entries = []
+        for name in os.listdir(self.store_dir):
+            if name.endswith(".json"):
+                path = os.path.join(self.store_dir, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue
+        return sorted(entries, reverse=True)
+
+    def _mark_interrupted(self):
+        # Jobs that were queued or running when their process died will never finish; jobs of
+        # other live processes sharing the store (and of this one) are left alone
+        for name in os.listdir(self.store_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.store_dir, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            pid = data.get("pid")
+            if pid is not None and (pid == os.getpid() or _pid_alive(pid)):
+                continue
+            if data.get("status") not in FINISHED_STATUSES:
+                data["status"] = "interrupted"
+                data["finished_at"] = time.time()
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, default=str)
+
+    def _prune(self):
+        # Status files are only kept for recent jobs; list() reads them on every rerun
+        cutoff = time.time() - self.retention_days * 86400
+        with self._lock:
+            active = {self._path(job.id) for job in self.jobs.values() if job.status not in FINISHED_STATUSES}
+        pruned = set()
+        for index, (mtime, path) in enumerate(self._status_files()):
+            if path not in active and (mtime < cutoff or index >= self.retention_count):
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                pruned.add(os.path.basename(path)[:-len(".json")])
+        # Finished jobs leave memory under the same retention, so a long-lived server does not keep every job
+        with self._lock:
+            for job_id, job in list(self.jobs.items()):
+                if job.status in FINISHED_STATUSES and (job_id in pruned or (job.finished_at or time.time()) < cutoff):
+                    del self.jobs[job_id]
+
+    def submit(self, fn, *args, kind="generation", params=None, **kwargs):
+        """
+        Queue fn(job, *args, **kwargs) and return the new job id.
+
+        The function's return value (JSON-serializable) becomes the job result.
+        """
+        job = Job(self, uuid.uuid4().hex[:12], kind, params or {})
+        with self._lock:
+            self.jobs[job.id] = job
+        self._save(job)
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancel_requested.is_set():
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            self._save(job)
+            return
+        job.status = "running"
+        job.started_at = time.time()
+        self._save(job)
+        try:
+            # Every span recorded while the job runs carries the job id as its trace id
+            with trace_context(job.id), tracer.span("job", kind=job.kind):
+                job.result = fn(job, *args, **kwargs)
+            job.status = "succeeded"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = f"{type(e).__name__}: {e}"
+        job.finished_at = time.time()
+        self._save(job)
+        self._prune()
+
+    def get(self, job_id):
+        """Return the job status dict, from memory or from its status file (e.g. after a restart)."""
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        try:
+            with open(self._path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def cancel(self, job_id):
+        """Request cancellation; queued jobs never start, running jobs stop at their next stage boundary."""
+        job = self.jobs.get(job_id)
+        if job is None or job.status in FINISHED_STATUSES:
+            return False
+        job.cancel_requested.set()
+        job.report("cancel", "Cancellation requested")
+        return True
+
+    def list(self, limit=20):
+        """Most recent jobs first, including those persisted by earlier processes."""
+        jobs = []
+        # Jobs created recently were also saved recently, so only the newest files are read
+        for _, path in self._status_files()[:limit]:
+            data = self.get(os.path.basename(path)[:-len(".json")])
+            if data is not None:
+                jobs.append(data)
+        jobs.sort(key=lambda data: data.get("created_at") or 0, reverse=True)
+        return jobs[:limit]
+
+    def queue_depth(self):
+        return sum(1 for job in self.jobs.values() if job.status in ("queued", "running"))
@@ -0,0 +1,197 @@
+import os
+import json
+import queue
+import atexit
+import shutil
+import threading
+import subprocess
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from scaffold_pool import scaffold_pools
+
+# Files the parser understands; anything else (CSS, JSON, HTML) is passed through unchecked
+VALIDATED_EXTENSIONS = (".js", ".jsx", ".mjs", ".ts", ".tsx")
+
+# Long-lived Node process: one JSON request per line on stdin, one JSON response per line on stdout.
+# The parser is resolved from the project (or the scaffold templates), so no extra npm install is
+# needed: @babel/parser ships with create-react-app and @vitejs/plugin-react, esbuild with Vite.
+NODE_PARSER_SCRIPT = r"""
+const readline = require('readline');
+const parsers = new Map();
+
+function loadParser(paths) {
+  const key = paths.join('\0');
+  if (!parsers.has(key)) {
+    // Only a parser that resolved is cached: before npm install there is none yet, so look again next time
+    for (const [kind, name] of [['babel', '@babel/parser'], ['esbuild', 'esbuild']]) {
+      try {
+        parsers.set(key, { kind, mod: require(require.resolve(name, { paths })) });
+        break;
+      } catch (e) {}
+    }
+  }
+  return parsers.get(key) || null;
+}
+
+function babelError(e) {
+  return {
+    line: e.loc ? e.loc.line : null,
+    column: e.loc ? e.loc.column + 1 : null,
+    message: String(e.message).replace(/\s*\(\d+:\d+\)$/, ''),
+  };
+}
+
+function check(parser, code, filename) {
+  const typescript = /\.tsx?$/.test(filename);
+  if (parser.kind === 'babel') {
+    const plugins = typescript ? ['jsx', 'typescript'] : ['jsx'];
+    try {
+      const ast = parser.mod.parse(code, { sourceType: 'module', errorRecovery: true, plugins, sourceFilename: filename });
+      return (ast.errors || []).map(babelError);
+    } catch (e) {
+      return [babelError(e)];
+    }
+  }
+  try {
+    parser.mod.transformSync(code, { loader: typescript ? 'tsx' : 'jsx', sourcefile: filename });
+    return [];
+  } catch (e) {
+    return (e.errors || [{ text: String(e.message) }]).map((m) => ({
+      line: m.location ? m.location.line : null,
+      column: m.location ? m.location.column + 1 : null,
+      message: m.text,
+    }));
+  }
+}
+
+readline.createInterface({ input: process.stdin }).on('line', (line) => {
+  const request = JSON.parse(line);
+  const parser = loadParser(request.paths);
+  const response = { id: request.id, parser: parser ? parser.kind : null, errors: null };
+  if (parser) {
+    response.errors = check(parser, request.code, request.filename);
+  }
+  process.stdout.write(JSON.stringify(response) + '\n');
+});
+"""
+
+
+class ValidationResult(NamedTuple):
+    path: str
+    ok: Optional[bool]  # None when no parser was available (validation skipped)
+    errors: List[dict]
+    parser: Optional[str]
+
+
+def needs_validation(path: str) -> bool:
+    return path.lower().endswith(VALIDATED_EXTENSIONS)
+
+
+def format_errors(results: Iterable[ValidationResult]) -> str:
+    """One `path:line:column: message` line per syntax error, as fed back to the generating agent."""
+    lines = []
+    for result in results:
+        for error in result.errors:
+            location = ":".join(str(part) for part in (result.path, error.get("line"), error.get("column")) if part is not None)
+            lines.append(f"{location}: {error.get('message')}")
+    return "\n".join(lines)
+
+
+class JSXValidator:
+    """Syntax-checks generated JS/JSX files in a persistent Node process, without a build or dev server."""
+
+    def __init__(self, search_paths: Iterable[str] = (), timeout: float = 10.0, node: str = "node"):
+        self.search_paths = list(search_paths)
+        self.timeout = timeout
+        self.node = node
+        self.process = None
+        self._responses = queue.Queue()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _ensure_process(self):
+        if self.process is not None and self.process.poll() is None:
+            return True
+        if shutil.which(self.node) is None:
+            return False
+        self.process = subprocess.Popen(
+            [self.node, "-e", NODE_PARSER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+        )
+        self._responses = queue.Queue()
+        threading.Thread(target=self._read_responses, args=(self.process, self._responses),
+                         name="jsx-validator", daemon=True).start()
+        return True
+
+    @staticmethod
+    def _read_responses(process, responses):
+        for line in process.stdout:
+            try:
+                responses.put(json.loads(line))
+            except ValueError:
+                continue
+
+    def validate(self, code: str, path: str = "src/App.js", project_dir: Optional[str] = None) -> ValidationResult:
+        """Parse one file; errors carry 1-based line and column numbers."""
+        if not needs_validation(path):
+            return ValidationResult(path, True, [], None)
+        paths = ([os.path.abspath(project_dir)] if project_dir else []) + self.search_paths
+        with self._lock:
+            if not self._ensure_process():
+                return ValidationResult(path, None, [], None)
+            self._next_id += 1
+            request_id = self._next_id
+            try:
+                self.process.stdin.write(json.dumps({"id": request_id, "filename": path, "code": code, "paths": paths}) + "\n")
+                self.process.stdin.flush()
+                while True:
+                    response = self._responses.get(timeout=self.timeout)
+                    if response.get("id") == request_id:
+                        break
+            except (OSError, queue.Empty):
+                # A hung or crashed parser must not block generation; restart it on the next call
+                self.close()
+                return ValidationResult(path, None, [], None)
+        if response["errors"] is None:
+            return ValidationResult(path, None, [], None)
+        return ValidationResult(path, not response["errors"], response["errors"], response["parser"])
+
+    def validate_files(self, files: Dict[str, str], project_dir: Optional[str] = None) -> List[ValidationResult]:
+        """Validate {relative path: content}; only JS/JSX/TS files are returned."""
+        return [self.validate(code, path, project_dir) for path, code in files.items() if needs_validation(path)]
+
+    def close(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+        self.process = None
+
+
+def validate_with_repair(code: str, path: str, project_dir: Optional[str], repair, rounds: int = 1,
+                         checker: Optional[JSXValidator] = None):
+    """
+    Syntax-check one generated file and let `repair(code, error_text)` fix it, up to `rounds` times.
+
+    Returns:
+        Tuple[str, dict]: The final code and a report (ok, errors found, repair rounds used, errors left).
+    """
+    checker = checker or validator
+    result = checker.validate(code, path, project_dir)
+    report = {"ok": result.ok, "parser": result.parser, "errors": format_errors([result]), "repair_rounds": 0}
+    while result.ok is False and report["repair_rounds"] < rounds:
+        report["repair_rounds"] += 1
+        repaired = repair(code, format_errors([result]))
+        if not repaired:
+            break
+        code, result = repaired, checker.validate(repaired, path, project_dir)
+    report["ok"] = result.ok
+    report["remaining_errors"] = format_errors([result])
+    return code, report
+
+
+# Shared validator; falls back to the scaffold templates' node_modules before the project is set up
+validator = JSXValidator(search_paths=[pool.template_dir for pool in scaffold_pools.values()])
+atexit.register(validator.close)
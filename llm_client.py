@@ -0,0 +1,322 @@
+import os
+import json
+import time
+import random
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tracing import tracer, record_tokens
+from context_compaction import estimate_tokens
+
+# Path (or inline JSON) of the config list shared by every entry point
+CONFIG_LIST_ENV = "OAI_CONFIG_LIST"
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "OAI_CONFIG_LIST.json")
+
+# OpenAI-compatible endpoints per api_type (an entry's own base_url always wins)
+DEFAULT_BASE_URLS = {
+    "groq": "https://api.groq.com/openai/v1",
+    "openai": "https://api.openai.com/v1",
+}
+
+# Conservative per-key budgets, roughly Groq's free tier
+DEFAULT_REQUESTS_PER_MINUTE = 30
+DEFAULT_TOKENS_PER_MINUTE = 6000
+
+
+class RateLimitError(Exception):
+    """Raised when the provider answers 429; retry_after is in seconds when the server sent one."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Recognize 429s from our own client, openai/litellm (crewai) and autogen exceptions."""
+    if isinstance(error, RateLimitError):
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status == 429:
+        return True
+    text = str(error).lower()
+    return "429" in text or "rate limit" in text or "ratelimit" in text or "rate_limit" in text
+
+
+def load_config_list(path: Optional[str] = None) -> List[dict]:
+    """
+    Load the LLM config list.
+
+    Reads `path`, else the OAI_CONFIG_LIST environment variable (a file path or inline JSON),
+    else OAI_CONFIG_LIST.json next to this module. Entries without an api_key use GROQ_API_KEY.
+    """
+    source = path or os.getenv(CONFIG_LIST_ENV) or DEFAULT_CONFIG_PATH
+    if os.path.exists(source):
+        with open(source, "r", encoding="utf-8") as f:
+            config_list = json.load(f)
+    else:
+        config_list = json.loads(source)
+    for entry in config_list:
+        if not entry.get("api_key"):
+            entry["api_key"] = os.getenv("GROQ_API_KEY")
+    return config_list
+
+
+class TokenBucket:
+    """Classic token bucket: `capacity` tokens, refilled continuously at `rate` tokens per second."""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if they are available now)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            amount = min(amount, self.capacity)
+            return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        """Take tokens; the balance may go negative so that under-estimates are paid back later."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= amount
+
+
+class _Endpoint:
+    """One config-list entry with its request and token budgets."""
+
+    def __init__(self, entry: dict, requests_per_minute: float, tokens_per_minute: float):
+        self.entry = entry
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self.cooldown_until = 0.0
+
+    def wait_time(self, estimated_tokens: int) -> float:
+        return max(
+            self.requests.wait_time(1),
+            self.tokens.wait_time(estimated_tokens),
+            self.cooldown_until - time.monotonic(),
+            0.0,
+        )
+
+
+class LLMRouter:
+    """
+    Shared, rate-limit-aware access to every entry of the config list.
+
+    Calls are spread over all keys that serve the requested model, each entry has token-bucket
+    budgets for requests and tokens per minute, 429s are retried with jittered exponential
+    backoff, and a cheaper fallback model is used once the primary entries keep failing.
+    """
+
+    def __init__(self, config_list: List[dict], requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE, max_retries: int = 5,
+                 base_delay: float = 1.0, max_delay: float = 30.0, fallback_model: Optional[str] = None,
+                 timeout: float = 120.0):
+        self.config_list = config_list
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.fallback_model = fallback_model or os.getenv("LLM_FALLBACK_MODEL")
+        self.timeout = timeout
+        self.stats = {"calls": 0, "retries": 0, "rate_limited": 0, "fallbacks": 0}
+        self._endpoints: Dict[tuple, _Endpoint] = {}
+        self._crewai_llms: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+        self._turn = 0
+        # One pooled HTTP session: connections to the provider are kept alive between calls
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+        self.session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+
+    def entries_for(self, model: Optional[str] = None) -> List[dict]:
+        """Config entries serving `model`; if none lists it, every distinct key is reused for it."""
+        if model is None:
+            return list(self.config_list)
+        model = model.split("/", 1)[1] if model.startswith(("groq/", "openai/")) else model
+        matching = [entry for entry in self.config_list if entry.get("model") == model]
+        if matching:
+            return matching
+        seen, derived = set(), []
+        for entry in self.config_list:
+            if entry.get("api_key") not in seen:
+                seen.add(entry.get("api_key"))
+                derived.append(dict(entry, model=model))
+        return derived
+
+    def _endpoint(self, entry: dict) -> _Endpoint:
+        key = (entry.get("api_key"), entry.get("model"), entry.get("base_url"))
+        with self._lock:
+            if key not in self._endpoints:
+                self._endpoints[key] = _Endpoint(
+                    entry,
+                    entry.get("requests_per_minute", self.requests_per_minute),
+                    entry.get("tokens_per_minute", self.tokens_per_minute),
+                )
+            return self._endpoints[key]
+
+    def _pick(self, entries: List[dict], estimated_tokens: int) -> _Endpoint:
+        endpoints = [self._endpoint(entry) for entry in entries]
+        with self._lock:
+            # Rotate the starting point so equally idle keys share the load
+            self._turn += 1
+            offset = self._turn % len(endpoints)
+        rotated = endpoints[offset:] + endpoints[:offset]
+        return min(rotated, key=lambda endpoint: endpoint.wait_time(estimated_tokens))
+
+    def _backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        delay = random.uniform(delay / 2, delay)  # jitter so queued callers do not retry in lockstep
+        return max(delay, retry_after or 0.0)
+
+    def call(self, fn: Callable[[dict], Any], model: Optional[str] = None, estimated_tokens: int = 1000) -> Any:
+        """
+        Run fn(entry) under the budget of the least busy entry serving `model`.
+
+        fn must perform exactly one LLM request with the given entry's credentials.
+        """
+        entries = self.entries_for(model)
+        if not entries:
+            raise ValueError(f"No LLM config entry available for model {model!r}")
+        fallback_entries = self.entries_for(self.fallback_model) if self.fallback_model and self.fallback_model != model else []
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            # Switch to the cheaper model for the second half of the retries
+            use_fallback = fallback_entries and attempt > self.max_retries // 2
+            endpoint = self._pick(fallback_entries if use_fallback else entries, estimated_tokens)
+            wait = endpoint.wait_time(estimated_tokens)
+            if wait > 0:
+                time.sleep(wait)
+            endpoint.requests.consume(1)
+            endpoint.tokens.consume(estimated_tokens)
+            try:
+                self.stats["calls"] += 1
+                if use_fallback:
+                    self.stats["fallbacks"] += 1
+                with tracer.span("llm.call", model=endpoint.entry.get("model"), attempt=attempt):
+                    return fn(endpoint.entry)
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                last_error = e
+                self.stats["rate_limited"] += 1
+                self.stats["retries"] += 1
+                delay = self._backoff(attempt, getattr(e, "retry_after", None))
+                endpoint.cooldown_until = time.monotonic() + delay
+        raise last_error
+
+    def _base_url(self, entry: dict) -> str:
+        return (entry.get("base_url") or DEFAULT_BASE_URLS.get(entry.get("api_type", "openai"), DEFAULT_BASE_URLS["openai"])).rstrip("/")
+
+    def _post_chat(self, entry: dict, payload: dict, stream: bool = False):
+        response = self.session.post(
+            f"{self._base_url(entry)}/chat/completions",
+            json=dict(payload, model=entry["model"]),
+            headers={"Authorization": f"Bearer {entry.get('api_key') or ''}"},
+            timeout=self.timeout,
+            stream=stream,
+        )
+        if response.status_code == 429:
+            retry_after = response.headers.get("retry-after")
+            raise RateLimitError(f"429 from {self._base_url(entry)}: {response.text[:200]}",
+                                 float(retry_after) if retry_after and retry_after.replace(".", "", 1).isdigit() else None)
+        response.raise_for_status()
+        return response
+
+    def chat(self, messages: List[dict], model: Optional[str] = None, estimated_tokens: int = 1000, **params) -> dict:
+        """Send an OpenAI-compatible chat completion request and return the response JSON."""
+        def request(entry):
+            result = self._post_chat(entry, dict(params, messages=messages)).json()
+            # Settle the token budget with what the request actually used
+            usage = result.get("usage") or {}
+            used = usage.get("total_tokens")
+            record_tokens(usage.get("prompt_tokens"), usage.get("completion_tokens"))
+            if used:
+                self._endpoint(entry).tokens.consume(used - estimated_tokens)
+            return result
+        return self.call(request, model=model, estimated_tokens=estimated_tokens)
+
+    def stream_chat(self, messages: List[dict], model: Optional[str] = None, estimated_tokens: int = 1000, **params) -> Iterator[str]:
+        """
+        Stream an OpenAI-compatible chat completion, yielding content deltas as they arrive.
+
+        Rate limits are handled while connecting; once tokens flow the stream is not retried.
+        """
+        start = time.perf_counter()
+        served_by = {}
+
+        def request(entry):
+            served_by.update(entry)
+            return self._post_chat(entry, dict(params, messages=messages, stream=True), stream=True)
+
+        response = self.call(
+            request,
+            model=model,
+            estimated_tokens=estimated_tokens,
+        )
+        first_token_s, chars = None, 0
+        with response:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or []
+                delta = (choices[0].get("delta") or {}).get("content") if choices else None
+                if delta:
+                    if first_token_s is None:
+                        first_token_s = time.perf_counter() - start
+                    chars += len(delta)
+                    yield delta
+        # Streams carry no usage block, so tokens are estimated from the text
+        tracer.record("llm.stream", time.perf_counter() - start, model=served_by.get("model"),
+                      prompt_tokens=sum(estimate_tokens(m.get("content") or "") for m in messages),
+                      completion_tokens=chars // 4,
+                      first_token_s=first_token_s, estimated=True)
+
+    def crewai_llm(self, entry: dict):
+        """CrewAI LLM bound to one config entry (created once per entry)."""
+        key = (entry.get("api_key"), entry.get("model"), entry.get("base_url"))
+        with self._lock:
+            if key not in self._crewai_llms:
+                from crewai import LLM
+
+                kwargs = {"model": f"{entry.get('api_type', 'openai')}/{entry['model']}", "api_key": entry.get("api_key")}
+                if entry.get("base_url"):
+                    kwargs["base_url"] = entry["base_url"]
+                self._crewai_llms[key] = LLM(**kwargs)
+            return self._crewai_llms[key]
+
+    def autogen_config_list(self, model: Optional[str] = None) -> List[dict]:
+        """Config list for AutoGen: every key for the model, then the fallback model's entries."""
+        keys = ("model", "api_key", "api_type", "base_url")
+        entries = self.entries_for(model)
+        if self.fallback_model:
+            entries += self.entries_for(self.fallback_model)
+        return [{key: entry[key] for key in keys if entry.get(key)} for entry in entries]
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> LLMRouter:
+    """Process-wide router built from the shared config list."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = LLMRouter(load_config_list())
+        return _router
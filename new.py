@@ -1,16 +1,24 @@
 import os
+import time
 import autogen
 from typing_extensions import Annotated, Union
-import re
 from typing import List, Tuple
 import subprocess
-import json
+import hashlib
 from typing import Dict, List
 from autogen import Agent
+from dev_server import supervisor
+from code_blocks import parse_code_blocks, resolve_project_path
+from orchestration import DeterministicSpeakerSelector, agent_transitions
+from context_compaction import HistoryCompactor
+from llm_client import get_router
+from deps import dependencies_up_to_date, ensure_dependencies, run_npm
+from scaffold_pool import DEFAULT_SCAFFOLD, scaffold_vite
+from jsx_validator import validator, format_errors
+from tracing import tracer, trace_context, summarize_spans, start_metrics_server
 
-config_list = autogen.config_list_from_json(
-    env_or_file=r"OAI_CONFIG_LIST.json"
-)
+# Shared config list (OAI_CONFIG_LIST.json or the OAI_CONFIG_LIST env var), with fallback-model entries appended
+config_list = get_router().autogen_config_list()
 
 
 llm_config = {
@@ -80,15 +88,14 @@ user_proxy = autogen.UserProxyAgent(
 )
 
 
-speaker_selection = {
-    user_proxy: [Project_Code_Generator],
-    Project_Code_Generator: [engineer],
-    engineer: [AppRunner],
-    AppRunner: [AppRunner, user_proxy],
-    user_proxy: [],
+# Who may speak after whom (see orchestration.GROUPCHAT_TRANSITIONS)
+speaker_selection = agent_transitions([user_proxy, Project_Code_Generator, engineer, AppRunner])
 
-      # Allow AppRunner to return to user_proxy after running
-}
+
+# "deterministic" follows speaker_selection without asking the LLM whenever its rules settle the next speaker,
+# "auto" lets the GroupChatManager's LLM pick every speaker
+ORCHESTRATION_MODE = os.getenv("ORCHESTRATION_MODE", "deterministic")
+speaker_selector = DeterministicSpeakerSelector(speaker_selection)
 
 
 groupchat = autogen.GroupChat(
@@ -97,6 +104,7 @@ groupchat = autogen.GroupChat(
     max_round=500,
     allowed_or_disallowed_speaker_transitions=speaker_selection,
     speaker_transitions_type="allowed",
+    speaker_selection_method=speaker_selector if ORCHESTRATION_MODE == "deterministic" else "auto",
 )
 
 
@@ -109,34 +117,18 @@ default_path1 = "D:/react-app/"  # Using raw string for Windows path
 workdir = os.path.join(default_path1, "new-folder11")
 os.makedirs(workdir, exist_ok=True)
 
+# Project template: "cra" (create-react-app, webpack) or "vite"; override with REACT_SCAFFOLD
+scaffold = DEFAULT_SCAFFOLD
+
 
 def check_dependencies():
-    """Check if package.json exists and all dependencies are installed."""
-    package_json_path = os.path.join(workdir, "package.json")
-    node_modules_path = os.path.join(workdir, "node_modules")
+    """Check if package.json exists and all dependencies are installed (O(1) once the install stamp is current)."""
+    return dependencies_up_to_date(workdir)
 
-    if not os.path.exists(package_json_path):
-        return False
 
-    if not os.path.exists(node_modules_path):
-        return False
-
-    try:
-        # Read package.json
-        with open(package_json_path, 'r') as f:
-            package_data = json.load(f)
-
-        # Check if all dependencies are installed
-        for dep_type in ['dependencies', 'devDependencies']:
-            if dep_type in package_data:
-                for dep in package_data[dep_type]:
-                    dep_path = os.path.join(node_modules_path, dep)
-                    if not os.path.exists(dep_path):
-                        return False
-        return True
-    except Exception as e:
-        print(f"Error checking dependencies: {e}")
-        return False
+def print_command_line(stream, line):
+    # npm output is drained from both pipes by the command runner and echoed here as it arrives
+    print(line)
 
 
 def install_missing_dependencies():
@@ -144,34 +136,17 @@ def install_missing_dependencies():
     try:
         package_json_path = os.path.join(workdir, "package.json")
         if not os.path.exists(package_json_path):
-            print("Installing base React application...")
-            subprocess.run(
-                "npx create-react-app .",  # Create a React app first
-                shell=True,
-                cwd=workdir,
-                check=True
-            )
-
-        # After React setup, now set up Vite
-        print("Setting up Vite for the project...")
-        subprocess.run(
-            "npm install vite @vitejs/plugin-react",  # Install Vite and React plugin for Vite
-            shell=True,
-            cwd=workdir,
-            check=True
-        )
-
-        print("Vite setup complete.")
-
-        # Check node_modules
-        if not os.path.exists(os.path.join(workdir, "node_modules")):
-            print("Installing dependencies...")
-            subprocess.run(
-                "npm install",
-                shell=True,
-                cwd=workdir,
-                check=True
-            )
+            print(f"Installing base React application ({scaffold})...")
+            if scaffold == "vite":
+                # Vite template; `npm start` runs the Vite dev server
+                scaffold_vite(workdir)
+            else:
+                run_npm("npx create-react-app .", workdir, print_command_line)  # Create a React app first
+
+        # Only packages that are declared but not installed yet
+        commands = ensure_dependencies(workdir, on_line=print_command_line)
+        if commands:
+            print("Installed dependencies: " + "; ".join(commands))
         else:
             print("Dependencies already installed, skipping installation.")
 
@@ -186,113 +161,178 @@ def install_missing_dependencies():
     description="Run React application using the following command: 'npm start'. This will start the development server Application running in the browser.")
 def run_app() -> Tuple[int, str]:
     """
-    Run the app using npm start in the default path and wait for the compilation process to finish.
-   
+    Run the app using npm start in the default path and wait until the dev server answers HTTP.
+    The server keeps running in the background and is reused on later calls.
+
     Returns:
         Tuple[int, str]: Status code and message
     """
     try:
-        # Start the npm process
-        process = subprocess.Popen(
-            ["npm", "start"],
-            cwd=default_path,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            shell=True
-        )
+        server = supervisor.start(default_path)
+        status = server.status()
+        if status["ready"]:
+            return 0, f"App started and compiled successfully. Ready for use at {server.url}."
+
+        # If the server exits or times out before answering
+        return 1, "App did not become ready. Output:\n" + "\n".join(status["last_output"])
 
-        # Collect output in real-time
-        output_lines = []
-        while True:
-            output_line = process.stdout.readline()
-            if output_line == "" and process.poll() is not None:
-                break  # Exit the loop when the process ends
-
-            if output_line:
-                output_lines.append(output_line.strip())
-                print(output_line.strip())  # Optional: Print the output to console/logs
-
-                # Check for "webpack compiled successfully"
-                if "webpack compiled successfully" in output_line.lower():
-                    process.terminate()  # Optionally terminate process to clean up
-                    return 0, "App started and compiled successfully. Ready for use."
-
-        # If the process exits without finding the success message
-        return 1, "App terminated before completing compilation. Output:\n" + "\n".join(output_lines)
-   
     except Exception as e:
         return 1, f"Error while trying to run the app: {str(e)}"
-   
+
+
+# Incremental save state: index of the next unprocessed message and a content hash per saved file
+save_state = {"cursor": 0, "hashes": {}}
+
+
+def write_if_changed(filename: str, content: str) -> bool:
+    """Write content to filename under default_path unless it already holds exactly that content."""
+    full_path = os.path.join(default_path, filename)
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    known = save_state["hashes"].get(full_path)
+    if known is None and os.path.exists(full_path):
+        # First time we see this file in this session, hash what is on disk
+        with open(full_path, "rb") as file:
+            known = hashlib.sha256(file.read()).hexdigest()
+    if known == digest:
+        save_state["hashes"][full_path] = digest
+        return False
+
+    # Create directories if needed
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with tracer.span("file.write", path=filename), open(full_path, "w", encoding="utf-8", newline="") as file:
+        file.write(content)
+    save_state["hashes"][full_path] = digest
+    return True
+
+
+# Compact the history each agent sees: saved files become references, old turns are summarized
+history_compactor = HistoryCompactor(
+    saved_files=lambda: [os.path.relpath(path, default_path) for path in save_state["hashes"]],
+)
+for agent in (engineer, Project_Code_Generator, AppRunner):
+    history_compactor.attach(agent)
+
 
 @user_proxy.register_for_execution()
 @engineer.register_for_llm(description="save code everytime, if it has filename: in the response.")
 def save_code_blocks() -> Tuple[int, str]:
     """
-    Save code blocks from group chat messages to their respective files.
+    Save code blocks from new group chat messages to their respective files.
+    Only messages added since the previous call are parsed, and files whose content
+    did not change are not rewritten (so the dev server does not recompile for nothing).
 
     Returns:
         Tuple[int, str]: Status code and message.
     """
     try:
-        # Pattern to match code blocks
-        code_block_pattern = r'[\w-]*\n(.*?)'
-        saved_files = []
-
-        for msg in groupchat.messages:
-            content = msg.get('content', '').strip()
-            if not content:
+        written, unchanged, skipped, invalid = [], [], [], []
+        # If the app is already running, its watcher picks the files up; no restart needed
+        server = supervisor.get(default_path)
+        compile_mark = server.compile_count if server is not None else None
+        write_start = time.perf_counter()
+
+        # The chat was reset, start over from the first message
+        if save_state["cursor"] > len(groupchat.messages):
+            save_state["cursor"] = 0
+        new_messages = groupchat.messages[save_state["cursor"]:]
+
+        for msg in new_messages:
+            content = msg.get('content') or ''
+            if '```' not in content and '~~~' not in content:
                 continue
 
-            code_blocks = re.finditer(code_block_pattern, content, re.DOTALL)
-
-            for block in code_blocks:
-                code = block.group(1)
-                if not code.strip():
+            for block in parse_code_blocks(content):
+                # Only blocks with a filename: header are project files
+                if not block.filename or not block.code.strip():
                     continue
+                filename = block.filename.strip()
 
-                # Look for filename in the first line
-                filename_match = re.search(r'filename:\s*([\w/.-]+)', code.split('\n')[0])
-                if filename_match:
-                    filename = filename_match.group(1).strip()
-                    code = '\n'.join(code.split('\n')[1:]).strip()
-
-                    # Skip if filename includes restricted paths (e.g., node_modules)
-                    if 'node_modules' in filename:
-                        continue
-
-                    # Create directories if needed
-                    full_path = os.path.join(default_path, filename)
-                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                # Skip if filename includes restricted paths (e.g., node_modules) or leaves the project
+                if 'node_modules' in filename or resolve_project_path(default_path, filename) is None:
+                    skipped.append(filename)
+                    continue
 
-                    # Save the code block to the file
-                    with open(full_path, "w", encoding="utf-8") as file:
-                        file.write(code + "\n")
-                    saved_files.append(filename)
+                # Files that do not parse are not written, so the dev server never sees them
+                check = validator.validate(block.code, filename, default_path)
+                if check.ok is False:
+                    invalid.append(check)
+                    continue
 
-        if saved_files:
-            return 0, f"Successfully saved files: {', '.join(saved_files)}"
+                if write_if_changed(filename, block.code.strip() + "\n"):
+                    written.append(filename)
+                else:
+                    unchanged.append(filename)
+
+        save_state["cursor"] += len(new_messages)
+
+        summary = f"written={len(written)}, unchanged={len(unchanged)}, skipped={len(skipped)}, invalid={len(invalid)}"
+        if written and compile_mark is not None:
+            compiled = server.wait_for_compile(compile_mark)
+            if compiled is None:
+                summary += ", dev server did not recompile in time"
+            else:
+                summary += f", hot reloaded {'cleanly' if compiled else 'with errors'} in {time.perf_counter() - write_start:.2f}s"
+        if invalid:
+            # Hand the parser errors back so Project_Code_Generator can resend the fixed files
+            return 1, (f"Syntax errors, these files were not saved; fix them and resend the complete files:\n"
+                       f"{format_errors(invalid)}\n({summary})")
+        if written:
+            return 0, f"Successfully saved files: {', '.join(written)} ({summary})"
+        elif unchanged:
+            return 0, f"All files already up to date: {', '.join(unchanged)} ({summary})"
         else:
-            return 1, "No valid code blocks found in messages to save."
+            return 1, f"No valid code blocks found in new messages to save. ({summary})"
 
     except Exception as e:
         return 1, f"Error processing messages: {str(e)}"
 
 
+# Function to record the group chat's per-model token usage (AutoGen's ChatResult.cost) as trace spans
+def record_chat_usage(chat_result):
+    usage = (getattr(chat_result, "cost", None) or {}).get("usage_including_cached_inference") or {}
+    for model, counts in usage.items():
+        if isinstance(counts, dict):
+            tracer.record("llm.usage", 0.0, model=model, prompt_tokens=counts.get("prompt_tokens", 0),
+                          completion_tokens=counts.get("completion_tokens", 0))
 
+def main():
+    start_metrics_server()
+    with trace_context(f"groupchat-{int(time.time())}") as trace_id:
+        run_groupchat()
+    print("Trace (written to " + tracer.path + "):")
+    for row in summarize_spans(tracer.spans_for(trace_id)):
+        print(f"  {row['span']:<20} x{row['count']:<4} {row['total_s']:>8.2f}s  "
+              f"tokens {row['prompt_tokens']}/{row['completion_tokens']}  ${row['cost_usd']:.4f}")
 
 # Example usage
-if not check_dependencies():
-    if not install_missing_dependencies():
-        print("Failed to set up React environment.")
+def run_groupchat():
+    if not check_dependencies():
+        if not install_missing_dependencies():
+            print("Failed to set up React environment.")
+        else:
+            print("React environment setup complete.")
     else:
-        print("React environment setup complete.")
-else:
-    print("All dependencies are already installed.")
-
-chat_result = user_proxy.initiate_chat(
-    manager,
-    message="""
-    Give the simple project code of a colorful dashboard in React.js along with its package.json code.
-    """,
-)
\ No newline at end of file
+        print("All dependencies are already installed.")
+
+    speaker_selector.reset()
+    with tracer.span("groupchat") as span:
+        chat_result = user_proxy.initiate_chat(
+            manager,
+            message="""
+            Give the simple project code of a colorful dashboard in React.js along with its package.json code.
+            """,
+        )
+        span.set(rounds=len(groupchat.messages))
+    record_chat_usage(chat_result)
+
+    stats = speaker_selector.stats()
+    for name, value in stats.items():
+        tracer.set_gauge(f"speaker_{name}", value)
+    print(f"Speaker selection: {stats['deterministic_selections']} deterministic, {stats['llm_selections']} by LLM, "
+          f"{stats['llm_calls_saved']} LLM calls saved.")
+    print(history_compactor.report())
+
+
+if __name__ == "__main__":
+    # Importing new.py (e.g. from the benchmarks) only defines the agents and tools
+    main()
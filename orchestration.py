@@ -0,0 +1,119 @@
+from typing import Dict, List, Union
+
+from tracing import tracer
+
+
+def _called_function_names(message: dict) -> List[str]:
+    if message.get("function_call"):
+        return [message["function_call"].get("name")]
+    return [call["function"]["name"] for call in message.get("tool_calls") or [] if call.get("function")]
+
+
+# new.py's group chat by agent name: who may speak after whom
+GROUPCHAT_TRANSITIONS = {
+    "Admin": ["Project_Code_Generator"],
+    "Project_Code_Generator": ["Engineer"],
+    "Engineer": ["AppRunner"],
+    "AppRunner": ["AppRunner", "Admin"],  # Allow AppRunner to return to Admin after running
+}
+
+
+def agent_transitions(agents, transitions: Dict[str, List[str]] = GROUPCHAT_TRANSITIONS) -> Dict:
+    """The {agent: [agents]} dict GroupChat expects, from a transition graph keyed by agent name."""
+    by_name = {agent.name: agent for agent in agents}
+    return {by_name[name]: [by_name[successor] for successor in successors] for name, successors in transitions.items()}
+
+
+def _is_tool_result(message: dict) -> bool:
+    return message.get("role") == "tool" or "tool_responses" in message
+
+
+class DeterministicSpeakerSelector:
+    """
+    GroupChat `speaker_selection_method` that walks the allowed-transition graph.
+
+    Picks made without asking the LLM:
+    - a pending tool call goes to the only agent able to execute it;
+    - a tool result goes back to the agent that called the tool if it may speak again,
+      else on along that agent's transitions;
+    - a plain reply (no tool call) ends the speaker's turn, so when it could follow itself
+      the other legal speaker is picked;
+    - otherwise the only legal next speaker.
+    Anything else returns "auto", so AutoGen's LLM-based selection decides.
+
+    AutoGen itself skips the LLM whenever its graph (seen from the last speaker) or a pending tool
+    call leaves a single agent, so only picks where that graph offers several count as saved calls.
+    """
+
+    def __init__(self, transitions: Dict):
+        self.transitions = transitions
+        self.deterministic = 0
+        self.llm_fallbacks = 0
+        self.saved = 0
+
+    def __call__(self, last_speaker, groupchat) -> Union[object, str]:
+        with tracer.span("speaker.selection", last_speaker=getattr(last_speaker, "name", None)) as span:
+            speaker = self._select(last_speaker, groupchat)
+            span.set(selected=getattr(speaker, "name", speaker), deterministic=speaker != "auto")
+            return speaker
+
+    def _select(self, last_speaker, groupchat) -> Union[object, str]:
+        messages = groupchat.messages
+        last_message = messages[-1] if messages else {}
+
+        # A suggested tool call can only go to the agent that is able to execute it
+        function_names = _called_function_names(last_message)
+        if function_names:
+            executors = [agent for agent in groupchat.agents if agent.can_execute_function(function_names)]
+            if len(executors) == 1:
+                self.deterministic += 1
+                return executors[0]
+            self.llm_fallbacks += 1
+            return "auto"
+
+        # What AutoGen's own graph would choose from
+        graph_candidates = self.transitions.get(last_speaker, groupchat.agents)
+
+        if _is_tool_result(last_message) and len(messages) >= 2:
+            try:
+                caller = groupchat.agent_by_name(messages[-2].get("name"))
+            except ValueError:
+                caller = None
+            if caller is not None:
+                candidates = self.transitions.get(caller, [])
+                # The caller sees its tool's result if it may speak again, otherwise its turn goes on as planned
+                if caller in candidates:
+                    return self._pick(caller, graph_candidates)
+                if len(candidates) == 1:
+                    return self._pick(candidates[0], graph_candidates)
+        else:
+            candidates = self.transitions.get(last_speaker, [])
+            if len(candidates) > 1 and last_message.get("name") == getattr(last_speaker, "name", None):
+                others = [agent for agent in candidates if agent is not last_speaker]
+                if len(others) == 1:
+                    return self._pick(others[0], graph_candidates)
+            if len(candidates) == 1:
+                return self._pick(candidates[0], graph_candidates)
+
+        self.llm_fallbacks += 1
+        return "auto"
+
+    def _pick(self, speaker, graph_candidates):
+        self.deterministic += 1
+        if len(graph_candidates) > 1:
+            # AutoGen's graph left a choice here, which it would have sent to the LLM
+            self.saved += 1
+        return speaker
+
+    def reset(self) -> None:
+        self.deterministic = 0
+        self.llm_fallbacks = 0
+        self.saved = 0
+
+    def stats(self) -> dict:
+        """Per-run counters; llm_calls_saved only counts picks AutoGen's own selection would have asked the LLM for."""
+        return {
+            "deterministic_selections": self.deterministic,
+            "llm_selections": self.llm_fallbacks,
+            "llm_calls_saved": self.saved,
+        }
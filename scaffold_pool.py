@@ -0,0 +1,272 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
+import json
+import uuid
+import logging
+
+from deps import run_npm, write_stamp
+
+logger = logging.getLogger(__name__)
+
+# Where the template project and the pre-cloned copies live (override with SCAFFOLD_POOL_DIR)
+DEFAULT_POOL_DIR = os.getenv("SCAFFOLD_POOL_DIR", os.path.join(os.path.expanduser("~"), ".react-scaffold-pool"))
+
+# Command used to build the template project once
+CRA_SCAFFOLD_COMMAND = "npx create-react-app ."
+# Scaffold used when none is chosen explicitly: "cra" or "vite" (override with REACT_SCAFFOLD)
+DEFAULT_SCAFFOLD = os.getenv("REACT_SCAFFOLD", "cra")
+
+# Minimal Vite + React project. `npm start` runs Vite on $PORT, so the dev server supervisor
+# drives both templates the same way, and .js files may contain JSX like in create-react-app.
+VITE_PACKAGE_JSON = {
+    "name": "react-app",
+    "private": True,
+    "version": "0.1.0",
+    "type": "module",
+    "scripts": {"start": "vite", "dev": "vite", "build": "vite build", "preview": "vite preview"},
+    "dependencies": {"react": "^18.3.1", "react-dom": "^18.3.1", "web-vitals": "^2.1.4"},
+    "devDependencies": {"@vitejs/plugin-react": "^4.3.4", "vite": "^5.4.11"},
+}
+VITE_TEMPLATE_FILES = {
+    "vite.config.js": """import { defineConfig } from 'vite';
+import react from '@vitejs/plugin-react';
+
+export default defineConfig({
+  plugins: [react()],
+  server: { port: Number(process.env.PORT) || 5173, strictPort: true },
+  esbuild: { loader: 'jsx', include: /src\\/.*\\.jsx?$/, exclude: [] },
+  optimizeDeps: { esbuildOptions: { loader: { '.js': 'jsx' } } },
+});
+""",
+    "index.html": """<!doctype html>
+<html lang="en">
+  <head>
+    <meta charset="UTF-8" />
+    <meta name="viewport" content="width=device-width, initial-scale=1.0" />
+    <title>React App</title>
+  </head>
+  <body>
+    <div id="root"></div>
+    <script type="module" src="/src/main.jsx"></script>
+  </body>
+</html>
+""",
+    os.path.join("src", "main.jsx"): """import React from 'react';
+import ReactDOM from 'react-dom/client';
+import './index.css';
+import App from './App';
+
+ReactDOM.createRoot(document.getElementById('root')).render(
+  <React.StrictMode>
+    <App />
+  </React.StrictMode>
+);
+""",
+    os.path.join("src", "App.js"): """function App() {
+  return <div>Hello from Vite</div>;
+}
+
+export default App;
+""",
+    os.path.join("src", "App.css"): "",
+    os.path.join("src", "index.css"): "",
+}
+
+
+def scaffold_vite(workdir):
+    """Write the Vite template into workdir and install its dependencies."""
+    with open(os.path.join(workdir, "package.json"), "w", encoding="utf-8") as f:
+        json.dump(VITE_PACKAGE_JSON, f, indent=2)
+    for path, content in VITE_TEMPLATE_FILES.items():
+        full_path = os.path.join(workdir, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w", encoding="utf-8") as f:
+            f.write(content)
+    run_npm("npm install", workdir)
+
+
+# How each selectable template is built: a shell command or a function of the target directory
+SCAFFOLD_COMMANDS = {"cra": CRA_SCAFFOLD_COMMAND, "vite": scaffold_vite}
+
+
+def _copy_tree(src, dst):
+    """
+    Clone a project directory.
+
+    node_modules is hardlinked (it is never edited by the generator), everything else
+    is copied so that writing src/App.js can never modify the template through a shared inode.
+    """
+    for root, dirs, files in os.walk(src):
+        rel = os.path.relpath(root, src)
+        target_root = os.path.join(dst, rel) if rel != "." else dst
+        os.makedirs(target_root, exist_ok=True)
+        in_node_modules = rel.split(os.sep)[0] == "node_modules"
+        if rel == "node_modules" and ".cache" in dirs:
+            # Build caches are rewritten in place, so never share them
+            dirs.remove(".cache")
+        for name in files:
+            source = os.path.join(root, name)
+            target = os.path.join(target_root, name)
+            if os.path.islink(source):
+                os.symlink(os.readlink(source), target)
+            elif in_node_modules:
+                try:
+                    os.link(source, target)
+                except OSError:
+                    shutil.copy2(source, target)
+            else:
+                shutil.copy2(source, target)
+        # Keep symlinked directories (node_modules/.bin style) as symlinks
+        for name in list(dirs):
+            source = os.path.join(root, name)
+            if os.path.islink(source):
+                os.symlink(os.readlink(source), os.path.join(target_root, name))
+                dirs.remove(name)
+
+
+def clone_project(src, dst):
+    """Clone src into dst using copy-on-write when the filesystem supports it, hardlinks otherwise."""
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    if os.name != "nt" and shutil.which("cp"):
+        # --reflink=always fails fast on filesystems without CoW, then we fall back
+        result = subprocess.run(["cp", "-a", "--reflink=always", src, dst], capture_output=True)
+        if result.returncode == 0:
+            return
+        shutil.rmtree(dst, ignore_errors=True)
+    _copy_tree(src, dst)
+
+
+def _is_empty_dir(path):
+    return not os.path.exists(path) or (os.path.isdir(path) and not os.listdir(path))
+
+
+class ScaffoldPool:
+    """Keeps a template React project with node_modules installed plus a few ready-to-use clones."""
+
+    def __init__(self, pool_dir=DEFAULT_POOL_DIR, size=2, scaffold_command=CRA_SCAFFOLD_COMMAND):
+        self.pool_dir = pool_dir
+        self.size = size
+        self.scaffold_command = scaffold_command
+        self.template_dir = os.path.join(pool_dir, "template")
+        self.ready_dir = os.path.join(pool_dir, "ready")
+        self._lock = threading.Lock()
+        # Held only while checking for and starting a refill; _lock is busy for the whole scaffold
+        self._refill_lock = threading.Lock()
+        self._refill_thread = None
+
+    def template_ready(self):
+        """Return True once the template project has node_modules installed."""
+        return os.path.exists(os.path.join(self.template_dir, "node_modules")) and os.path.exists(
+            os.path.join(self.template_dir, "package.json")
+        )
+
+    def ensure_template(self):
+        """Scaffold the template project once (this is the slow, cold path)."""
+        with self._lock:
+            if self.template_ready():
+                return
+            shutil.rmtree(self.template_dir, ignore_errors=True)
+            os.makedirs(self.template_dir, exist_ok=True)
+            if callable(self.scaffold_command):
+                self.scaffold_command(self.template_dir)
+            else:
+                run_npm(self.scaffold_command, self.template_dir)
+            # Clones inherit the stamp, so their dependency check is a hash comparison instead of a walk
+            write_stamp(self.template_dir)
+
+    def _ready_names(self):
+        # The pool directory is created by the first refill, not when the pool object is built
+        return os.listdir(self.ready_dir) if os.path.isdir(self.ready_dir) else []
+
+    def ready_count(self):
+        return len([name for name in self._ready_names() if not name.startswith(".")])
+
+    def _take_ready(self):
+        # Claim a clone by renaming it to a hidden name so concurrent callers never share one
+        with self._lock:
+            for name in sorted(self._ready_names()):
+                if not name.startswith("."):
+                    claimed = os.path.join(self.ready_dir, f".claimed-{name}")
+                    os.replace(os.path.join(self.ready_dir, name), claimed)
+                    return claimed
+        return None
+
+    def acquire(self, dest):
+        """
+        Materialize a scaffolded project at dest.
+
+        Returns:
+            str: How the project was provided: "pooled", "cloned" or "existing".
+        """
+        if os.path.exists(os.path.join(dest, "node_modules")):
+            return "existing"
+        if not _is_empty_dir(dest):
+            raise FileExistsError(f"{dest} is not empty and has no node_modules")
+        self.ensure_template()
+
+        mode = "cloned"
+        ready = self._take_ready()
+        if ready is not None:
+            try:
+                # A rename within the same filesystem is instant
+                if os.path.exists(dest):
+                    os.rmdir(dest)
+                os.replace(ready, dest)
+                mode = "pooled"
+            except OSError:
+                try:
+                    clone_project(ready, dest)
+                finally:
+                    # The claimed clone is never handed out again, whether the copy worked or not
+                    shutil.rmtree(ready, ignore_errors=True)
+                mode = "pooled"
+        else:
+            if os.path.exists(dest):
+                os.rmdir(dest)
+            clone_project(self.template_dir, dest)
+
+        self.refill_async()
+        return mode
+
+    def refill(self):
+        """Top the pool up to its configured size."""
+        self.ensure_template()
+        while self.ready_count() < self.size:
+            # Clone into a hidden staging dir so acquire never sees a half-copied project
+            staging = os.path.join(self.ready_dir, f".staging-{uuid.uuid4().hex}")
+            clone_project(self.template_dir, staging)
+            os.replace(staging, os.path.join(self.ready_dir, f"{time.time():.6f}-{uuid.uuid4().hex[:8]}"))
+
+    def refill_async(self):
+        """Refill the pool in a background thread (no-op if a refill is already running)."""
+        with self._refill_lock:
+            if self._refill_thread is not None and self._refill_thread.is_alive():
+                return self._refill_thread
+            self._refill_thread = threading.Thread(target=self._refill_quietly, name="scaffold-pool-refill", daemon=True)
+            self._refill_thread.start()
+            return self._refill_thread
+
+    def _refill_quietly(self):
+        try:
+            self.refill()
+        except Exception:
+            logger.exception("Error refilling scaffold pool %s", self.pool_dir)
+
+
+# Shared pools used by the Streamlit apps, one per template
+scaffold_pools = {
+    "cra": ScaffoldPool(),
+    "vite": ScaffoldPool(pool_dir=os.path.join(DEFAULT_POOL_DIR, "vite"), scaffold_command=scaffold_vite),
+}
+scaffold_pool = scaffold_pools["cra"]
+
+
+def get_scaffold_pool(scaffold=None):
+    """Return the shared pool for a template name ("cra" or "vite"; default REACT_SCAFFOLD)."""
+    scaffold = scaffold or DEFAULT_SCAFFOLD
+    if scaffold not in scaffold_pools:
+        raise ValueError(f"Unknown scaffold {scaffold!r}, expected one of {', '.join(scaffold_pools)}")
+    return scaffold_pools[scaffold]
@@ -0,0 +1,54 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from tracing import tracer
+
+# Shared pool for pipeline stages that do not depend on the LLM output (scaffolding, dependency checks)
+background_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="pipeline-stage")
+
+
+class StageTimer:
+    """Records start/end offsets of pipeline stages, including stages running in background threads."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = []
+        self._lock = threading.Lock()
+
+    def _record(self, name, start, end):
+        with self._lock:
+            self.stages.append({"stage": name, "start_s": round(start - self.started, 3), "end_s": round(end - self.started, 3),
+                                "duration_s": round(end - start, 3)})
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            with tracer.span(f"stage:{name}"):
+                yield
+        finally:
+            self._record(name, start, time.perf_counter())
+
+    def run_in_background(self, name, fn, *args, **kwargs) -> Future:
+        """Run fn on the background executor and time it as its own stage."""
+        def timed():
+            with self.stage(name):
+                return fn(*args, **kwargs)
+        # Run in a copy of the caller's context so spans stay attached to the caller's trace
+        return background_executor.submit(contextvars.copy_context().run, timed)
+
+    def summary(self) -> dict:
+        """Wall-clock time versus the time the same stages would take back to back."""
+        with self._lock:
+            stages = sorted(self.stages, key=lambda stage: stage["start_s"])
+        wall_clock = max((stage["end_s"] for stage in stages), default=0.0)
+        sequential = sum(stage["duration_s"] for stage in stages)
+        return {
+            "stages": stages,
+            "wall_clock_s": round(wall_clock, 3),
+            "sequential_s": round(sequential, 3),
+            "saved_s": round(max(sequential - wall_clock, 0.0), 3),
+        }
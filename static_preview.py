@@ -0,0 +1,342 @@
+import os
+import gzip
+import json
+import atexit
+import shutil
+import hashlib
+import mimetypes
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional, Tuple
+
+from deps import run_npm
+from dev_server import detect_flavor, find_free_port
+from tracing import tracer
+
+# Every project is served under PREVIEW_PREFIX/<slug>/ from a single server
+PREVIEW_PREFIX = "/preview"
+PREVIEW_HOST = os.getenv("PREVIEW_HOST", "127.0.0.1")
+# Port of the shared static server; a free port in 4000-4999 when unset
+PREVIEW_PORT = int(os.getenv("PREVIEW_PORT", "0"))
+# Written into the build directory to skip rebuilding unchanged sources
+BUILD_STAMP = ".preview-build.json"
+# Build inputs hashed for that stamp (node_modules and the build output are never inputs)
+SOURCE_DIRS = ("src", "public")
+SOURCE_FILES = ("package.json", "index.html", "vite.config.js", "vite.config.mjs", "vite.config.cjs", "vite.config.ts")
+# Only text-like assets are worth compressing; images and fonts are compressed already
+COMPRESSIBLE_EXTENSIONS = (".html", ".js", ".mjs", ".css", ".json", ".map", ".svg", ".txt", ".xml", ".ico", ".wasm")
+MIN_COMPRESS_BYTES = 512
+# Content-hashed bundles (CRA's static/, Vite's assets/) never change under the same URL
+IMMUTABLE_DIRS = ("static/", "assets/")
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+# Everything else (index.html, manifest.json, ...) is revalidated with its ETag
+REVALIDATE_CACHE = "no-cache"
+CHUNK_SIZE = 64 * 1024
+
+
+def preview_slug(workdir: str) -> str:
+    """URL-safe, stable name for a project: its directory name plus a short hash of the full path."""
+    workdir = os.path.abspath(workdir)
+    name = "".join(c if c.isalnum() or c in "-_" else "-" for c in os.path.basename(workdir).lower()) or "app"
+    return f"{name}-{hashlib.sha256(workdir.encode('utf-8')).hexdigest()[:8]}"
+
+
+def source_fingerprint(workdir: str, base: str) -> str:
+    """sha256 over the build inputs and the public base path."""
+    digest = hashlib.sha256(base.encode("utf-8") + b"\0")
+    paths = [os.path.join(workdir, name) for name in SOURCE_FILES]
+    for directory in SOURCE_DIRS:
+        for root, dirs, files in os.walk(os.path.join(workdir, directory)):
+            dirs.sort()
+            paths.extend(os.path.join(root, name) for name in sorted(files))
+    for path in paths:
+        if os.path.isfile(path):
+            digest.update(os.path.relpath(path, workdir).replace(os.sep, "/").encode("utf-8") + b"\0")
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def build_project(workdir: str, base: str, on_line: Optional[Callable[[str, str], None]] = None,
+                  force: bool = False) -> Tuple[str, bool]:
+    """
+    Production build of workdir with its assets addressed under `base` (e.g. "/preview/app-1a2b3c4d/").
+
+    Returns:
+        Tuple[str, bool]: The build directory, and whether a build ran (False when the sources were unchanged).
+    """
+    flavor = detect_flavor(workdir)
+    build_dir = os.path.join(workdir, "dist" if flavor == "vite" else "build")
+    stamp_path = os.path.join(build_dir, BUILD_STAMP)
+    fingerprint = source_fingerprint(workdir, base)
+    if not force:
+        try:
+            with open(stamp_path, "r", encoding="utf-8") as f:
+                if json.load(f).get("fingerprint") == fingerprint:
+                    return build_dir, False
+        except (OSError, ValueError):
+            pass
+
+    with tracer.span("preview.build", flavor=flavor):
+        if flavor == "vite":
+            run_npm(f"npm run build -- --base={base}", workdir, on_line)
+        else:
+            # CI=false: create-react-app fails the build on lint warnings under CI
+            env = dict(os.environ, PUBLIC_URL=base.rstrip("/"), CI="false", GENERATE_SOURCEMAP="false")
+            run_npm("npm run build", workdir, on_line, env=env)
+    with open(stamp_path, "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": fingerprint, "base": base}, f)
+    return build_dir, True
+
+
+def _brotli():
+    # Optional dependency: without it only .gz variants are written
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def _discard(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def precompress(build_dir: str) -> dict:
+    """
+    Write .gz (and .br, when brotli is installed) next to every compressible asset, once.
+
+    Variants that would not be smaller are not written (and older ones removed), so the server
+    falls back to the original.
+    """
+    brotli = _brotli()
+    stats = {"files": 0, "bytes": 0, "gzip_bytes": 0, "br_bytes": 0, "brotli": brotli is not None}
+    with tracer.span("preview.compress") as span:
+        for root, _, files in os.walk(build_dir):
+            for name in files:
+                if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                    continue
+                path = os.path.join(root, name)
+                size = os.path.getsize(path)
+                variants = []
+                if size >= MIN_COMPRESS_BYTES:
+                    variants.append((".gz", "gzip_bytes", lambda raw: gzip.compress(raw, 9, mtime=0)))
+                    if brotli is not None:
+                        variants.append((".br", "br_bytes", lambda raw: brotli.compress(raw, quality=11)))
+                # A variant left over from an earlier build would be served in place of this asset
+                for suffix in (".gz", ".br")[len(variants):]:
+                    _discard(path + suffix)
+                if not variants:
+                    continue
+                stats["files"] += 1
+                stats["bytes"] += size
+                data = None
+                for suffix, key, compress in variants:
+                    target = path + suffix
+                    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                        stats[key] += os.path.getsize(target)
+                        continue
+                    if data is None:
+                        with open(path, "rb") as f:
+                            data = f.read()
+                    compressed = compress(data)
+                    if len(compressed) >= size:
+                        _discard(target)
+                        continue
+                    with open(target, "wb") as f:
+                        f.write(compressed)
+                    stats[key] += len(compressed)
+        span.set(files=stats["files"], bytes=stats["bytes"], gzip_bytes=stats["gzip_bytes"])
+    return stats
+
+
+def _accepted_encodings(header: str) -> set:
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class _PreviewHandler(BaseHTTPRequestHandler):
+    server_version = "StaticPreview"
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def log_message(self, format, *args):
+        # One line per asset request would drown the Streamlit log
+        pass
+
+    def _resolve(self):
+        """Map the request to (file, path relative to the build dir); None for a 404, a str to redirect to."""
+        path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        parts = path.split("/", 3)
+        if len(parts) < 3 or f"/{parts[1]}" != PREVIEW_PREFIX:
+            return None
+        root = self.server.previews.root(parts[2])
+        if root is None:
+            return None
+        if len(parts) == 3:
+            # Relative asset URLs only resolve below the trailing slash
+            return f"{PREVIEW_PREFIX}/{parts[2]}/"
+        relative = parts[3]
+        if any(segment.startswith(".") for segment in relative.split("/")):
+            return None
+        full_path = os.path.realpath(os.path.join(root, relative))
+        if full_path != root and not full_path.startswith(root + os.sep):
+            return None
+        if os.path.isdir(full_path):
+            full_path = os.path.join(full_path, "index.html")
+        if not os.path.isfile(full_path):
+            if "." in os.path.basename(relative):
+                return None
+            # Client-side routes get the app shell
+            full_path = os.path.join(root, "index.html")
+            if not os.path.isfile(full_path):
+                return None
+        return full_path, os.path.relpath(full_path, root).replace(os.sep, "/")
+
+    def _serve(self, send_body):
+        resolved = self._resolve()
+        if resolved is None:
+            self.send_error(404)
+            return
+        if isinstance(resolved, str):
+            self.send_response(301)
+            self.send_header("Location", resolved)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        full_path, relative = resolved
+        accepted = _accepted_encodings(self.headers.get("Accept-Encoding", ""))
+        body_path, encoding = full_path, None
+        for coding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if coding in accepted and os.path.isfile(full_path + suffix):
+                body_path, encoding = full_path + suffix, coding
+                break
+        stat = os.stat(body_path)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{"-" + encoding if encoding else ""}"'
+        cache_control = IMMUTABLE_CACHE if relative.startswith(IMMUTABLE_DIRS) else REVALIDATE_CACHE
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", cache_control)
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return
+
+        content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+            content_type += "; charset=utf-8"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(stat.st_size))
+        self.send_header("Cache-Control", cache_control)
+        self.send_header("ETag", etag)
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        if send_body:
+            # Streamed from disk, so memory per preview stays flat however large the bundle is
+            with open(body_path, "rb") as f:
+                shutil.copyfileobj(f, self.wfile, CHUNK_SIZE)
+
+
+class StaticPreviewServer:
+    """One threaded HTTP server for every built project, each under PREVIEW_PREFIX/<slug>/."""
+
+    def __init__(self, host=PREVIEW_HOST, port=PREVIEW_PORT):
+        self.host = host
+        self.port = port
+        self.roots = {}
+        self._httpd = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the server (once); later calls are no-ops."""
+        with self._lock:
+            if self._httpd is not None:
+                return
+            port = self.port or find_free_port(4000, 4999)
+            self._httpd = ThreadingHTTPServer((self.host, port), _PreviewHandler)
+            self._httpd.daemon_threads = True
+            self._httpd.previews = self
+            self.port = self._httpd.server_address[1]
+            threading.Thread(target=self._httpd.serve_forever, name="static-preview", daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://localhost:{self.port}"
+
+    def url_for(self, slug):
+        return f"{self.url}{PREVIEW_PREFIX}/{slug}/"
+
+    def register(self, slug, build_dir):
+        self.roots[slug] = os.path.realpath(build_dir)
+
+    def unregister(self, slug):
+        return self.roots.pop(slug, None) is not None
+
+    def root(self, slug):
+        return self.roots.get(slug)
+
+    def publish(self, workdir, on_line: Optional[Callable[[str, str], None]] = None, force: bool = False) -> dict:
+        """
+        Build (if the sources changed), precompress and serve workdir.
+
+        Raises subprocess.CalledProcessError (with the output tail) if the build fails.
+
+        Returns:
+            dict: url, slug, build_dir, whether a build ran, and the precompression stats.
+        """
+        self.start()
+        slug = preview_slug(workdir)
+        build_dir, built = build_project(workdir, f"{PREVIEW_PREFIX}/{slug}/", on_line=on_line, force=force)
+        compression = precompress(build_dir)
+        self.register(slug, build_dir)
+        return {"url": self.url_for(slug), "slug": slug, "build_dir": build_dir, "built": built, **compression}
+
+    def status(self):
+        return [{"slug": slug, "url": self.url_for(slug), "build_dir": root} for slug, root in self.roots.items()]
+
+    def stop(self):
+        with self._lock:
+            if self._httpd is not None:
+                self._httpd.shutdown()
+                self._httpd.server_close()
+                self._httpd = None
+
+
+def publish_preview(workdir: str, on_line: Optional[Callable[[str, str], None]] = None) -> Tuple[str, Optional[dict]]:
+    """
+    Publish workdir on the shared static server.
+
+    Returns:
+        Tuple[str, Optional[dict]]: A status message, and publish()'s result (None if the build failed).
+    """
+    try:
+        preview = previews.publish(workdir, on_line=on_line)
+    except Exception as e:
+        output = getattr(e, "output", None)
+        return f"Error building the static preview: {e}" + (f"\n{output}" if output else ""), None
+    compressed = f", {preview['files']} assets precompressed ({preview['bytes'] / 1024:.1f} KB → {preview['gzip_bytes'] / 1024:.1f} KB gzip)"
+    built = "Built" if preview["built"] else "Sources unchanged, reused the build"
+    return f"{built}{compressed}. Static preview at {preview['url']}.", preview
+
+
+# Shared static server used by the Streamlit apps
+previews = StaticPreviewServer()
+atexit.register(previews.stop)
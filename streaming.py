@@ -0,0 +1,113 @@
+import os
+import time
+import base64
+from typing import Callable, Iterable, List, NamedTuple, Optional
+
+from code_blocks import CodeBlock, CodeBlockParser, block_path, resolve_project_path
+from tracing import tracer
+
+# Minimum seconds between on_text updates; each one hands over the whole response so far
+TEXT_UPDATE_INTERVAL = 0.1
+
+
+class StreamResult(NamedTuple):
+    text: str
+    blocks: List[CodeBlock]
+    first_token_s: Optional[float]
+    first_partial_code_s: Optional[float]
+    first_code_s: Optional[float]
+    total_s: float
+
+
+def vision_messages(prompt: str, image_data: bytes, mime_type: str) -> List[dict]:
+    """OpenAI-style user message carrying the prompt and the (preprocessed) image as a data URL."""
+    data_url = f"data:{mime_type};base64,{base64.b64encode(image_data).decode('ascii')}"
+    return [{
+        "role": "user",
+        "content": [
+            {"type": "text", "text": prompt},
+            {"type": "image_url", "image_url": {"url": data_url}},
+        ],
+    }]
+
+
+def consume_stream(chunks: Iterable[str], on_text: Optional[Callable[[str, Optional[CodeBlock]], None]] = None,
+                   on_block: Optional[Callable[[CodeBlock], None]] = None,
+                   text_interval: float = TEXT_UPDATE_INTERVAL) -> StreamResult:
+    """
+    Read a token stream, extracting fenced code blocks as soon as each one closes.
+
+    on_text(text_so_far, partial_block) is called at most every `text_interval` seconds and once
+    after the last chunk, on_block(block) for every completed block. Timings are relative to the
+    call and measure time to first token, first partial code and first complete code block.
+    """
+    start = time.perf_counter()
+    parser = CodeBlockParser()
+    parts, blocks = [], []
+    first_token = first_partial = first_code = None
+    last_text = None
+    for chunk in chunks:
+        now = time.perf_counter() - start
+        if first_token is None:
+            first_token = now
+        parts.append(chunk)
+        completed = parser.feed(chunk)
+        if first_partial is None and parser.in_block and parser.partial().code.strip():
+            first_partial = now
+        if on_text is not None and (last_text is None or now - last_text >= text_interval):
+            # Joining is linear in the response, so it happens per update, not per chunk
+            parts = ["".join(parts)]
+            on_text(parts[0], parser.partial())
+            last_text = now
+        for block in completed:
+            blocks.append(block)
+            if on_block is not None:
+                on_block(block)
+            if first_code is None:
+                first_code = time.perf_counter() - start
+    text = "".join(parts)
+    if on_text is not None and len(parts) > 1:
+        on_text(text, parser.partial())
+    for block in parser.close():
+        if block.complete:
+            blocks.append(block)
+            if on_block is not None:
+                on_block(block)
+            if first_code is None:
+                first_code = time.perf_counter() - start
+    return StreamResult(text, blocks, first_token, first_partial, first_code, time.perf_counter() - start)
+
+
+class ProgressiveWriter:
+    """Writes completed code blocks into a project while the response is still streaming."""
+
+    def __init__(self, project_path: str, before_first_write: Optional[Callable[[], None]] = None,
+                 default_path: Optional[str] = "src/App.js", validate: Optional[Callable[[str, str], bool]] = None):
+        self.project_path = project_path
+        self.before_first_write = before_first_write
+        self.default_path = default_path
+        # validate(path, code) returning False keeps a block that does not parse out of the project
+        self.validate = validate
+        self.written = []
+        self.rejected = []
+
+    def __call__(self, block: CodeBlock) -> Optional[str]:
+        path = block_path(block, default=self.default_path if self.default_path not in self.written else None)
+        if not path or "node_modules" in path or not block.code.strip():
+            return None
+        full_path = resolve_project_path(self.project_path, path)
+        if full_path is None:
+            # Model-supplied paths must stay inside the project
+            self.rejected.append(path)
+            return None
+        if self.validate is not None and self.validate(path, block.code) is False:
+            self.rejected.append(path)
+            return None
+        if not self.written and self.before_first_write is not None:
+            # e.g. wait for the scaffold, which must not find files in an empty target dir
+            self.before_first_write()
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with tracer.span("file.write", path=path), open(full_path, "w", encoding="utf-8") as file:
+            file.write(block.code.rstrip() + "\n")
+        self.written.append(path)
+        return path
@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+# The modules create their shared caches, history, traces and job store at import time, so point
+# every one of them at a throwaway directory before any test imports them
+_STATE_DIR = tempfile.mkdtemp(prefix="flowchart-tests-")
+os.environ.setdefault("LLM_CACHE_PATH", os.path.join(_STATE_DIR, "llm_results.sqlite3"))
+os.environ.setdefault("HISTORY_PATH", os.path.join(_STATE_DIR, "history.sqlite3"))
+os.environ.setdefault("TRACE_PATH", os.path.join(_STATE_DIR, "traces.jsonl"))
+os.environ.setdefault("JOB_STORE_DIR", os.path.join(_STATE_DIR, "jobs"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,87 @@
+import pytest
+
+from code_blocks import CodeBlockParser, parse_code_blocks, select_app_code, block_path
+from streaming import consume_stream
+
+RESPONSE = """Here is the app.
+
+```javascript
+// filename: src/App.js
+import React from 'react';
+import Header from './components/Header';
+
+export default function App() {
+  return <Header />;
+}
+```
+
+And the header:
+
+~~~jsx filename=src/components/Header.js
+const Header = () => <h1>```not a fence```</h1>;
+export default Header;
+~~~
+
+```json
+{"name": "app"}
+```
+
+```css
+.unterminated {
+"""
+
+
+def _chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(RESPONSE)])
+def test_streaming_matches_batch(size):
+    batch = parse_code_blocks(RESPONSE)
+    streamed = []
+    result = consume_stream(_chunks(RESPONSE, size), on_block=streamed.append)
+    assert result.text == RESPONSE
+    assert streamed == batch
+    assert result.blocks == batch
+
+
+@pytest.mark.parametrize("size", [1, 5, 13])
+def test_parser_fed_in_chunks_matches_batch(size):
+    parser = CodeBlockParser()
+    blocks = []
+    for chunk in _chunks(RESPONSE, size):
+        blocks.extend(parser.feed(chunk))
+    closed = parser.close()
+    assert blocks + [block for block in closed if block.complete] == parse_code_blocks(RESPONSE)
+    assert [block.complete for block in closed] == [False]
+
+
+def test_filenames_languages_and_incomplete_blocks():
+    blocks = parse_code_blocks(RESPONSE, include_incomplete=True)
+    assert [(b.language, b.filename, b.complete) for b in blocks] == [
+        ("javascript", "src/App.js", True),
+        ("jsx", "src/components/Header.js", True),
+        ("json", None, True),
+        ("css", None, False),
+    ]
+    # The filename header is not part of the code
+    assert blocks[0].code.startswith("import React")
+    assert "```not a fence```" in blocks[1].code
+
+
+def test_partial_block_while_streaming():
+    parser = CodeBlockParser()
+    parser.feed("```js\nconst a = 1;\nconst b")
+    partial = parser.partial()
+    assert parser.in_block and not partial.complete
+    assert partial.code == "const a = 1;\nconst b"
+
+
+def test_select_app_code_and_block_path():
+    blocks = parse_code_blocks(RESPONSE)
+    assert select_app_code(blocks).startswith("import React")
+    assert select_app_code(parse_code_blocks("```json\n{}\n```\n```jsx\n<App />\n```\n")) == "<App />"
+    assert select_app_code([]) is None
+    assert block_path(blocks[1]) == "src/components/Header.js"
+    assert block_path(blocks[2]) is None
+    assert block_path(parse_code_blocks("```js\nx\n```")[0]) == "src/App.js"
@@ -0,0 +1,67 @@
+import copy
+
+from context_compaction import HistoryCompactor, estimate_tokens, messages_tokens, replace_saved_code_blocks
+
+CODE = "```javascript\n// filename: src/App.js\n" + "const line = 'x';\n" * 40 + "```"
+
+
+def _history(turns=12):
+    messages = [{"role": "user", "name": "User", "content": "Build a colorful dashboard. " * 5}]
+    for i in range(turns):
+        messages.append({"role": "assistant", "name": "Coder", "content": f"Turn {i}\n{CODE}\nmore detail " * 3})
+    return messages
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd" * 10) == 11
+
+
+def test_saved_code_blocks_become_references():
+    content = f"Saved it:\n{CODE}\ndone"
+    replaced = replace_saved_code_blocks(content, ["src/App.js"])
+    assert "const line" not in replaced
+    assert "[code for src/App.js omitted: already saved to disk]" in replaced
+    assert replace_saved_code_blocks(content, ["src/Other.js"]) == content
+
+
+def test_compaction_keeps_task_and_recent_turns_and_never_mutates_history():
+    messages = _history()
+    original = copy.deepcopy(messages)
+    compactor = HistoryCompactor(lambda: [], keep_recent=4, max_prompt_tokens=100_000)
+    compacted = compactor.compact(messages, agent_name="Coder")
+    assert messages == original
+    assert compacted[0] == messages[0]
+    assert compacted[-4:] == messages[-4:]
+    assert all("summarized" in m["content"] for m in compacted[1:-4])
+    assert messages_tokens(compacted) < messages_tokens(messages)
+    assert compactor.rounds[-1]["tokens_saved"] == messages_tokens(messages) - messages_tokens(compacted)
+
+
+def test_budget_drops_oldest_turns_but_keeps_task_and_recent():
+    messages = _history(20)
+    compactor = HistoryCompactor(lambda: [], keep_recent=3, max_prompt_tokens=10, agent_budgets={"Other": 100_000})
+    compacted = compactor.compact(messages, agent_name="Coder")
+    assert len(compacted) == 4
+    assert compacted[0] == messages[0] and compacted[1:] == messages[-3:]
+    assert len(compactor.compact(messages, agent_name="Other")) == len(messages)
+
+
+def test_tool_messages_keep_their_shape_and_are_not_orphaned():
+    messages = [{"role": "user", "content": "task " * 50}]
+    for i in range(6):
+        messages.append({"role": "assistant", "content": None,
+                         "tool_calls": [{"id": str(i), "function": {"name": "save_files", "arguments": "{}"}}]})
+        messages.append({"role": "tool", "tool_call_id": str(i), "content": "saved " * 50})
+    compactor = HistoryCompactor(lambda: [], keep_recent=2, max_prompt_tokens=1)
+    compacted = compactor.compact(messages)
+    assert compacted[0] == messages[0]
+    assert compacted[1].get("role") != "tool"
+    for message in compacted[1:]:
+        assert message in messages
+
+
+def test_saved_files_are_replaced_even_in_recent_turns():
+    messages = _history(2)
+    compacted = HistoryCompactor(lambda: ["src/App.js"], keep_recent=6).compact(messages)
+    assert all("const line" not in m["content"] for m in compacted[1:])
@@ -0,0 +1,147 @@
+import json
+import os
+
+import pytest
+
+import fanout
+from fanout import ComponentSpec, apply_plan_update, assemble_app, diff_plans, generate_fanout, parse_component_plan
+from incremental import description_changes, load_state, save_state
+
+DESCRIPTION = "Header with the title\nCounter with increment and reset buttons\nWarning shown above ten"
+PLAN = {"summary": "A counter app", "components": [
+    {"name": "Header", "spec": "Shows the title"},
+    {"name": "Counter", "spec": "Counts clicks"},
+    {"name": "Warning", "spec": "Warns above ten"},
+]}
+
+
+def _component(name):
+    return f"```javascript\n// filename: src/components/{name}.js\nexport default function {name}() {{ return null; }}\n```"
+
+
+class FakeModel:
+    """Completion callable that answers plans, plan updates and components, and records every prompt."""
+
+    def __init__(self, update=None):
+        self.prompts = []
+        self.update = update or {"summary": "A counter app", "changed": [], "removed": []}
+
+    def __call__(self, prompt, image=None):
+        self.prompts.append(prompt)
+        if "listing only what the edit affects" in prompt:
+            return self.update if isinstance(self.update, str) else json.dumps(self.update)
+        if "into independent React components" in prompt:
+            return json.dumps(PLAN)
+        name = prompt.split("Write the React component `", 1)[1].split("`", 1)[0]
+        return _component(name)
+
+    def kinds(self):
+        return ["update" if "listing only" in p else "plan" if "independent React" in p else "component" for p in self.prompts]
+
+
+@pytest.fixture(autouse=True)
+def no_jsx_parser(monkeypatch):
+    # Syntax checking needs node and a JSX parser; these tests are about planning and selection
+    monkeypatch.setattr(fanout, "validate_with_repair", lambda code, path, project_dir, repair, rounds=1: (code, {"ok": None}))
+
+
+def _generate(project, model, description=DESCRIPTION):
+    result = generate_fanout(model, description=description, project_dir=str(project), max_workers=2)
+    fanout.write_project_files(str(project), result.files, result.removed)
+    save_state(str(project), result.state)
+    return result
+
+
+def test_parse_component_plan_normalises_names():
+    summary, specs = parse_component_plan(
+        'Plan:\n{"summary": "s", "components": [{"name": "nav bar", "spec": "a"}, {"name": "App", "spec": "b"},'
+        ' {"name": "Nav-Bar", "spec": "c"}, {"name": "9lives", "spec": "d"}, "junk"]}')
+    assert summary == "s"
+    assert [spec.name for spec in specs] == ["NavBar", "App2", "NavBar3", "Section4"]
+    assert "import NavBar from './components/NavBar';" in assemble_app(specs)
+
+
+def test_diff_plans():
+    before = [ComponentSpec("A", "a"), ComponentSpec("B", "b"), ComponentSpec("C", "c")]
+    after = [ComponentSpec("A", "a"), ComponentSpec("B", "b2"), ComponentSpec("D", "d")]
+    assert diff_plans(before, after) == {"unchanged": ["A"], "changed": ["B"], "added": ["D"], "removed": ["C"]}
+
+
+def test_apply_plan_update_keeps_unchanged_specs_verbatim():
+    previous = [ComponentSpec("Header", "h"), ComponentSpec("Counter", "c"), ComponentSpec("Warning", "w")]
+    summary, specs = apply_plan_update(previous, json.dumps({
+        "summary": "new", "changed": [{"name": "counter", "spec": "c2"}, {"name": "Footer", "spec": "f"}],
+        "removed": ["Warning"]}))
+    assert summary == "new"
+    assert specs == [ComponentSpec("Header", "h"), ComponentSpec("Counter", "c2"), ComponentSpec("Footer", "f")]
+    assert apply_plan_update(previous, "not json") is None
+
+
+def test_description_changes():
+    assert description_changes(DESCRIPTION, DESCRIPTION + "\n\n") == []
+    assert description_changes(DESCRIPTION, DESCRIPTION.replace("above ten", "above twenty")) == [
+        "- Warning shown above ten", "+ Warning shown above twenty"]
+
+
+def test_first_run_plans_and_generates_everything(tmp_path):
+    model = FakeModel()
+    result = _generate(tmp_path, model)
+    assert model.kinds() == ["plan", "component", "component", "component"]
+    assert result.plan_changes is None
+    assert sorted(result.files) == ["src/App.js", "src/components/Counter.js", "src/components/Header.js",
+                                    "src/components/Warning.js"]
+    assert load_state(str(tmp_path))["description"] == DESCRIPTION
+
+
+def test_unchanged_description_makes_no_model_call(tmp_path):
+    _generate(tmp_path, FakeModel())
+    model = FakeModel()
+    result = _generate(tmp_path, model, DESCRIPTION + "\n")
+    assert model.prompts == []
+    assert all(component["reused"] for component in result.components)
+
+
+def test_edit_regenerates_only_changed_components(tmp_path):
+    _generate(tmp_path, FakeModel())
+    # A hand edit of an unchanged component survives the regeneration
+    header = tmp_path / "src" / "components" / "Header.js"
+    header.write_text("// edited by hand\n")
+    model = FakeModel({"summary": "A counter app", "changed": [{"name": "Counter", "spec": "Counts by two"}],
+                       "removed": ["Warning"]})
+    edited = DESCRIPTION.replace("increment", "double increment").replace("\nWarning shown above ten", "")
+    result = _generate(tmp_path, model, edited)
+    assert model.kinds() == ["update", "component"]
+    # Only the changed description lines reach the planner
+    assert "+ Counter with double increment and reset buttons" in model.prompts[0]
+    assert "Header with the title" not in model.prompts[0].split("was then edited", 1)[1]
+    assert result.plan_changes == {"unchanged": ["Header"], "changed": ["Counter"], "added": [], "removed": ["Warning"]}
+    assert result.removed == ("src/components/Warning.js",)
+    assert header.read_text() == "// edited by hand\n"
+    assert not (tmp_path / "src" / "components" / "Warning.js").exists()
+
+
+def test_edited_file_of_a_removed_component_is_kept(tmp_path):
+    _generate(tmp_path, FakeModel())
+    warning = tmp_path / "src" / "components" / "Warning.js"
+    warning.write_text("// edited by hand\n")
+    model = FakeModel({"summary": "s", "changed": [], "removed": ["Warning"]})
+    result = _generate(tmp_path, model, DESCRIPTION.replace("\nWarning shown above ten", ""))
+    assert result.removed == ()
+    assert warning.exists()
+
+
+def test_unparseable_update_falls_back_to_a_full_plan(tmp_path):
+    _generate(tmp_path, FakeModel())
+    model = FakeModel("Sorry, no JSON today")
+    result = _generate(tmp_path, model, DESCRIPTION + "\nFooter with links")
+    assert model.kinds()[:2] == ["update", "plan"]
+    assert result.plan_changes["unchanged"] == ["Header", "Counter", "Warning"]
+
+
+def test_missing_file_of_an_unchanged_component_is_regenerated(tmp_path):
+    _generate(tmp_path, FakeModel())
+    os.remove(tmp_path / "src" / "components" / "Header.js")
+    model = FakeModel()
+    result = _generate(tmp_path, model, DESCRIPTION)
+    assert model.kinds() == ["component"]
+    assert [c["name"] for c in result.components if not c["reused"]] == ["Header"]
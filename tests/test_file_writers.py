@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+from code_blocks import CodeBlock, resolve_project_path
+from fanout import remove_project_files, write_project_files
+from incremental import read_previous_file
+from streaming import ProgressiveWriter
+
+
+def test_resolve_project_path(tmp_path):
+    project = str(tmp_path / "app")
+    assert resolve_project_path(project, "src/App.js") == os.path.join(os.path.realpath(project), "src", "App.js")
+    assert resolve_project_path(project, "./src/../src/App.js") is not None
+    for path in ("../outside.js", "src/../../outside.js", os.path.abspath("/etc/passwd"), "", "."):
+        assert resolve_project_path(project, path) is None
+
+
+def test_symlinks_out_of_the_project_are_rejected(tmp_path):
+    project, outside = tmp_path / "app", tmp_path / "outside"
+    project.mkdir()
+    outside.mkdir()
+    try:
+        os.symlink(outside, project / "src", target_is_directory=True)
+    except (OSError, NotImplementedError):
+        pytest.skip("symlinks are not available")
+    assert resolve_project_path(str(project), "src/App.js") is None
+
+
+def test_progressive_writer_keeps_blocks_inside_the_project(tmp_path):
+    project = tmp_path / "app"
+    writer = ProgressiveWriter(str(project))
+    assert writer(CodeBlock("js", "../evil.js", "alert(1)", True, 1)) is None
+    assert writer(CodeBlock("js", "/tmp/evil.js", "alert(1)", True, 1)) is None
+    assert writer(CodeBlock("js", None, "export default 1;", True, 1)) == "src/App.js"
+    assert writer(CodeBlock("js", "node_modules/x/index.js", "x", True, 1)) is None
+    assert writer.rejected == ["../evil.js", "/tmp/evil.js"]
+    assert writer.written == ["src/App.js"]
+    assert not (tmp_path / "evil.js").exists()
+    assert (project / "src" / "App.js").read_text() == "export default 1;\n"
+
+
+def test_progressive_writer_holds_back_invalid_blocks(tmp_path):
+    writer = ProgressiveWriter(str(tmp_path), validate=lambda path, code: "broken" not in code)
+    assert writer(CodeBlock("js", "src/A.js", "broken(", True, 1)) is None
+    assert writer.rejected == ["src/A.js"] and not (tmp_path / "src" / "A.js").exists()
+
+
+def test_write_project_files_refuses_any_path_outside(tmp_path):
+    project = tmp_path / "app"
+    message = write_project_files(str(project), {"src/App.js": "ok\n", "../../evil.js": "x"})
+    assert message.startswith("Error writing generated files: outside the project")
+    # Nothing is written when any path escapes
+    assert not (project / "src" / "App.js").exists()
+
+
+def test_write_project_files_skips_identical_files_and_removes(tmp_path):
+    project = tmp_path / "app"
+    files = {"src/App.js": "a\n", "src/components/Old.js": "old\n"}
+    assert write_project_files(str(project), files).startswith("Wrote 2 of 2 files")
+    message = write_project_files(str(project), {"src/App.js": "a\n"}, ["src/components/Old.js", "../../outside.js"])
+    assert message.startswith("Wrote 0 of 1 files")
+    assert not (project / "src" / "components" / "Old.js").exists()
+
+
+def test_remove_project_files_ignores_paths_outside(tmp_path):
+    victim = tmp_path / "keep.js"
+    victim.write_text("x")
+    remove_project_files(str(tmp_path / "app"), ["../keep.js", "src/missing.js"])
+    assert victim.exists()
+
+
+def test_read_previous_file_only_reads_recorded_paths_inside(tmp_path):
+    (tmp_path / "secret.txt").write_text("secret")
+    project = tmp_path / "app"
+    (project / "src").mkdir(parents=True)
+    (project / "src" / "App.js").write_text("app")
+    state = {"files": {"src/App.js": "hash", "../secret.txt": "hash"}}
+    assert read_previous_file(str(project), state, "src/App.js") == "app"
+    assert read_previous_file(str(project), state, "../secret.txt") is None
+    assert read_previous_file(str(project), {"files": {}}, "src/App.js") is None
+    assert read_previous_file(str(project), None, "src/App.js") is None
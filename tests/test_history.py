@@ -0,0 +1,48 @@
+import pytest
+
+from history import GenerationHistory
+
+
+@pytest.fixture
+def history(tmp_path):
+    return GenerationHistory(str(tmp_path / "history.sqlite3"))
+
+
+FILES = {"src/App.js": "export default function App() {}\n", "src/components/Header.js": "export default 1;\n"}
+
+
+def test_record_find_and_get(history, tmp_path):
+    first = history.record(FILES, image_hash="img", project_path=str(tmp_path / "app"), model="m", timings={"s": 1})
+    second = history.record(dict(FILES, **{"src/App.js": "changed\n"}), image_hash="img", project_path=str(tmp_path / "app"))
+    assert [g["id"] for g in history.find(image_hash="img")] == [second, first]
+    assert history.find(image_hash="other") == []
+    generation = history.get(first)
+    assert generation["files"] == FILES and generation["timings"] == {"s": 1} and generation["file_count"] == 2
+    # Identical contents are stored once
+    stats = history.stats()
+    assert (stats["generations"], stats["files"], stats["blobs"]) == (2, 4, 3)
+    assert history.get(12345) is None
+
+
+def test_restore_writes_only_changed_files(history, tmp_path):
+    workdir = tmp_path / "restored"
+    generation_id = history.record(FILES, project_path=str(workdir))
+    restored = history.restore(generation_id)
+    assert restored["workdir"] == str(workdir) and restored["mode"] == "write"
+    assert sorted(path.replace("\\", "/") for path in restored["written"]) == sorted(FILES)
+    assert (workdir / "src" / "components" / "Header.js").read_text() == FILES["src/components/Header.js"]
+
+    (workdir / "src" / "App.js").write_text("hand edit\n")
+    again = history.restore(generation_id, str(workdir))
+    assert [path.replace("\\", "/") for path in again["written"]] == ["src/App.js"] and again["unchanged"] == 1
+    assert (workdir / "src" / "App.js").read_text() == FILES["src/App.js"]
+
+
+def test_restore_refuses_paths_outside_the_workdir(history, tmp_path):
+    generation_id = history.record({"../escape.js": "x", "src/App.js": "y"})
+    with pytest.raises(ValueError):
+        history.restore(generation_id, str(tmp_path / "restored"))
+    assert not (tmp_path / "escape.js").exists()
+    assert not (tmp_path / "restored" / "src" / "App.js").exists()
+    with pytest.raises(KeyError):
+        history.restore(999, str(tmp_path / "restored"))
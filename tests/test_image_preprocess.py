@@ -0,0 +1,114 @@
+from io import BytesIO
+
+from PIL import Image, ImageChops, ImageDraw
+
+from image_preprocess import (
+    NearDuplicateIndex,
+    crop_whitespace,
+    hamming_distance,
+    perceptual_hash,
+    preprocess_flowchart,
+    reduce_colors,
+)
+
+
+def flowchart(size=(800, 600), color=(30, 90, 200), offset=(0, 0)):
+    """A white canvas with two boxes joined by an arrow, away from the edges."""
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    scale_x, scale_y = size[0] / 800, size[1] / 600
+    dx, dy = offset
+
+    def box(x0, y0, x1, y1):
+        return [dx + x0 * scale_x, dy + y0 * scale_y, dx + x1 * scale_x, dy + y1 * scale_y]
+
+    draw.rectangle(box(200, 150, 400, 250), outline=color, width=max(2, round(4 * scale_x)))
+    draw.rectangle(box(420, 350, 600, 450), fill=color)
+    draw.line(box(300, 250, 510, 350), fill="black", width=max(2, round(4 * scale_x)))
+    return image
+
+
+def png_bytes(image):
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_crop_whitespace_keeps_a_small_margin():
+    image = flowchart()
+    cropped = crop_whitespace(image)
+    # Content spans x 200-600 and y 150-450; the margin is a few pixels at most
+    assert 400 <= cropped.width <= 420
+    assert 300 <= cropped.height <= 320
+
+
+def test_crop_whitespace_leaves_blank_images_alone():
+    blank = Image.new("RGB", (50, 40), "white")
+    assert crop_whitespace(blank).size == (50, 40)
+
+
+def test_grayscale_diagrams_lose_their_colour_channels():
+    image = flowchart(color=(80, 80, 80))
+    assert reduce_colors(image).mode == "L"
+
+
+def test_few_colour_diagrams_become_an_exact_palette():
+    image = flowchart()
+    reduced = reduce_colors(image)
+    assert reduced.mode == "P"
+    assert ImageChops.difference(reduced.convert("RGB"), image).getbbox() is None
+
+
+def test_photos_keep_full_colour():
+    noise = Image.effect_noise((64, 64), 80).convert("RGB")
+    gradient = Image.linear_gradient("L").resize((64, 64)).convert("RGB")
+    photo = Image.merge("RGB", (noise.split()[0], gradient.split()[0], noise.transpose(Image.Transpose.ROTATE_90).split()[0]))
+    assert reduce_colors(photo).mode == "RGB"
+
+
+def test_perceptual_hash_survives_rescaling_and_reencoding():
+    original = perceptual_hash(crop_whitespace(flowchart()))
+    smaller = perceptual_hash(crop_whitespace(flowchart(size=(400, 300))))
+    jpeg = BytesIO()
+    flowchart().save(jpeg, format="JPEG", quality=60)
+    reencoded = perceptual_hash(crop_whitespace(Image.open(jpeg).convert("RGB")))
+    assert len(original) == 16
+    assert hamming_distance(original, smaller) <= 6
+    assert hamming_distance(original, reencoded) <= 6
+
+
+def test_different_diagrams_hash_apart():
+    image = Image.new("RGB", (800, 600), "white")
+    ImageDraw.Draw(image).ellipse([100, 100, 700, 500], fill=(200, 40, 40))
+    other = Image.new("RGB", (800, 600), "white")
+    draw = ImageDraw.Draw(other)
+    for x in range(0, 800, 100):
+        draw.rectangle([x, 0, x + 50, 600], fill="black")
+    assert hamming_distance(perceptual_hash(image), perceptual_hash(other)) > 6
+
+
+def test_preprocess_shrinks_large_uploads():
+    source = png_bytes(flowchart(size=(3200, 2400)))
+    result = preprocess_flowchart(source)
+    assert max(result.size) <= 1568
+    assert result.original_size == (3200, 2400)
+    assert result.processed_bytes < result.original_bytes
+    assert Image.open(BytesIO(result.data)).size == result.size
+
+
+def test_near_duplicate_index_threshold():
+    index = NearDuplicateIndex(max_distance=2)
+    assert index.canonical("00000000000000ff", "first") == "first"
+    # Two bits away: the same diagram
+    assert index.canonical("00000000000000fc", "second") == "first"
+    # Three bits away: a new one
+    assert index.find("00000000000000f8") is None
+    assert index.canonical("00000000000000f8", "third") == "third"
+
+
+def test_near_duplicate_index_is_bounded():
+    index = NearDuplicateIndex(max_distance=0, max_entries=2)
+    for number, phash in enumerate(["0000000000000001", "0000000000000002", "0000000000000004"]):
+        index.canonical(phash, f"image-{number}")
+    assert index.find("0000000000000001") is None
+    assert index.find("0000000000000004") == "image-2"
@@ -0,0 +1,131 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from jobs import JobQueue, JobCancelled, FINISHED_STATUSES
+
+
+def _wait(queue, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in FINISHED_STATUSES:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(store_dir=str(tmp_path / "jobs"), workers=1)
+
+
+def test_successful_job_records_events_and_result(queue):
+    def work(job, value):
+        job.report("stage", "working")
+        return {"value": value}
+
+    job = _wait(queue, queue.submit(work, 42))
+    assert job["status"] == "succeeded" and job["result"] == {"value": 42}
+    assert [event["stage"] for event in job["events"]] == ["stage"]
+    assert job["started_at"] <= job["finished_at"] and job["pid"] == os.getpid()
+
+
+def test_failed_job_keeps_the_error(queue):
+    def work(job):
+        raise RuntimeError("boom")
+
+    job = _wait(queue, queue.submit(work))
+    assert job["status"] == "failed" and job["error"] == "RuntimeError: boom"
+
+
+def test_cancelling_queued_and_running_jobs(queue):
+    started, release = threading.Event(), threading.Event()
+
+    def blocking(job):
+        started.set()
+        release.wait(5)
+        job.check_cancelled()
+        return "finished"
+
+    running = queue.submit(blocking)
+    queued = queue.submit(lambda job: "never runs")
+    assert started.wait(5)
+    assert queue.get(running)["status"] == "running" and queue.get(queued)["status"] == "queued"
+    assert queue.queue_depth() == 2
+    assert queue.cancel(queued) and queue.cancel(running)
+    release.set()
+    assert _wait(queue, running)["status"] == "cancelled"
+    assert _wait(queue, queued)["status"] == "cancelled"
+    assert not queue.cancel(running)
+
+
+def test_status_survives_a_new_queue(tmp_path):
+    store = str(tmp_path / "jobs")
+    first = JobQueue(store_dir=store, workers=1)
+    job_id = first.submit(lambda job: "done")
+    _wait(first, job_id)
+    second = JobQueue(store_dir=store, workers=1)
+    assert second.get(job_id)["result"] == "done"
+    assert [job["id"] for job in second.list()] == [job_id]
+
+
+def test_only_jobs_of_dead_processes_are_marked_interrupted(tmp_path):
+    store = tmp_path / "jobs"
+    store.mkdir()
+    dead_pid = 2 ** 22 + 12345  # above the default pid_max, so never a live process
+    for job_id, pid in (("dead", dead_pid), ("legacy", None), ("alive", os.getpid())):
+        data = {"id": job_id, "status": "running", "created_at": time.time()}
+        if pid is not None:
+            data["pid"] = pid
+        (store / f"{job_id}.json").write_text(json.dumps(data))
+    queue = JobQueue(store_dir=str(store), workers=1)
+    assert queue.get("dead")["status"] == "interrupted"
+    assert queue.get("legacy")["status"] == "interrupted"
+    assert queue.get("alive")["status"] == "running"
+
+
+def test_old_and_excess_status_files_are_pruned(tmp_path):
+    store = tmp_path / "jobs"
+    store.mkdir()
+    now = time.time()
+    for i in range(5):
+        path = store / f"job{i}.json"
+        path.write_text(json.dumps({"id": f"job{i}", "status": "succeeded", "created_at": now - i}))
+        os.utime(path, (now - i, now - i))
+    stale = store / "stale.json"
+    stale.write_text(json.dumps({"id": "stale", "status": "succeeded", "created_at": 0}))
+    os.utime(stale, (now - 30 * 86400, now - 30 * 86400))
+    queue = JobQueue(store_dir=str(store), workers=1, retention_days=7, retention_count=3)
+    assert sorted(os.listdir(store)) == ["job0.json", "job1.json", "job2.json"]
+    assert [job["id"] for job in queue.list(limit=2)] == ["job0", "job1"]
+
+
+def test_check_cancelled_raises_once_requested(queue):
+    seen = []
+
+    def work(job):
+        job.cancel_requested.set()
+        try:
+            job.check_cancelled()
+        except JobCancelled:
+            seen.append(True)
+            raise
+
+    assert _wait(queue, queue.submit(work))["status"] == "cancelled" and seen == [True]
+
+
+def test_pruned_jobs_also_leave_memory(tmp_path):
+    queue = JobQueue(store_dir=str(tmp_path / "jobs"), workers=1, retention_count=2)
+    job_ids = []
+    for i in range(4):
+        job_ids.append(queue.submit(lambda job, i=i: i))
+        _wait(queue, job_ids[-1])
+        time.sleep(0.01)
+    queue._prune()
+    assert len(os.listdir(tmp_path / "jobs")) == 2
+    assert set(queue.jobs) == set(job_ids[-2:])
+    assert queue.get(job_ids[0]) is None
@@ -0,0 +1,95 @@
+import json
+import shutil
+
+import pytest
+
+from jsx_validator import JSXValidator, format_errors, validate_with_repair
+
+needs_node = pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+
+# Stand-in for @babel/parser: "@@" is the only syntax error it knows
+FAKE_BABEL_PARSER = """
+exports.parse = function (code) {
+  const index = code.indexOf('@@');
+  if (index < 0) return { errors: [] };
+  const before = code.slice(0, index).split('\\n');
+  const error = new SyntaxError('Unexpected token (' + before.length + ':' + before[before.length - 1].length + ')');
+  error.loc = { line: before.length, column: before[before.length - 1].length };
+  throw error;
+};
+"""
+
+
+def install_fake_parser(project):
+    package = project / "node_modules" / "@babel" / "parser"
+    package.mkdir(parents=True)
+    (package / "package.json").write_text(json.dumps({"name": "@babel/parser", "main": "index.js"}))
+    (package / "index.js").write_text(FAKE_BABEL_PARSER)
+
+
+@pytest.fixture
+def project_with_parser(tmp_path):
+    install_fake_parser(tmp_path)
+    return str(tmp_path)
+
+
+@pytest.fixture
+def checker():
+    checker = JSXValidator()
+    yield checker
+    checker.close()
+
+
+def test_non_script_files_pass_through(checker):
+    result = checker.validate("body { color: red", "src/App.css")
+    assert result.ok is True and result.parser is None
+    assert checker.validate_files({"src/App.css": "x", "package.json": "{"}) == []
+
+
+def test_missing_node_skips_validation():
+    checker = JSXValidator(node="no-such-node-binary")
+    result = checker.validate("const x = @@;", "src/App.js")
+    assert result.ok is None and result.errors == []
+
+
+@needs_node
+def test_missing_parser_is_unavailable_not_invalid(checker, tmp_path):
+    result = checker.validate("const x = @@;", "src/App.js", str(tmp_path))
+    assert result.ok is None and result.parser is None
+
+    repairs = []
+    code, report = validate_with_repair("const x = @@;", "src/App.js", str(tmp_path),
+                                        lambda code, errors: repairs.append(errors), checker=checker)
+    assert report["ok"] is None and report["remaining_errors"] == ""
+    assert repairs == []
+
+
+@needs_node
+def test_reports_line_and_column(checker, project_with_parser):
+    result = checker.validate("const a = 1;\nconst b = @@;\n", "src/App.js", project_with_parser)
+    assert result.ok is False and result.parser == "babel"
+    assert result.errors == [{"line": 2, "column": 11, "message": "Unexpected token"}]
+    assert format_errors([result]) == "src/App.js:2:11: Unexpected token"
+    assert checker.validate("const a = 1;\n", "src/App.js", project_with_parser).ok is True
+
+
+@needs_node
+def test_parser_installed_later_is_picked_up(checker, tmp_path):
+    assert checker.validate("const x = @@;", "src/App.js", str(tmp_path)).ok is None
+    # npm install finished in the meantime
+    install_fake_parser(tmp_path)
+    assert checker.validate("const x = @@;", "src/App.js", str(tmp_path)).ok is False
+
+
+@needs_node
+def test_repair_loop_feeds_errors_back(checker, project_with_parser):
+    seen = []
+
+    def repair(code, errors):
+        seen.append(errors)
+        return code.replace("@@", "1")
+
+    code, report = validate_with_repair("const x = @@;", "src/App.js", project_with_parser, repair, checker=checker)
+    assert code == "const x = 1;"
+    assert seen == ["src/App.js:1:11: Unexpected token"]
+    assert report["ok"] is True and report["repair_rounds"] == 1 and report["remaining_errors"] == ""
@@ -0,0 +1,63 @@
+import itertools
+
+import pytest
+
+import llm_cache
+from llm_cache import ResultCache, make_cache_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Every call moves time forward, so accesses are strictly ordered
+    ticks = itertools.count(1_000_000)
+    monkeypatch.setattr(llm_cache.time, "time", lambda: float(next(ticks)))
+
+
+def test_make_cache_key_covers_every_input():
+    base = make_cache_key("prompt", "model", 0.2, "image")
+    assert base == make_cache_key("prompt", "model", 0.2, "image")
+    assert len({base, make_cache_key("other", "model", 0.2, "image"), make_cache_key("prompt", "other", 0.2, "image"),
+                make_cache_key("prompt", "model", 0.3, "image"), make_cache_key("prompt", "model", 0.2, "")}) == 5
+
+
+def test_round_trip_and_stats(tmp_path, clock):
+    cache = ResultCache(str(tmp_path / "cache.sqlite3"))
+    assert cache.get("missing") is None
+    cache.put("key", {"content": "code"})
+    assert cache.get("key") == {"content": "code"}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["hit_rate"]) == (1, 1, 1, 0.5)
+
+
+def test_evicts_least_recently_used_beyond_max_entries(tmp_path, clock):
+    cache = ResultCache(str(tmp_path / "cache.sqlite3"), max_entries=3)
+    for key in "abc":
+        cache.put(key, key)
+    cache.get("a")  # "b" is now the least recently used
+    cache.put("d", "d")
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == ["a", "c", "d"]
+
+
+def test_evicts_by_total_size(tmp_path, clock):
+    cache = ResultCache(str(tmp_path / "cache.sqlite3"), max_bytes=20)
+    cache.put("a", "x" * 10)
+    cache.put("b", "y" * 10)
+    assert cache.stats()["entries"] == 1
+    assert cache.get("a") is None and cache.get("b") == "y" * 10
+
+
+def test_expired_entries_are_misses(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+    cache = ResultCache(str(tmp_path / "cache.sqlite3"), max_age_seconds=60)
+    cache.put("key", "value")
+    now[0] += 61
+    assert cache.get("key") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_persists_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    ResultCache(path).put("key", [1, 2])
+    assert ResultCache(path).get("key") == [1, 2]
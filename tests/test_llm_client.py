@@ -0,0 +1,234 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import llm_client
+from llm_client import LLMRouter, RateLimitError, TokenBucket, is_rate_limit_error
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(llm_client.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(llm_client.time, "sleep", clock.sleep)
+    # No jitter: the upper end of each backoff window
+    monkeypatch.setattr(llm_client.random, "uniform", lambda low, high: high)
+    return clock
+
+
+CONFIG = [
+    {"model": "primary", "api_key": "key-1"},
+    {"model": "primary", "api_key": "key-2"},
+    {"model": "cheap", "api_key": "key-1"},
+]
+
+
+def test_token_bucket_refills_continuously(clock):
+    bucket = TokenBucket(capacity=60, rate=1.0)
+    assert bucket.wait_time(60) == 0.0
+    bucket.consume(60)
+    assert bucket.wait_time(10) == pytest.approx(10.0)
+    clock.now += 4
+    assert bucket.wait_time(10) == pytest.approx(6.0)
+    clock.now += 1000
+    assert bucket.tokens <= bucket.capacity and bucket.wait_time(60) == 0.0
+
+
+def test_token_bucket_debt_is_paid_back(clock):
+    bucket = TokenBucket(capacity=10, rate=1.0)
+    bucket.consume(25)
+    # Requests larger than the bucket wait for a full bucket, never forever
+    assert bucket.wait_time(100) == pytest.approx(25.0)
+
+
+def test_calls_are_spread_over_keys(clock):
+    router = LLMRouter(CONFIG, requests_per_minute=60, tokens_per_minute=100_000)
+    used = [router.call(lambda entry: entry["api_key"], model="primary") for _ in range(4)]
+    assert sorted(used) == ["key-1", "key-1", "key-2", "key-2"]
+    assert clock.sleeps == []
+
+
+def test_waits_for_the_request_budget(clock):
+    router = LLMRouter(CONFIG[:1], requests_per_minute=2, tokens_per_minute=100_000)
+    for _ in range(3):
+        router.call(lambda entry: None, model="primary")
+    assert clock.sleeps == [pytest.approx(30.0)]
+
+
+def test_rate_limits_are_retried_with_exponential_backoff(clock):
+    router = LLMRouter(CONFIG[:1], requests_per_minute=1000, tokens_per_minute=1_000_000, base_delay=1.0, max_delay=30.0)
+    failures = [RateLimitError("429"), RateLimitError("429"), RateLimitError("429")]
+
+    def fn(entry):
+        if failures:
+            raise failures.pop()
+        return "ok"
+
+    assert router.call(fn, model="primary") == "ok"
+    # The cooldown after each 429 doubles: 1s, 2s, 4s
+    assert clock.sleeps == [pytest.approx(1.0), pytest.approx(2.0), pytest.approx(4.0)]
+    assert router.stats["rate_limited"] == 3 and router.stats["calls"] == 4
+
+
+def test_retry_after_is_honoured(clock):
+    router = LLMRouter(CONFIG[:1], requests_per_minute=1000, tokens_per_minute=1_000_000, base_delay=1.0)
+    failures = [RateLimitError("429", retry_after=12.0)]
+
+    def fn(entry):
+        if failures:
+            raise failures.pop()
+
+    router.call(fn, model="primary")
+    assert clock.sleeps == [pytest.approx(12.0)]
+
+
+def test_gives_up_after_max_retries(clock):
+    router = LLMRouter(CONFIG[:1], requests_per_minute=1000, tokens_per_minute=1_000_000, max_retries=2)
+
+    def fn(entry):
+        raise RateLimitError("429 always")
+
+    with pytest.raises(RateLimitError):
+        router.call(fn, model="primary")
+    assert router.stats["calls"] == 3
+
+
+def test_other_errors_are_not_retried(clock):
+    router = LLMRouter(CONFIG[:1])
+
+    def fn(entry):
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        router.call(fn, model="primary")
+    assert router.stats["calls"] == 1 and router.stats["retries"] == 0
+
+
+def test_falls_back_to_the_cheaper_model(clock):
+    router = LLMRouter(CONFIG, requests_per_minute=1000, tokens_per_minute=1_000_000, max_retries=4, fallback_model="cheap")
+    models = []
+
+    def fn(entry):
+        models.append(entry["model"])
+        if entry["model"] == "primary":
+            raise RateLimitError("429")
+        return entry["model"]
+
+    assert router.call(fn, model="primary") == "cheap"
+    assert models == ["primary", "primary", "primary", "cheap"]
+    assert router.stats["fallbacks"] == 1
+
+
+def test_is_rate_limit_error():
+    class ProviderError(Exception):
+        status_code = 429
+
+    assert is_rate_limit_error(RateLimitError("x"))
+    assert is_rate_limit_error(ProviderError())
+    assert is_rate_limit_error(Exception("Rate limit reached for model"))
+    assert not is_rate_limit_error(Exception("invalid api key"))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible /chat/completions that answers 429 while a model's quota of failures lasts."""
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        model = payload["model"]
+        self.server.seen.append((model, time.monotonic()))
+        if self.server.failures.get(model, 0):
+            self.server.failures[model] -= 1
+            self.send_response(429)
+            self.send_header("Retry-After", self.server.retry_after)
+            self.end_headers()
+            self.wfile.write(b"rate limited")
+            return
+        if payload.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for delta in ("Hel", "lo"):
+                chunk = {"choices": [{"delta": {"content": delta}}]}
+                self.wfile.write(f": keep-alive\n\ndata: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.write(b"data: [DONE]\n\n")
+            return
+        body = json.dumps({
+            "model": model,
+            "choices": [{"message": {"role": "assistant", "content": f"answer from {model}"}}],
+            "usage": {"prompt_tokens": 5, "completion_tokens": 3, "total_tokens": 8},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.seen, server.failures, server.retry_after = [], {}, "0"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def stub_config(server):
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    return [{"model": "primary", "api_key": "key-1", "base_url": base_url},
+            {"model": "cheap", "api_key": "key-1", "base_url": base_url}]
+
+
+def test_chat_retries_a_429_after_retry_after(stub_server):
+    stub_server.failures["primary"] = 1
+    stub_server.retry_after = "0.3"
+    router = LLMRouter(stub_config(stub_server), requests_per_minute=1000, tokens_per_minute=1_000_000, base_delay=0.01)
+
+    result = router.chat([{"role": "user", "content": "hi"}], model="primary")
+
+    assert result["choices"][0]["message"]["content"] == "answer from primary"
+    (first, first_at), (second, second_at) = stub_server.seen
+    assert first == second == "primary"
+    assert second_at - first_at >= 0.3
+    assert router.stats["rate_limited"] == 1 and router.stats["calls"] == 2
+
+
+def test_chat_switches_to_the_fallback_model(stub_server):
+    stub_server.failures["primary"] = 99
+    router = LLMRouter(stub_config(stub_server), requests_per_minute=1000, tokens_per_minute=1_000_000,
+                       base_delay=0.01, max_retries=2, fallback_model="cheap")
+
+    result = router.chat([{"role": "user", "content": "hi"}], model="primary")
+
+    assert result["choices"][0]["message"]["content"] == "answer from cheap"
+    assert [model for model, _ in stub_server.seen] == ["primary", "primary", "cheap"]
+    assert router.stats["fallbacks"] == 1
+
+
+def test_stream_chat_parses_server_sent_events(stub_server):
+    stub_server.failures["primary"] = 1
+    router = LLMRouter(stub_config(stub_server), requests_per_minute=1000, tokens_per_minute=1_000_000, base_delay=0.01)
+
+    assert list(router.stream_chat([{"role": "user", "content": "hi"}], model="primary")) == ["Hel", "lo"]
+    assert [model for model, _ in stub_server.seen] == ["primary", "primary"]
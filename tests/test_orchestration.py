@@ -0,0 +1,87 @@
+from orchestration import DeterministicSpeakerSelector, GROUPCHAT_TRANSITIONS, agent_transitions
+
+
+class FakeAgent:
+    def __init__(self, name, functions=()):
+        self.name = name
+        self.functions = set(functions)
+
+    def can_execute_function(self, names):
+        names = [names] if isinstance(names, str) else names
+        return all(name in self.functions for name in names)
+
+
+class FakeGroupChat:
+    def __init__(self, agents, messages=()):
+        self.agents = agents
+        self.messages = list(messages)
+
+    def agent_by_name(self, name):
+        return next((agent for agent in self.agents if agent.name == name), None)
+
+
+# The agents of new.py's group chat; Admin executes both tools
+admin = FakeAgent("Admin", functions=["save_code_blocks", "run_app"])
+generator = FakeAgent("Project_Code_Generator")
+engineer = FakeAgent("Engineer")
+app_runner = FakeAgent("AppRunner")
+AGENTS = [engineer, admin, generator, app_runner]
+
+
+def _tool_call(name, function):
+    return {"role": "assistant", "name": name, "content": None,
+            "tool_calls": [{"id": function, "type": "function", "function": {"name": function, "arguments": "{}"}}]}
+
+
+def _tool_result(function):
+    return {"role": "tool", "name": "Admin", "content": "0, ok",
+            "tool_responses": [{"tool_call_id": function, "role": "tool", "content": "0, ok"}]}
+
+
+def test_agent_transitions_follow_the_named_graph():
+    transitions = agent_transitions(AGENTS)
+    assert transitions[admin] == [generator]
+    assert transitions[app_runner] == [app_runner, admin]
+    assert {agent.name for agent in transitions} == set(GROUPCHAT_TRANSITIONS)
+
+
+def test_new_py_group_chat_round_needs_no_llm_selection():
+    selector = DeterministicSpeakerSelector(agent_transitions(AGENTS))
+    chat = FakeGroupChat(AGENTS)
+    # (speaker of the message, message, expected next speaker)
+    turns = [
+        (admin, {"role": "user", "name": "Admin", "content": "Build a dashboard"}, generator),
+        (generator, {"role": "assistant", "name": "Project_Code_Generator", "content": "```js\n// filename: src/App.js\n```"}, engineer),
+        (engineer, _tool_call("Engineer", "save_code_blocks"), admin),
+        (admin, _tool_result("save_code_blocks"), app_runner),
+        (app_runner, _tool_call("AppRunner", "run_app"), admin),
+        # AppRunner sees the result of its own call...
+        (admin, _tool_result("run_app"), app_runner),
+        # ...and after its plain reply the turn goes back to Admin
+        (app_runner, {"role": "assistant", "name": "AppRunner", "content": "The app is running."}, admin),
+    ]
+    for speaker, message, expected in turns:
+        chat.messages.append(message)
+        assert selector(speaker, chat) is expected, message
+    # Only AppRunner -> {AppRunner, Admin} is a choice AutoGen's graph would have sent to the LLM
+    assert selector.stats() == {"deterministic_selections": 7, "llm_selections": 0, "llm_calls_saved": 1}
+
+
+def test_tool_call_without_a_single_executor_falls_back_to_auto():
+    selector = DeterministicSpeakerSelector(agent_transitions(AGENTS))
+    chat = FakeGroupChat(AGENTS, [_tool_call("Engineer", "unknown_tool")])
+    assert selector(engineer, chat) == "auto"
+    assert selector.stats()["llm_selections"] == 1
+
+
+def test_real_choices_fall_back_to_auto():
+    a, b, c = FakeAgent("A"), FakeAgent("B"), FakeAgent("C")
+    selector = DeterministicSpeakerSelector({a: [b, c]})
+    assert selector(a, FakeGroupChat([a, b, c], [{"name": "A", "content": "hi"}])) == "auto"
+
+
+def test_reset_clears_the_counters():
+    selector = DeterministicSpeakerSelector(agent_transitions(AGENTS))
+    selector(admin, FakeGroupChat(AGENTS, [{"name": "Admin", "content": "hi"}]))
+    selector.reset()
+    assert selector.stats() == {"deterministic_selections": 0, "llm_selections": 0, "llm_calls_saved": 0}
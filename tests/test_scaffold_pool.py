@@ -0,0 +1,59 @@
+import json
+import os
+import threading
+
+from scaffold_pool import ScaffoldPool
+
+
+def fake_scaffold(workdir):
+    """Stands in for create-react-app: a package.json and an installed dependency."""
+    with open(os.path.join(workdir, "package.json"), "w", encoding="utf-8") as f:
+        json.dump({"name": "react-app", "dependencies": {"react": "^18.3.1"}}, f)
+    os.makedirs(os.path.join(workdir, "node_modules", "react"))
+    with open(os.path.join(workdir, "node_modules", "react", "index.js"), "w", encoding="utf-8") as f:
+        f.write("module.exports = {};\n")
+
+
+def test_pool_directories_are_created_on_first_use(tmp_path):
+    pool = ScaffoldPool(pool_dir=str(tmp_path / "pool"), scaffold_command=fake_scaffold)
+    assert not (tmp_path / "pool").exists()
+    assert pool.ready_count() == 0
+
+    assert pool.acquire(str(tmp_path / "app")) == "cloned"
+    pool._refill_thread.join(timeout=10)
+    assert (tmp_path / "app" / "node_modules" / "react" / "index.js").exists()
+    assert pool.ready_count() == 2
+
+
+def test_acquire_takes_a_ready_clone(tmp_path):
+    pool = ScaffoldPool(pool_dir=str(tmp_path / "pool"), size=1, scaffold_command=fake_scaffold)
+    pool.refill()
+    assert pool.acquire(str(tmp_path / "app")) == "pooled"
+    pool._refill_thread.join(timeout=10)
+    assert pool.acquire(str(tmp_path / "app")) == "existing"
+
+
+def test_concurrent_refills_start_one_thread(tmp_path):
+    pool = ScaffoldPool(pool_dir=str(tmp_path / "pool"), scaffold_command=fake_scaffold)
+    release = threading.Event()
+    runs = []
+
+    def slow_refill():
+        runs.append(threading.current_thread().name)
+        release.wait(timeout=10)
+
+    pool.refill = slow_refill
+    start = threading.Barrier(8)
+
+    def session():
+        start.wait()
+        pool.refill_async()
+
+    sessions = [threading.Thread(target=session) for _ in range(8)]
+    for thread in sessions:
+        thread.start()
+    for thread in sessions:
+        thread.join()
+    release.set()
+    pool._refill_thread.join(timeout=10)
+    assert len(runs) == 1
@@ -0,0 +1,141 @@
+import gzip
+import http.client
+import os
+
+import pytest
+
+from static_preview import IMMUTABLE_CACHE, REVALIDATE_CACHE, StaticPreviewServer, precompress
+
+INDEX_HTML = "<!doctype html><div id=root></div>"
+BUNDLE = "console.log('preview');\n" * 200
+
+
+@pytest.fixture
+def build_dir(tmp_path):
+    build = tmp_path / "build"
+    (build / "static" / "js").mkdir(parents=True)
+    (build / "index.html").write_text(INDEX_HTML)
+    (build / "static" / "js" / "main.1a2b.js").write_text(BUNDLE)
+    (build / ".preview-build.json").write_text("{}")
+    (tmp_path / "secret.txt").write_text("outside the build")
+    return build
+
+
+@pytest.fixture
+def server(build_dir):
+    server = StaticPreviewServer(host="127.0.0.1")
+    server.start()
+    server.register("app", str(build_dir))
+    yield server
+    server.stop()
+
+
+def get(server, path, headers=None, method="GET"):
+    connection = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    connection.request(method, path, headers=headers or {})
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    return response, body
+
+
+def test_serves_assets_with_cache_headers(server):
+    response, body = get(server, "/preview/app/static/js/main.1a2b.js")
+    assert response.status == 200 and body.decode() == BUNDLE
+    assert response.getheader("Cache-Control") == IMMUTABLE_CACHE
+    assert response.getheader("Content-Type").startswith(("application/javascript", "text/javascript"))
+
+    response, body = get(server, "/preview/app/")
+    assert body.decode() == INDEX_HTML and response.getheader("Cache-Control") == REVALIDATE_CACHE
+
+
+@pytest.mark.parametrize("path", [
+    "/preview/app/../secret.txt",
+    "/preview/app/%2e%2e/secret.txt",
+    "/preview/app/static/../../secret.txt",
+    "/preview/app/.preview-build.json",
+    "/preview/other/index.html",
+    "/elsewhere/app/index.html",
+])
+def test_paths_outside_the_build_are_not_found(server, path):
+    response, _ = get(server, path)
+    assert response.status == 404
+
+
+def test_redirects_to_the_trailing_slash(server):
+    response, body = get(server, "/preview/app")
+    assert response.status == 301
+    assert response.getheader("Location") == "/preview/app/"
+    assert body == b""
+
+
+def test_client_side_routes_get_the_app_shell(server):
+    response, body = get(server, "/preview/app/todos/42")
+    assert response.status == 200 and body.decode() == INDEX_HTML
+    # Missing files are still 404s, not HTML the browser would try to run
+    response, _ = get(server, "/preview/app/static/js/missing.js")
+    assert response.status == 404
+
+
+def test_negotiates_precompressed_variants(server, build_dir):
+    precompress(str(build_dir))
+    path = "/preview/app/static/js/main.1a2b.js"
+
+    response, body = get(server, path, {"Accept-Encoding": "gzip, deflate"})
+    assert response.getheader("Content-Encoding") == "gzip"
+    assert response.getheader("Vary") == "Accept-Encoding"
+    assert gzip.decompress(body).decode() == BUNDLE
+
+    response, body = get(server, path, {"Accept-Encoding": "gzip;q=0, identity"})
+    assert response.getheader("Content-Encoding") is None and body.decode() == BUNDLE
+
+    (build_dir / "static" / "js" / "main.1a2b.js.br").write_bytes(b"brotli bytes")
+    response, body = get(server, path, {"Accept-Encoding": "gzip, br"})
+    assert response.getheader("Content-Encoding") == "br" and body == b"brotli bytes"
+
+
+def test_matching_etag_gets_304(server):
+    path = "/preview/app/static/js/main.1a2b.js"
+    response, _ = get(server, path)
+    etag = response.getheader("ETag")
+
+    response, body = get(server, path, {"If-None-Match": etag})
+    assert response.status == 304 and body == b""
+    assert response.getheader("ETag") == etag
+
+    response, _ = get(server, path, {"If-None-Match": '"stale"'})
+    assert response.status == 200
+
+
+def test_head_sends_no_body(server):
+    response, body = get(server, "/preview/app/static/js/main.1a2b.js", method="HEAD")
+    assert response.status == 200 and body == b""
+    assert response.getheader("Content-Length") == str(len(BUNDLE))
+
+
+def test_precompress_skips_fresh_variants(build_dir):
+    stats = precompress(str(build_dir))
+    assert stats["files"] == 1 and 0 < stats["gzip_bytes"] < len(BUNDLE)
+    gz = build_dir / "static" / "js" / "main.1a2b.js.gz"
+    written = gz.stat().st_mtime_ns
+    assert precompress(str(build_dir))["gzip_bytes"] == stats["gzip_bytes"]
+    assert gz.stat().st_mtime_ns == written
+
+
+def test_precompress_drops_variants_of_a_previous_build(build_dir):
+    asset = build_dir / "static" / "js" / "main.1a2b.js"
+    gz = build_dir / "static" / "js" / "main.1a2b.js.gz"
+    precompress(str(build_dir))
+    assert gz.exists()
+
+    # The next build writes an asset gzip cannot shrink
+    asset.write_bytes(os.urandom(4096))
+    os.utime(asset, (gz.stat().st_mtime + 10, gz.stat().st_mtime + 10))
+    precompress(str(build_dir))
+    assert not gz.exists()
+
+    # ... or one too small to bother with
+    gz.write_bytes(b"stale")
+    asset.write_text("tiny")
+    precompress(str(build_dir))
+    assert not gz.exists()
@@ -0,0 +1,73 @@
+import json
+import os
+import socket
+import urllib.request
+
+import tracing
+from context_compaction import estimate_tokens
+from tracing import Tracer, record_tokens, summarize_spans, trace_context
+
+
+def test_spans_nest_and_carry_tokens_and_cost(tmp_path):
+    tracer = Tracer(path=str(tmp_path / "traces.jsonl"))
+    with trace_context("job-1"):
+        with tracer.span("job"):
+            with tracer.span("llm.call", model="groq/mixtral-8x7b-32768"):
+                record_tokens(1000, 500)
+    spans = tracer.spans_for("job-1")
+    job, call = next(s for s in spans if s["name"] == "job"), next(s for s in spans if s["name"] == "llm.call")
+    assert call["parent_id"] == job["span_id"] and job["parent_id"] is None
+    assert call["attrs"]["cost_usd"] == round(1500 * 0.24 / 1_000_000, 6)
+    rows = {row["span"]: row for row in summarize_spans(spans)}
+    assert rows["llm.call"]["prompt_tokens"] == 1000 and rows["llm.call"]["completion_tokens"] == 500
+    assert 'llm_tokens_total{model="mixtral-8x7b-32768",kind="prompt"} 1000' in tracer.prometheus().replace("groq/", "")
+
+
+def test_estimates_count_only_text_parts_of_multimodal_content():
+    content = [{"type": "text", "text": "abcd" * 4}, {"type": "image_url", "image_url": {"url": "data:image/png;base64,..."}}]
+    assert estimate_tokens(content) == estimate_tokens("abcd" * 4) == 5
+    assert estimate_tokens({"content": "x"}) == estimate_tokens('{"content": "x"}')
+
+
+def test_writes_are_batched_until_a_root_span_finishes(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(path=str(path))
+    with trace_context("job-2"):
+        with tracer.span("job"):
+            with tracer.span("child"):
+                pass
+            assert not path.exists()
+    assert [json.loads(line)["name"] for line in path.read_text().splitlines()] == ["child", "job"]
+
+
+def test_traces_are_read_back_from_the_file_and_rotated(tmp_path):
+    path = str(tmp_path / "traces.jsonl")
+    writer = Tracer(path=path, max_bytes=50)
+    for trace_id in ("a", "b"):
+        with trace_context(trace_id), writer.span("job"):
+            pass
+    assert os.path.exists(path + ".1")
+    # A new process only has the files
+    reader = Tracer(path=path)
+    assert [span["name"] for span in reader.spans_for("a")] == ["job"]
+    assert [span["name"] for span in reader.spans_for("b")] == ["job"]
+    assert reader.spans_for("missing") == []
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_metrics_server_listens_on_localhost_by_default(monkeypatch):
+    monkeypatch.setattr(tracing, "_metrics_server", None)
+    server = tracing.start_metrics_server(port=_free_port())
+    try:
+        assert server.server_address[0] == "127.0.0.1"
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics", timeout=5) as response:
+            assert b"pipeline_span_seconds" in response.read()
+    finally:
+        server.shutdown()
+        server.server_close()
+
@@ -0,0 +1,322 @@
+import os
+import json
+import atexit
+import time
+import uuid
+import threading
+import contextvars
+import http.server
+from collections import OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+from typing import Optional
+
+# Spans are appended here as JSON lines (override with TRACE_PATH)
+DEFAULT_TRACE_PATH = os.getenv("TRACE_PATH", os.path.join(".cache", "traces.jsonl"))
+# Once the trace file grows past this size it is rotated to <path>.1 (override with TRACE_MAX_BYTES)
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(20 * 1024 * 1024)))
+# Finished spans are buffered and appended in batches of this many, or after this many seconds
+TRACE_FLUSH_SPANS = 50
+TRACE_FLUSH_SECONDS = 2.0
+# Set METRICS_PORT to serve Prometheus metrics on http://<METRICS_HOST>:<port>/metrics
+METRICS_PORT = os.getenv("METRICS_PORT")
+# Token and cost metrics stay on this machine unless METRICS_HOST says otherwise (e.g. 0.0.0.0)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+# USD per million (prompt, completion) tokens; Groq list prices, override with LLM_PRICES (JSON)
+MODEL_PRICES = {
+    "llama-3.2-11b-vision-preview": (0.18, 0.18),
+    "llama-3.2-90b-vision-preview": (0.90, 0.90),
+    "mixtral-8x7b-32768": (0.24, 0.24),
+}
+MODEL_PRICES.update({model: tuple(prices) for model, prices in json.loads(os.getenv("LLM_PRICES", "{}")).items()})
+
+_current_trace = contextvars.ContextVar("trace_id", default=None)
+_current_span = contextvars.ContextVar("span", default=None)
+
+
+def estimate_cost(model: Optional[str], prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """Dollar cost of one call, or None for models without a known price."""
+    model = (model or "").split("/", 1)[-1]
+    if model not in MODEL_PRICES:
+        return None
+    prompt_price, completion_price = MODEL_PRICES[model]
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+class Span:
+    """One timed operation; attributes can be added while it is open with set()."""
+
+    def __init__(self, name, trace_id=None, parent_id=None, **attrs):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attrs = dict(attrs)
+        self.start = time.time()
+        self.duration_s = None
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_s": self.duration_s,
+            "error": self.error,
+            "attrs": self.attrs,
+        }
+
+
+class Tracer:
+    """Records spans to a JSON-lines file and keeps aggregate metrics for the Prometheus endpoint."""
+
+    def __init__(self, path=DEFAULT_TRACE_PATH, recent_traces=100, recent_per_trace=500, max_bytes=TRACE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        # Spans of the most recent traces, for the UI; older ones are read back from the file
+        self.recent = OrderedDict()
+        self.recent_traces = recent_traces
+        self.recent_per_trace = recent_per_trace
+        self.durations = defaultdict(lambda: [0, 0.0])  # span name -> [count, total seconds]
+        self.errors = defaultdict(int)
+        self.tokens = defaultdict(int)  # (model, "prompt" | "completion") -> tokens
+        self.cost = defaultdict(float)
+        self.gauges = {}
+        self._pending = []  # JSON lines not yet written to the file
+        self._last_flush = time.monotonic()
+        # Traces read back from the file, with the file size/mtime they were read at
+        self._file_traces = OrderedDict()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Time the enclosed block; nested spans become its children."""
+        parent = _current_span.get()
+        span = Span(name, trace_id=_current_trace.get(), parent_id=parent.span_id if parent else None, **attrs)
+        token = _current_span.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration_s = time.perf_counter() - start
+            _current_span.reset(token)
+            self._finish(span)
+
+    def record(self, name, duration_s, error=None, **attrs):
+        """Record a span measured elsewhere (e.g. across a generator's lifetime)."""
+        parent = _current_span.get()
+        span = Span(name, trace_id=_current_trace.get(), parent_id=parent.span_id if parent else None, **attrs)
+        span.start -= duration_s
+        span.duration_s = duration_s
+        span.error = error
+        self._finish(span)
+        return span
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def _finish(self, span):
+        attrs = span.attrs
+        with self._lock:
+            self.durations[span.name][0] += 1
+            self.durations[span.name][1] += span.duration_s
+            if span.error:
+                self.errors[span.name] += 1
+            if "prompt_tokens" in attrs or "completion_tokens" in attrs:
+                model = attrs.get("model") or "unknown"
+                prompt_tokens, completion_tokens = attrs.get("prompt_tokens") or 0, attrs.get("completion_tokens") or 0
+                self.tokens[(model, "prompt")] += prompt_tokens
+                self.tokens[(model, "completion")] += completion_tokens
+                cost = estimate_cost(model, prompt_tokens, completion_tokens)
+                if cost is not None:
+                    attrs["cost_usd"] = round(cost, 6)
+                    self.cost[model] += cost
+            data = span.to_dict()
+            if span.trace_id:
+                if span.trace_id not in self.recent:
+                    self.recent[span.trace_id] = deque(maxlen=self.recent_per_trace)
+                    while len(self.recent) > self.recent_traces:
+                        self.recent.popitem(last=False)
+                self.recent[span.trace_id].append(data)
+            self._pending.append(json.dumps(data, default=str) + "\n")
+            # A finished root span (e.g. a whole job) is flushed right away so its trace is complete on disk
+            due = (len(self._pending) >= TRACE_FLUSH_SPANS or span.parent_id is None
+                   or time.monotonic() - self._last_flush >= TRACE_FLUSH_SECONDS)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Append the buffered spans to the trace file, rotating it to <path>.1 once it exceeds max_bytes."""
+        with self._write_lock:
+            with self._lock:
+                lines, self._pending = self._pending, []
+                self._last_flush = time.monotonic()
+            if not lines:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                    os.replace(self.path, f"{self.path}.1")
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.writelines(lines)
+            except OSError:
+                pass
+
+    def _file_signature(self):
+        signature = []
+        for path in (f"{self.path}.1", self.path):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def spans_for(self, trace_id):
+        """
+        Spans of one trace: from memory when recorded by this process, else from the JSONL file
+        (and its rotated predecessor), which is only re-read once it has changed.
+        """
+        with self._lock:
+            if trace_id in self.recent:
+                return list(self.recent[trace_id])
+        self.flush()
+        signature = self._file_signature()
+        with self._lock:
+            cached = self._file_traces.get(trace_id)
+            if cached is not None and cached[0] == signature:
+                self._file_traces.move_to_end(trace_id)
+                return list(cached[1])
+        spans = []
+        for path in (f"{self.path}.1", self.path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        # Cheap substring test before parsing every line of a long file
+                        if trace_id in line:
+                            data = json.loads(line)
+                            if data.get("trace_id") == trace_id:
+                                spans.append(data)
+            except (OSError, ValueError):
+                pass
+        with self._lock:
+            self._file_traces[trace_id] = (signature, spans)
+            while len(self._file_traces) > self.recent_traces:
+                self._file_traces.popitem(last=False)
+        return list(spans)
+
+    def prometheus(self):
+        """Current metrics in the Prometheus text exposition format."""
+        def labels(**values):
+            if not values:
+                return ""
+            return "{" + ",".join(f'{key}="{str(value).replace(chr(34), chr(39))}"' for key, value in values.items()) + "}"
+
+        lines = [
+            "# HELP pipeline_span_seconds Time spent in pipeline stages.",
+            "# TYPE pipeline_span_seconds summary",
+        ]
+        with self._lock:
+            for name, (count, total) in sorted(self.durations.items()):
+                lines.append(f"pipeline_span_seconds_count{labels(span=name)} {count}")
+                lines.append(f"pipeline_span_seconds_sum{labels(span=name)} {total:.6f}")
+            lines += ["# HELP pipeline_span_errors_total Spans that raised.", "# TYPE pipeline_span_errors_total counter"]
+            for name, count in sorted(self.errors.items()):
+                lines.append(f"pipeline_span_errors_total{labels(span=name)} {count}")
+            lines += ["# HELP llm_tokens_total Tokens used by LLM calls.", "# TYPE llm_tokens_total counter"]
+            for (model, kind), count in sorted(self.tokens.items()):
+                lines.append(f"llm_tokens_total{labels(model=model, kind=kind)} {count}")
+            lines += ["# HELP llm_cost_usd_total Estimated LLM spend.", "# TYPE llm_cost_usd_total counter"]
+            for model, cost in sorted(self.cost.items()):
+                lines.append(f"llm_cost_usd_total{labels(model=model)} {cost:.6f}")
+            typed = set()
+            for (name, label_items), value in sorted(self.gauges.items()):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name}{labels(**dict(label_items))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def summarize_spans(spans):
+    """Per-stage breakdown of one trace: count, total seconds, tokens and cost per span name."""
+    rows = {}
+    for span in spans:
+        row = rows.setdefault(span["name"], {"span": span["name"], "count": 0, "total_s": 0.0,
+                                             "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0, "errors": 0})
+        attrs = span.get("attrs") or {}
+        row["count"] += 1
+        row["total_s"] = round(row["total_s"] + (span.get("duration_s") or 0.0), 3)
+        row["prompt_tokens"] += attrs.get("prompt_tokens") or 0
+        row["completion_tokens"] += attrs.get("completion_tokens") or 0
+        row["cost_usd"] = round(row["cost_usd"] + (attrs.get("cost_usd") or 0.0), 6)
+        row["errors"] += 1 if span.get("error") else 0
+    return sorted(rows.values(), key=lambda row: row["total_s"], reverse=True)
+
+
+@contextmanager
+def trace_context(trace_id):
+    """Attribute every span recorded inside the block (in this thread/context) to trace_id."""
+    token = _current_trace.set(trace_id)
+    try:
+        yield trace_id
+    finally:
+        _current_trace.reset(token)
+
+
+def current_span():
+    return _current_span.get()
+
+
+def record_tokens(prompt_tokens, completion_tokens, estimated=False):
+    """Attach token usage to the open span (normally the router's llm.call span)."""
+    span = _current_span.get()
+    if span is not None:
+        span.set(prompt_tokens=prompt_tokens or 0, completion_tokens=completion_tokens or 0)
+        if estimated:
+            span.set(estimated=True)
+
+
+_metrics_server = None
+
+
+def start_metrics_server(port=None, host=METRICS_HOST):
+    """Serve tracer.prometheus() on /metrics in a daemon thread; no-op without a port or if already running."""
+    global _metrics_server
+    port = port or METRICS_PORT
+    if not port or _metrics_server is not None:
+        return _metrics_server
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = tracer.prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    _metrics_server = http.server.ThreadingHTTPServer((host, int(port)), Handler)
+    threading.Thread(target=_metrics_server.serve_forever, name="metrics", daemon=True).start()
+    return _metrics_server
+
+
+# Shared tracer used by every module; spans still buffered at exit are written out
+tracer = Tracer()
+atexit.register(tracer.flush)